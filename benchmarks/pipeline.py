@@ -0,0 +1,273 @@
+"""
+Micro-benchmarks of the build pipeline on a synthetic project.
+
+Times dependency resolution, config loading, recase, Library() rewriting,
+builds with the fake compiler backend (with and without the artifact cache)
+and install/uninstall into a fake destination root, so everything runs
+without osacompile (e.g. on Linux).
+Results are written as JSON, which can be compared with the results of
+another commit.
+
+  python benchmarks/pipeline.py [--runs N] [--output FILE] [--compare FILE]
+      [--only NAME ...] [project options, see synthetic_project.py]
+"""
+import os
+from os import path as p
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = p.dirname(p.dirname(p.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.synthetic_project import ProjectSpec, generate_project, add_spec_arguments, get_spec
+from jxa_builder.core import get_project_config as config_module
+from jxa_builder.core.artifact_cache import CACHE_DIR_ENV
+from jxa_builder.core.build_project import BuildOptions, ProjectBuilder
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+from jxa_builder.core.manage_outputs import manage_outputs, is_within
+from jxa_builder.core.models import CompilationUnit
+from jxa_builder.core.rewrite_libraries import rewrite_libraries
+from jxa_builder.core.constants import LOCATIONS_FILE, INSTALL_STATE_FILE
+from jxa_builder.utils.recase import recase
+
+## A benchmark prepares its state with `setup` (not timed) and returns
+## the function that is timed
+Benchmark = Callable[[], Callable[[], object]]
+
+
+class Suite:
+
+  def __init__(self, work_dir: str, spec: ProjectSpec):
+    self.work_dir = work_dir
+    self.project_dir = p.join(work_dir, 'project')
+    self.main_source = generate_project(self.project_dir, spec)
+    ## Sources of the whole graph, resolved once
+    self.modules = DependencyResolver(self.project_dir).resolve(
+        self.main_source)
+
+  def resolve_cold(self):
+    config_module.clear_caches()
+    return lambda: DependencyResolver(self.project_dir).resolve(self.
+                                                                main_source)
+
+  def resolve_warm(self):
+    resolver = DependencyResolver(self.project_dir)
+    resolver.resolve(self.main_source)
+    return lambda: resolver.resolve(self.main_source)
+
+  def get_project_config_cold(self):
+
+    def run():
+      config_module.clear_caches()
+      return config_module.get_project_config(self.project_dir)
+
+    return run
+
+  def get_project_config_warm(self):
+    config_module.get_project_config(self.project_dir)
+    return lambda: config_module.get_project_config(self.project_dir)
+
+  def recase(self):
+    keys = [
+        f'{word}{i}' for i in range(200)
+        for word in ('compMode', 'deps_install_mode', 'app-name',
+                     'Main Source')
+    ]
+
+    def run():
+      recase.cache_clear()
+      for key in keys:
+        for case in ('snake', 'camel', 'kebab'):
+          recase(key, case)
+
+    return run
+
+  def rewrite_libraries(self):
+    out_dir = p.join(self.work_dir, 'rewritten')
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(m.source, p.join(out_dir, f'{i}.js'), {
+        p.basename(d): p.basename(d) + '_1'
+        for d in m.dependency_sources
+    } or {
+        'none': 'none'
+    }) for i, m in enumerate(self.modules)]
+
+    def run():
+      for source, dest, names in jobs:
+        rewrite_libraries(source, dest, names)
+
+    return run
+
+  def _builder(self,
+               force: bool,
+               artifact_cache: bool = False) -> ProjectBuilder:
+    return ProjectBuilder(self.project_dir,
+                          options=BuildOptions(force=force,
+                                               compiler_backend='fake',
+                                               artifact_cache=artifact_cache))
+
+  def build_full(self):
+    return lambda: self._builder(True).build()
+
+  def build_artifact_cache(self):
+    ## A full build with every artifact in the cache (e.g. a fresh checkout)
+    os.environ[CACHE_DIR_ENV] = p.join(self.work_dir, 'cache')
+    self._builder(True, artifact_cache=True).build()
+    return lambda: self._builder(True, artifact_cache=True).build()
+
+  def build_noop(self):
+    self._builder(True).build()
+    return lambda: self._builder(False).build()
+
+  def _locations_file(self, dest_root: str) -> str:
+    """
+    Point installation paths of the built units into dest_root
+    (libraries embedded in the app stay where they are)
+    """
+    locations_file = p.join(self.project_dir, LOCATIONS_FILE)
+    with open(locations_file) as f:
+      units = [CompilationUnit(**u) for u in json.load(f)]
+    fake_file = p.join(self.work_dir, 'locations.json')
+    with open(fake_file, 'w') as f:
+      json.dump([
+          asdict(
+              CompilationUnit(
+                  u.input_path, u.output_path, u.installation_path if
+                  is_within(u.installation_path, self.project_dir) else p.join(
+                      dest_root, u.installation_path.lstrip(p.sep))))
+          for u in units
+      ], f)
+    return fake_file
+
+  def install_full(self):
+    self._builder(True).build()
+    dest_root = p.join(self.work_dir, 'root')
+    locations_file = self._locations_file(dest_root)
+
+    def run():
+      shutil.rmtree(dest_root, ignore_errors=True)
+      state_file = p.join(self.work_dir, p.basename(INSTALL_STATE_FILE))
+      if p.exists(state_file):
+        os.remove(state_file)
+      manage_outputs('install', locations_file)
+
+    return run
+
+  def install_noop(self):
+    self._builder(True).build()
+    locations_file = self._locations_file(p.join(self.work_dir, 'root'))
+    manage_outputs('install', locations_file)
+    return lambda: manage_outputs('install', locations_file)
+
+  def uninstall(self):
+    self._builder(True).build()
+    locations_file = self._locations_file(p.join(self.work_dir, 'root'))
+
+    def run():
+      manage_outputs('install', locations_file)
+      manage_outputs('uninstall', locations_file)
+
+    return run
+
+
+BENCHMARKS = [
+    'resolve_cold', 'resolve_warm', 'get_project_config_cold',
+    'get_project_config_warm', 'recase', 'rewrite_libraries', 'build_full',
+    'build_artifact_cache', 'build_noop', 'install_full', 'install_noop',
+    'uninstall'
+]
+
+
+def time_benchmark(setup: Benchmark, runs: int) -> Dict[str, float]:
+  times = []
+  for _ in range(runs):
+    run = setup()
+    start = time.perf_counter()
+    run()
+    times.append((time.perf_counter() - start) * 1000)
+  return {
+      'median_ms': round(statistics.median(times), 3),
+      'min_ms': round(min(times), 3),
+      'max_ms': round(max(times), 3),
+      'runs': runs,
+  }
+
+
+def get_commit() -> Optional[str]:
+  try:
+    return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                          cwd=ROOT_DIR,
+                          capture_output=True,
+                          text=True,
+                          check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def print_results(results: Dict[str, Dict[str, float]],
+                  baseline: Optional[Dict] = None):
+  for name, result in results.items():
+    line = f'{name:<26} {result["median_ms"]:>10.2f}ms  (min {result["min_ms"]:.2f}ms)'
+    old = (baseline or {}).get('results', {}).get(name)
+    if old:
+      ratio = result['median_ms'] / max(old['median_ms'], 1e-9)
+      line += f'  {ratio:.2f}x vs {baseline.get("commit") or "baseline"}'
+    print(line)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--runs', type=int, default=5)
+  parser.add_argument('--output',
+                      help='JSON file for the results (e.g. to compare later)')
+  parser.add_argument('--compare',
+                      help='JSON file with results of another run')
+  parser.add_argument('--only',
+                      nargs='+',
+                      choices=BENCHMARKS,
+                      help='Benchmarks to run (defaults to all)')
+  add_spec_arguments(parser)
+  args = parser.parse_args()
+  spec = get_spec(args)
+
+  ## Builds log to the log file, keep it from dominating the timings
+  import logging
+  logging.disable(logging.INFO)
+  work_dir = tempfile.mkdtemp(prefix='jxa-builder-bench-')
+  try:
+    suite = Suite(work_dir, spec)
+    results = {
+        name: time_benchmark(getattr(suite, name), args.runs)
+        for name in args.only or BENCHMARKS
+    }
+  finally:
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+  report = {
+      'commit': get_commit(),
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'project': asdict(spec),
+      'results': results,
+  }
+  baseline = None
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+  print_results(results, baseline)
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,120 @@
+"""
+Start-up benchmark of the CLI.
+
+Runs CLI commands that do almost no work with `python -X importtime` and
+reports the wall time, the total import time and the most expensive imports
+of each of them. Exits with code 1 when the import time of some command is
+over its budget.
+
+  python benchmarks/startup.py [--runs N] [--budget-ms MS] [--top N] [--json]
+"""
+import os
+from os import path as p
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT_DIR = p.dirname(p.dirname(p.abspath(__file__)))
+
+## Command -> import time budget in milliseconds
+## (rendering help with rich_click alone takes ~80ms, build pulls in pydantic)
+COMMANDS: Dict[str, float] = {
+    '--help': 250,
+    'uninstall --help': 250,
+    'install --help': 250,
+    'daemon status': 150,
+    'build --help': 450,
+}
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+  """
+  Get the total import time and (module, cumulative time) of the top level
+  imports from `-X importtime` output, in milliseconds.
+  """
+  total = 0.0
+  top_level = []
+  for line in stderr.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+    self_us, cumulative_us, name = line[len('import time:'):].split('|')
+    total += int(self_us) / 1000
+    ## Nested imports are indented by two spaces per level
+    if not name[1:].startswith(' '):
+      top_level.append((name.strip(), int(cumulative_us) / 1000))
+  return total, top_level
+
+
+def run_command(command: str) -> Tuple[float, float, List[Tuple[str, float]]]:
+  """Returns wall time, import time and top level imports of one run"""
+  env = dict(os.environ,
+             PYTHONPATH=ROOT_DIR,
+             PYTHONDONTWRITEBYTECODE='',
+             JXA_BUILDER_NO_DAEMON='true')
+  start = time.perf_counter()
+  proc = subprocess.run([
+      sys.executable, '-X', 'importtime', '-m', 'jxa_builder.main',
+      *command.split()
+  ],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.PIPE,
+                        text=True,
+                        env=env)
+  wall = (time.perf_counter() - start) * 1000
+  imports, top_level = parse_importtime(proc.stderr)
+  return wall, imports, top_level
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--runs', type=int, default=5)
+  parser.add_argument('--budget-ms',
+                      type=float,
+                      help='Import time budget for every command')
+  parser.add_argument('--top', type=int, default=5)
+  parser.add_argument('--json', action='store_true', help='Print JSON')
+  args = parser.parse_args()
+
+  ## Warm up, so compiled bytecode exists
+  run_command('--help')
+  results = []
+  for command, budget in COMMANDS.items():
+    budget = args.budget_ms or budget
+    runs = [run_command(command) for _ in range(args.runs)]
+    imports = statistics.median(r[1] for r in runs)
+    results.append({
+        'command':
+        command,
+        'wall_ms':
+        round(statistics.median(r[0] for r in runs), 1),
+        'import_ms':
+        round(imports, 1),
+        'budget_ms':
+        budget,
+        'over_budget':
+        imports > budget,
+        'top_imports': [{
+            'module': name,
+            'ms': round(ms, 1)
+        } for name, ms in sorted(runs[-1][2], key=lambda i: -i[1])[:args.top]],
+    })
+
+  if args.json:
+    print(json.dumps(results, indent=2))
+  else:
+    for result in results:
+      status = 'OVER BUDGET' if result['over_budget'] else 'ok'
+      print(
+          f'{result["command"]:<20} wall {result["wall_ms"]:>7.1f}ms  imports {result["import_ms"]:>7.1f}ms / {result["budget_ms"]:.0f}ms  {status}'
+      )
+      for i in result['top_imports']:
+        print(f'    {i["ms"]:>7.1f}ms  {i["module"]}')
+  sys.exit(1 if any(r['over_budget'] for r in results) else 0)
+
+
+if __name__ == '__main__':
+  main()
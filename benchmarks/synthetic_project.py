@@ -0,0 +1,187 @@
+"""
+Generator of synthetic JXA projects.
+
+Modules form a DAG of the given depth: every module loads `fan_out` modules
+of the next level, and with `diamond` probability a Library() call points to
+a module that is already loaded by another one (so the graph has shared
+dependencies). Modules are local files next to the sources, packages in
+`dependencies` or `node_modules`, or packages nested in the `node_modules`
+of the package that uses them.
+
+  python benchmarks/synthetic_project.py DIR [--modules N] [--depth N]
+      [--fan-out N] [--diamond P] [--file-kb N] [--layout LAYOUT] [--seed N]
+"""
+import os
+from os import path as p
+import json
+import random
+import time
+import shutil
+import argparse
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+
+LAYOUTS = ('local', 'dependencies', 'node_modules', 'nested', 'mixed')
+
+
+@dataclass
+class ProjectSpec:
+  modules: int = 200
+  depth: int = 6
+  fan_out: int = 3
+  ## Probability that a Library() call points to an already loaded module
+  diamond: float = 0.3
+  ## Approximate size of every source
+  file_kb: float = 2
+  layout: str = 'mixed'
+  seed: int = 0
+
+
+def get_graph(spec: ProjectSpec) -> List[List[int]]:
+  """
+  Get dependencies of every module, module 0 is the main one. Dependencies
+  always have a higher level, so the graph has no cycles.
+  """
+  rng = random.Random(spec.seed)
+  count = max(spec.modules, 1) + 1
+  depth = max(1, min(spec.depth, count - 1))
+  ## Every level gets at least one module, the rest are spread randomly
+  levels = [0] + sorted(
+      list(range(1, depth + 1)) +
+      [rng.randint(1, depth) for _ in range(count - 1 - depth)])
+  by_level: Dict[int, List[int]] = {}
+  for module, level in enumerate(levels):
+    by_level.setdefault(level, []).append(module)
+
+  deps: List[List[int]] = [[] for _ in range(count)]
+  ## A tree first, so every module is reachable from the main one
+  for level in range(1, depth + 1):
+    for module in by_level[level]:
+      deps[rng.choice(by_level[level - 1])].append(module)
+  ## Then shared dependencies, up to fan_out per module
+  for module in range(count):
+    next_level = by_level.get(levels[module] + 1, [])
+    while next_level and len(deps[module]) < spec.fan_out:
+      if rng.random() >= spec.diamond:
+        break
+      dep = rng.choice(next_level)
+      if dep not in deps[module]:
+        deps[module].append(dep)
+  return deps
+
+
+def get_code(module: int, deps: List[str], file_kb: float) -> str:
+  lines = [f'{name} = Library("{name}");' for name in deps]
+  lines += [
+      f'function hello() {{',
+      f'  return "hello from m{module}\\n"' + ''.join(f' + {name}.hello()'
+                                                      for name in deps) + ';',
+      '}',
+  ]
+  code = '\n'.join(lines) + '\n'
+  ## Padding, with comments and strings the lexer has to step over
+  i = 0
+  while len(code) < file_kb * 1024:
+    code += (
+        f'// helper {i}: Library("not-a-dependency")\n'
+        f'function helper{i}(value) {{\n'
+        f'  const text = "value of helper {i}: " + value;\n'
+        f'  return text.replace(/[a-z]+/g, (word) => word.toUpperCase());\n'
+        '}\n')
+    i += 1
+  return code
+
+
+def generate_project(project_dir: str, spec: ProjectSpec) -> str:
+  """Create the project (replacing the directory), returns its main source"""
+  rng = random.Random(spec.seed + 1)
+  graph = get_graph(spec)
+  parents: Dict[int, List[int]] = {}
+  for module, deps in enumerate(graph):
+    for dep in deps:
+      parents.setdefault(dep, []).append(module)
+
+  if p.exists(project_dir):
+    shutil.rmtree(project_dir)
+  os.makedirs(project_dir)
+  with open(p.join(project_dir, 'jxa.json'), 'w') as f:
+    json.dump({'main': 'src/index.js', 'version': '1.0.0'}, f)
+
+  ## Module -> directory of its source, and package directories of the
+  ## modules that are packages
+  source_dirs = {0: p.join(project_dir, 'src')}
+  package_dirs = {0: project_dir}
+  layouts = LAYOUTS[:-1]
+  for module in range(1, len(graph)):
+    layout = rng.choice(layouts) if spec.layout == 'mixed' else spec.layout
+    ## A shared module has to be found from all the modules that use it,
+    ## a nested one is only looked up in the node_modules of a package
+    if layout == 'nested' and (len(parents[module]) > 1
+                               or parents[module][0] not in package_dirs):
+      layout = 'node_modules'
+    if layout == 'local':
+      ## Next to the source of the module that uses it first
+      source_dirs[module] = source_dirs[parents[module][0]]
+      if len(parents[module]) > 1:
+        source_dirs[module] = p.join(project_dir, 'dependencies')
+    else:
+      if layout == 'nested':
+        base = p.join(package_dirs[parents[module][0]], 'node_modules')
+      else:
+        base = p.join(project_dir, layout)
+      package_dirs[module] = p.join(base, f'm{module}')
+      source_dirs[module] = package_dirs[module]
+      os.makedirs(package_dirs[module], exist_ok=True)
+      with open(p.join(package_dirs[module], 'package.json'), 'w') as f:
+        json.dump(
+            {
+                'name': f'm{module}',
+                'version': f'1.{module}.0',
+                'main': 'index.js'
+            }, f)
+
+  for module, deps in enumerate(graph):
+    if module == 0:
+      source = p.join(source_dirs[0], 'index.js')
+    elif module in package_dirs:
+      source = p.join(source_dirs[module], 'index.js')
+    else:
+      source = p.join(source_dirs[module], f'm{module}.js')
+    os.makedirs(p.dirname(source), exist_ok=True)
+    with open(source, 'w') as f:
+      f.write(get_code(module, [f'm{d}' for d in deps], spec.file_kb))
+
+  ## Like sources edited a while ago, files modified just before a build
+  ## are not trusted by the caches (see RACY_WINDOW_NS)
+  mtime = time.time() - 60
+  for root, _, files in os.walk(project_dir):
+    for file in files:
+      os.utime(p.join(root, file), (mtime, mtime))
+  return p.join(project_dir, 'src', 'index.js')
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+  defaults = ProjectSpec()
+  parser.add_argument('--modules', type=int, default=defaults.modules)
+  parser.add_argument('--depth', type=int, default=defaults.depth)
+  parser.add_argument('--fan-out', type=int, default=defaults.fan_out)
+  parser.add_argument('--diamond', type=float, default=defaults.diamond)
+  parser.add_argument('--file-kb', type=float, default=defaults.file_kb)
+  parser.add_argument('--layout', choices=LAYOUTS, default=defaults.layout)
+  parser.add_argument('--seed', type=int, default=defaults.seed)
+
+
+def get_spec(args: argparse.Namespace) -> ProjectSpec:
+  return ProjectSpec(**{k: getattr(args, k) for k in asdict(ProjectSpec())})
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('project_dir')
+  add_spec_arguments(parser)
+  args = parser.parse_args()
+  generate_project(args.project_dir, get_spec(args))
+
+
+if __name__ == '__main__':
+  main()
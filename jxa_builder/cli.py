@@ -1,11 +1,55 @@
+import importlib
+from typing import List, Optional
+from jxa_builder.core.constants import IS_RICH
 from jxa_builder.utils.click_importer import click
-from jxa_builder.commands.build import build
-from jxa_builder.commands.install import install
-from jxa_builder.commands.uninstall import uninstall
-from jxa_builder.commands.freeze_nodejs_deps import freeze_nodejs_deps
+
+## Command name -> module and attribute of the command, and its short help.
+## Commands are imported when they are run, so a command doesn't pay for
+## the dependencies of the others (and listing them imports none of them)
+COMMANDS = {
+    'build': ('jxa_builder.commands.build:build', 'Build the project.'),
+    'install': ('jxa_builder.commands.install:install',
+                'Copy compiled files to appropriate locations.'),
+    'uninstall': ('jxa_builder.commands.uninstall:uninstall',
+                  'Delete the target and its dependencies.'),
+    'freeze-nodejs-deps':
+    ('jxa_builder.commands.freeze_nodejs_deps:freeze_nodejs_deps',
+     'Copy nodejs dependencies to the dependencies directory.'),
+    'watch': ('jxa_builder.commands.watch:watch',
+              'Build the project and rebuild it on changes.'),
+    'daemon':
+    ('jxa_builder.commands.daemon:daemon', 'Manage the build daemon.'),
+    'cache': ('jxa_builder.commands.cache:cache',
+              'Manage the compiled artifact cache.'),
+    'graph': ('jxa_builder.commands.graph:graph',
+              'Show the dependency graph with size and cost metrics.'),
+}
+
+
+class LazyGroup(click.RichGroup if IS_RICH else click.Group):
+
+  def list_commands(self, ctx: click.Context) -> List[str]:
+    return sorted(set(super().list_commands(ctx)) | set(COMMANDS))
+
+  def get_command(self, ctx: click.Context,
+                  cmd_name: str) -> Optional[click.Command]:
+    """Get a command to list, commands that aren't loaded are stood in for"""
+    if cmd_name in COMMANDS and cmd_name not in self.commands:
+      return click.Command(cmd_name, short_help=COMMANDS[cmd_name][1])
+    return super().get_command(ctx, cmd_name)
+
+  def resolve_command(self, ctx: click.Context, args: List[str]):
+    """Load the command that is about to run"""
+    cmd_name = args[0] if args else None
+    if cmd_name in COMMANDS and cmd_name not in self.commands:
+      module, attr = COMMANDS[cmd_name][0].split(':')
+      self.add_command(getattr(importlib.import_module(module), attr),
+                       cmd_name)
+    return super().resolve_command(ctx, args)
 
 
 @click.group(
+    cls=LazyGroup,
     context_settings=dict(help_option_names=["-h", "--help"]),
     help=
     'A build system for Javascript for Automation.\n\nTo turn on classic display mode set JXA_BUILDER_CLASSIC_DISPLAY_MODE env variable to true.'
@@ -14,10 +58,5 @@ def cli():
   pass
 
 
-cli.add_command(build)
-cli.add_command(install)
-cli.add_command(uninstall)
-cli.add_command(freeze_nodejs_deps)
-
 if __name__ == "__main__":
   cli()
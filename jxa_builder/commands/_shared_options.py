@@ -1,4 +1,5 @@
 from os import getcwd
+from typing import Callable
 from jxa_builder.utils.click_importer import click
 import jxa_builder.utils.logger as logger
 from logging import DEBUG
@@ -7,6 +8,7 @@ from logging import DEBUG
 def set_debug(_, __, value):
   if value:
     logger.shell_handler.setLevel(DEBUG)
+    logger.update_level()
 
 
 debug_option = click.option(
@@ -19,9 +21,140 @@ debug_option = click.option(
 
 project_dir_option = click.option(
     '--project-dir',
-    default=getcwd(),
+    default=getcwd,
     show_default='current directory',
     type=click.Path(exists=True, file_okay=False, dir_okay=True),
     help=
     'Working directory. Place where the project is located. Defaults to the current directory'
 )
+
+no_cache_option = click.option(
+    '--no-cache',
+    is_flag=True,
+    default=False,
+    help=
+    'Ignore the scan cache stored in the build directory and rescan all sources'
+)
+
+fingerprint_option = click.option(
+    '--fingerprint',
+    type=click.Choice(['stat', 'content']),
+    default='stat',
+    show_default=True,
+    help=
+    'How to detect changed files. "stat" compares size and modification time, "content" also compares content hashes when they differ (e.g. after a fresh checkout)'
+)
+
+
+def apply_options(*options: Callable) -> Callable:
+  """Combine click options into one decorator"""
+
+  def decorator(f: Callable) -> Callable:
+    for option in reversed(options):
+      f = option(f)
+    return f
+
+  return decorator
+
+
+profile_options = apply_options(
+    click.option(
+        '--profile',
+        is_flag=True,
+        default=False,
+        help=
+        'Record how long each step takes, write a Chrome trace (build/profile/trace.json, open it in https://ui.perfetto.dev) and print a summary'
+    ),
+    click.option(
+        '--cprofile',
+        is_flag=True,
+        default=False,
+        help=
+        'Like --profile, and also profile the main thread with cProfile (build/profile/cprofile.prof)'
+    ),
+)
+
+# TODO: generate these options from the project config model
+project_config_options = apply_options(
+    click.option(
+        '--comp-mode',
+        type=click.Choice(['app', 'script']),
+        show_default='app',
+        help=
+        'Whether to compile the main source to a standalone app (e.g. applet/droplet) or a script'
+    ),
+    click.option(
+        '--bundle/--no-bundle',
+        default=None,
+        show_default='no-bundle',
+        help=
+        'Whether to inline all dependencies into the main source, so it is compiled to a single file that does not load libraries at run time'
+    ),
+    click.option(
+        '--minify/--no-minify',
+        default=None,
+        show_default='no-minify',
+        help=
+        'Whether to strip comments and whitespace from sources (and shorten local names when calmjs.parse is installed) before compiling them'
+    ),
+    click.option(
+        '--deps-install-mode',
+        type=click.Choice(['app', 'user', 'system']),
+        show_default='app',
+        help=
+        'Where to install dependencies. If the main file is compiled to a standalone app one can embed them inside. Otherwise they can be installed for a current user, or system wide'
+    ),
+    click.option('--version',
+                 show_default='1.0.0',
+                 help='Version of the project'),
+    click.option('--main', show_default='index.js', help='Main source file'),
+    click.option(
+        '--app-name',
+        show_default='out',
+        help='App name, (has effect only when compiling to a standalone app)'),
+    click.option(
+        '--app-icon',
+        help=
+        'By default the builder searches for "icon.icns" or "<app-name>.icns" in the project directory. If none of them is found and this option is left empty, the default icon is used (has effect only when compiling to a standalone app)'
+    ),
+)
+
+build_options = apply_options(
+    click.option(
+        '--force',
+        is_flag=True,
+        default=False,
+        help='Recompile all units, even the ones that are up to date'),
+    click.option('-j',
+                 '--jobs',
+                 type=click.IntRange(min=1),
+                 show_default='number of CPUs',
+                 help='Number of units compiled in parallel'),
+    click.option(
+        '--compiler',
+        default='osacompile',
+        show_default=True,
+        envvar='JXA_BUILDER_COMPILER',
+        help=
+        'Compiler command used by the process backend, osacompile arguments are appended to it. Can also be set with JXA_BUILDER_COMPILER env variable'
+    ),
+    click.option(
+        '--compiler-backend',
+        type=click.Choice(['process', 'server', 'fake']),
+        default='process',
+        show_default=True,
+        envvar='JXA_BUILDER_COMPILER_BACKEND',
+        help=
+        '"process" runs the compiler per unit, "server" compiles scripts in long-lived osascript processes, "fake" only copies sources (for benchmarks and CI on other systems)'
+    ),
+    no_cache_option,
+    fingerprint_option,
+    click.option(
+        '--no-artifact-cache',
+        is_flag=True,
+        default=False,
+        envvar='JXA_BUILDER_NO_ARTIFACT_CACHE',
+        help=
+        'Compile every unit instead of reusing compiled artifacts from the user cache (~/Library/Caches/jxa-builder). Can also be set with JXA_BUILDER_NO_ARTIFACT_CACHE env variable'
+    ),
+)
@@ -0,0 +1,45 @@
+from typing import Optional
+from jxa_builder.utils.click_importer import click
+from jxa_builder.core.artifact_cache import get_artifact_cache, CACHE_DIR_ENV, CACHE_MAX_MB_ENV
+from jxa_builder.utils.format_size import format_size
+from ._shared_options import debug_option
+
+
+@click.group(
+    short_help='Manage the compiled artifact cache.',
+    help=
+    f'Manage the compiled artifact cache. Compiled scripts are cached by a hash of their preprocessed source and the compiler, so builds of any project or checkout reuse them. The directory and the size cap can be set with {CACHE_DIR_ENV} and {CACHE_MAX_MB_ENV} env variables.'
+)
+def cache():
+  pass
+
+
+@cache.command(help='Show the size of the cache.')
+@debug_option
+def stats():
+  cache_stats = get_artifact_cache().get_stats()
+  print(f'directory: {cache_stats["directory"]}')
+  print(f'artifacts: {cache_stats["artifacts"]}')
+  print(
+      f'size: {format_size(cache_stats["size"])} of {format_size(cache_stats["max_size"])}'
+  )
+
+
+@cache.command(
+    help=
+    'Evict least recently used artifacts until the cache fits in its size cap.'
+)
+@click.option('--max-size',
+              type=click.FloatRange(min=0),
+              help='Size to fit in (MB) instead of the size cap')
+@click.option('--all',
+              'all_artifacts',
+              is_flag=True,
+              default=False,
+              help='Evict all artifacts')
+@debug_option
+def prune(max_size: Optional[float], all_artifacts: bool):
+  max_bytes = 0 if all_artifacts else None if max_size is None else int(
+      max_size * 1024 * 1024)
+  removed, freed = get_artifact_cache().prune(max_bytes)
+  print(f'Evicted {removed} artifact(s), {format_size(freed)}')
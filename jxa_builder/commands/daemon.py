@@ -0,0 +1,94 @@
+from os import getcwd, path as p
+from jxa_builder.utils.click_importer import click
+from jxa_builder.core.constants import DAEMON_IDLE_TIMEOUT, DAEMON_SOCKET_FILE_ABS
+from jxa_builder.core.daemon_client import send_command, spawn_daemon
+from jxa_builder.utils.printit import log_print_error
+from ._shared_options import debug_option
+
+idle_timeout_option = click.option(
+    '--idle-timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    default=DAEMON_IDLE_TIMEOUT,
+    show_default=True,
+    help='Stop the daemon after this many seconds without requests')
+
+
+@click.group(
+    short_help='Manage the build daemon.',
+    help=
+    'Manage the build daemon. While it runs, build, install and uninstall commands are sent to it, so they skip the start-up and reuse configs, dependency graphs and build manifests of earlier builds. Set JXA_BUILDER_NO_DAEMON env variable to true to bypass it.'
+)
+def daemon():
+  pass
+
+
+@daemon.command(help='Start the daemon in the background.')
+@idle_timeout_option
+@debug_option
+def start(idle_timeout: float):
+  if send_command('status'):
+    print('The daemon is already running')
+    return
+  if not spawn_daemon(idle_timeout):
+    log_print_error('Cannot start the daemon, see the log file for details')
+    exit(1)
+  print(f'The daemon is listening on {DAEMON_SOCKET_FILE_ABS}')
+
+
+@daemon.command(help='Run the daemon in the foreground.')
+@idle_timeout_option
+@debug_option
+def run(idle_timeout: float):
+  from jxa_builder.core.daemon import Daemon
+  try:
+    Daemon(idle_timeout=idle_timeout).serve()
+  except Exception as e:
+    log_print_error(f'Cannot run the daemon: {e}')
+    exit(1)
+
+
+@daemon.command(help='Stop the daemon.')
+@debug_option
+def stop():
+  if send_command('stop') is None:
+    print('The daemon is not running')
+
+
+@daemon.command(help='Show whether the daemon is running and what it keeps.')
+@debug_option
+def status():
+  response = send_command('status')
+  if response is None:
+    print('The daemon is not running')
+    return
+  if 'fallback' in response:
+    print('A daemon of another jxa-builder installation is running')
+    return
+  print(f'pid: {response["pid"]}')
+  print(f'uptime: {response["uptime"]:.0f}s')
+  print(f'requests: {response["requests"]}')
+  print('projects:')
+  for project in response['projects']:
+    print(f'  {project}')
+
+
+@daemon.command(
+    help=
+    'Make the daemon forget what it knows about a project, so the next build starts cold.'
+)
+@click.option('--project-dir',
+              type=click.Path(exists=True, file_okay=False, dir_okay=True),
+              help='Project to forget, defaults to the current directory')
+@click.option('--all',
+              'all_projects',
+              is_flag=True,
+              default=False,
+              help='Forget all projects')
+@debug_option
+def invalidate(project_dir: str, all_projects: bool):
+  if not project_dir and not all_projects:
+    project_dir = getcwd()
+  if send_command(
+      'invalidate',
+      project_dir=p.abspath(project_dir) if project_dir else None) is None:
+    print('The daemon is not running')
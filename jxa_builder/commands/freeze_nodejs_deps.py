@@ -1,12 +1,10 @@
-import os
 from os import path as p
-import shutil
-from jxa_builder.core.get_dependency_modules import get_dependency_modules
-from jxa_builder.core.get_project_config import get_project_config
-from jxa_builder.core.constants import DEPS_DIR, NODE_DIR
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+from jxa_builder.core.freeze_deps import freeze_dependencies
+from jxa_builder.core.scan_cache import ScanCache
+from jxa_builder.core.constants import SCAN_CACHE_FILE, FROZEN_STATE_FILE
 from jxa_builder.utils.click_importer import click
-from jxa_builder.utils.printit import log_print_error
-from jxa_builder.commands._shared_options import debug_option, project_dir_option
+from jxa_builder.commands._shared_options import debug_option, project_dir_option, no_cache_option, fingerprint_option
 
 
 @click.command(
@@ -14,27 +12,16 @@ from jxa_builder.commands._shared_options import debug_option, project_dir_optio
     'Copy nodejs dependencies to the dependencies directory. It is useful when the target needs to be built on a machine without nodejs installed.'
 )
 @project_dir_option
+@no_cache_option
+@fingerprint_option
 @debug_option
-def freeze_nodejs_deps(project_dir: str):
-  jxa_config = get_project_config(project_dir)
+def freeze_nodejs_deps(project_dir: str, no_cache: bool, fingerprint: str):
+  scan_cache = None if no_cache else ScanCache.load(
+      p.join(project_dir, SCAN_CACHE_FILE), fingerprint)
+  resolver = DependencyResolver(project_dir, scan_cache)
+  dependency_modules = resolver.resolve()
+  if scan_cache:
+    scan_cache.save()
 
-  dependency_modules = get_dependency_modules(project_dir)
-
-  if freeze_nodejs_deps:
-    for dep in dependency_modules:
-      try:
-        if NODE_DIR in dep.source and p.exists(dep.source):
-          node_modules = p.join(jxa_config.project_dir, NODE_DIR)
-          for root, dirs, _ in os.walk(node_modules):
-            for d in dirs:
-              if d == dep.name:
-                shutil.copytree(p.join(root, d),
-                                p.join(jxa_config.project_dir, DEPS_DIR,
-                                       dep.name),
-                                dirs_exist_ok=True)
-                break
-          if not p.exists(p.join(jxa_config.project_dir, DEPS_DIR)):
-            os.makedirs(p.join(jxa_config.project_dir, DEPS_DIR))
-      except Exception as e:
-        log_print_error(f'Cannot copy nodejs dependency: {dep}: {e}')
-        exit(1)
+  freeze_dependencies(project_dir, dependency_modules, resolver.package_paths,
+                      p.join(project_dir, FROZEN_STATE_FILE))
@@ -0,0 +1,82 @@
+import json
+from os import path as p
+from typing import Optional
+from jxa_builder.core.models import Module, CompilationUnit
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+from jxa_builder.core.get_project_config import get_project_config
+from jxa_builder.core.build_manifest import BuildManifest
+from jxa_builder.core.scan_cache import ScanCache
+from jxa_builder.core.graph_metrics import get_graph, to_dot, to_json, print_report
+from jxa_builder.core.constants import SCAN_CACHE_FILE, LOCATIONS_FILE, BUILD_MANIFEST_FILE
+from jxa_builder.utils.click_importer import click
+from jxa_builder.utils.printit import log_print_error
+from jxa_builder.commands._shared_options import debug_option, project_dir_option, no_cache_option, fingerprint_option
+
+
+@click.command(
+    help=
+    'Show the dependency graph with sizes (source, preprocessed, compiled), compile times and transitive closures of the modules. Duplicated libraries, the heaviest subtrees and the slowest unit are reported. Sizes and times of the compiled units are known after a build.'
+)
+@project_dir_option
+@click.option('--format',
+              'output_format',
+              type=click.Choice(['json', 'dot']),
+              default='json',
+              show_default=True,
+              help='Format of the exported graph')
+@click.option(
+    '-o',
+    '--output',
+    type=click.Path(dir_okay=False, writable=True),
+    help=
+    'File to export the graph to, the report is printed instead (defaults to printing the graph)'
+)
+@click.option('--top',
+              type=click.IntRange(min=1),
+              default=5,
+              show_default=True,
+              help='Number of the heaviest subtrees to report')
+@no_cache_option
+@fingerprint_option
+@debug_option
+def graph(project_dir: str, output_format: str, output: Optional[str],
+          top: int, no_cache: bool, fingerprint: str):
+  jxa_config = get_project_config(project_dir)
+  main_module = Module(
+      name=jxa_config.app_name if jxa_config.comp_mode == 'app' else 'main',
+      source=p.join(project_dir, jxa_config.main),
+      version=jxa_config.version)
+  scan_cache = None if no_cache else ScanCache.load(
+      p.join(project_dir, SCAN_CACHE_FILE), fingerprint)
+  modules = DependencyResolver(project_dir,
+                               scan_cache).resolve(main_module.source)
+  if scan_cache:
+    scan_cache.save()
+
+  units = []
+  locations_file = p.join(project_dir, LOCATIONS_FILE)
+  if p.exists(locations_file):
+    try:
+      with open(locations_file) as f:
+        units = [CompilationUnit(**u) for u in json.load(f)]
+    except Exception as e:
+      log_print_error(f'Cannot read "{locations_file}": {e}')
+      exit(1)
+  durations = BuildManifest.load(p.join(project_dir,
+                                        BUILD_MANIFEST_FILE)).durations
+
+  dependency_graph = get_graph(project_dir, main_module, modules, units,
+                               durations, top)
+  exported = to_dot(dependency_graph) if output_format == 'dot' else to_json(
+      dependency_graph)
+  if not output:
+    print(exported, end='' if exported.endswith('\n') else '\n')
+    return
+  try:
+    with open(output, 'w') as f:
+      f.write(exported)
+  except Exception as e:
+    log_print_error(f'Cannot write the graph: {e}')
+    exit(1)
+  print_report(dependency_graph)
+  print(f'Graph written to {output}')
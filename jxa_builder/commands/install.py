@@ -1,26 +1,31 @@
 from os import getcwd, path as p
 from jxa_builder.utils.click_importer import click
 from jxa_builder.core.manage_outputs import manage_outputs
-from ._shared_options import debug_option
-from jxa_builder.core.constants import LOCATIONS_FILE
+from ._shared_options import debug_option, profile_options
+from jxa_builder.core.tracing import tracing
+from jxa_builder.core.constants import LOCATIONS_FILE, PROFILE_DIR
 
 
-@click.command(help='Copy compiled files to appropriate locations.')
+@click.command(
+    help=
+    'Copy compiled files to appropriate locations. Libraries in the shared Script Libraries directories are reference counted by project: installing another build of a library that other projects use (same name and version, different content) replaces it with a warning, and it is removed only when none of them uses it anymore.'
+)
 @click.option('--path',
               type=click.Path(exists=True),
-              default=getcwd(),
+              default=getcwd,
+              show_default='current directory',
               help='Path to the project directory or the locations.json file')
 @click.option('--deps-only',
               is_flag=True,
               default=False,
               help='Whether to install only the dependencies')
+@profile_options
 @debug_option
-def install(path: str, deps_only: bool):
+def install(path: str, deps_only: bool, profile: bool, cprofile: bool):
   """path: Path to the project directory or locations file"""
   print(f"{path}")
-  if p.isfile(path):
-    manage_outputs('install', path, deps_only=deps_only)
-  elif p.isdir(path):
-    manage_outputs('install',
-                   p.join(path, LOCATIONS_FILE),
-                   deps_only=deps_only)
+  locations_file = path if p.isfile(path) else p.join(path, LOCATIONS_FILE)
+  with tracing(p.join(p.dirname(locations_file), p.basename(PROFILE_DIR)),
+               enabled=profile or cprofile,
+               cprofile=cprofile):
+    manage_outputs('install', locations_file, deps_only=deps_only)
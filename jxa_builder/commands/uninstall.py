@@ -1,20 +1,24 @@
 from os import getcwd, path as p
 from jxa_builder.utils.click_importer import click
 from jxa_builder.core.manage_outputs import manage_outputs
-from ._shared_options import debug_option
-from jxa_builder.core.constants import LOCATIONS_FILE
+from ._shared_options import debug_option, profile_options
+from jxa_builder.core.tracing import tracing
+from jxa_builder.core.constants import LOCATIONS_FILE, PROFILE_DIR
 
 
 @click.command(help='Delete the target and its dependencies.')
 @click.option('--path',
               type=click.Path(exists=True),
-              default=getcwd(),
+              default=getcwd,
+              show_default='current directory',
               help='Path to the project directory or the locations.json file')
+@profile_options
 @debug_option
-def uninstall(path: str):
+def uninstall(path: str, profile: bool, cprofile: bool):
   """path: Path to the project directory or locations file"""
   print(f"{path}")
-  if p.isfile(path):
-    manage_outputs('uninstall', path, False)
-  elif p.isdir(path):
-    manage_outputs('uninstall', p.join(path, LOCATIONS_FILE), False)
+  locations_file = path if p.isfile(path) else p.join(path, LOCATIONS_FILE)
+  with tracing(p.join(p.dirname(locations_file), p.basename(PROFILE_DIR)),
+               enabled=profile or cprofile,
+               cprofile=cprofile):
+    manage_outputs('uninstall', locations_file, False)
@@ -0,0 +1,73 @@
+import time
+from logging import DEBUG
+from typing import Optional
+from jxa_builder.core.build_project import ProjectBuilder, BuildOptions
+from jxa_builder.core.watcher import get_watcher
+from jxa_builder.utils.click_importer import click
+from jxa_builder.utils.logger import logger
+from jxa_builder.commands.build import get_overrides
+from jxa_builder.commands._shared_options import debug_option, project_dir_option, project_config_options, build_options
+
+
+def run_build(builder: ProjectBuilder) -> bool:
+  """Build and report how long it took, returns whether the build succeeded"""
+  start = time.perf_counter()
+  try:
+    compiled = builder.build()
+  except SystemExit:
+    ## The error is already reported, keep watching
+    print(f'Build failed after {time.perf_counter() - start:.3f}s')
+    return False
+  print(
+      f'Build done in {time.perf_counter() - start:.3f}s ({len(compiled)} unit(s) compiled)'
+  )
+  return True
+
+
+@click.command(
+    help=
+    'Build the project and rebuild it whenever a source, a config or a dependency changes.'
+)
+@project_dir_option
+@project_config_options
+@build_options
+@click.option(
+    '--poll-interval',
+    type=click.FloatRange(min=0, min_open=True),
+    help=
+    'Check for changes every given number of seconds instead of using file system events (used anyway when watchdog is not installed)'
+)
+@click.option('--debounce',
+              type=click.FloatRange(min=0),
+              default=0.1,
+              show_default=True,
+              help='Seconds without further changes to wait before rebuilding')
+@debug_option
+def watch(force: bool, jobs: Optional[int], compiler: str,
+          compiler_backend: str, no_cache: bool, fingerprint: str,
+          no_artifact_cache: bool, poll_interval: Optional[float],
+          debounce: float, **kwargs):
+  builder = ProjectBuilder(
+      kwargs['project_dir'], get_overrides(kwargs),
+      BuildOptions(force=force,
+                   jobs=jobs,
+                   compiler=compiler,
+                   compiler_backend=compiler_backend,
+                   no_cache=no_cache,
+                   fingerprint=fingerprint,
+                   artifact_cache=not no_artifact_cache))
+  watcher = get_watcher(debounce, poll_interval)
+  try:
+    run_build(builder)
+    while True:
+      watcher.watch(*builder.get_watched_paths())
+      print(f'Watching for changes ({watcher.name})...')
+      changed = watcher.wait()
+      if logger.isEnabledFor(DEBUG):
+        logger.debug('Changed paths: %s', sorted(changed))
+      builder.invalidate(changed)
+      run_build(builder)
+  except KeyboardInterrupt:
+    pass
+  finally:
+    watcher.close()
@@ -0,0 +1,146 @@
+import os
+from os import path as p
+import sys
+import ctypes
+import hashlib
+import shutil
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from jxa_builder.core.models import CompilationUnit
+from jxa_builder.core.constants import CACHE_DIR_ABS, ARTIFACT_CACHE_MAX_MB
+from jxa_builder.utils.logger import logger
+
+## Bump whenever the key or the layout of the cache changes
+ARTIFACT_CACHE_VERSION = 1
+## Applets are modified after compilation (and are directories), only
+## script outputs are cached
+CACHED_SUFFIXES = ('.scpt', )
+CACHE_DIR_ENV = 'JXA_BUILDER_CACHE_DIR'
+CACHE_MAX_MB_ENV = 'JXA_BUILDER_CACHE_MAX_MB'
+
+
+@lru_cache(maxsize=None)
+def _get_clonefile():
+  try:
+    return ctypes.CDLL(None, use_errno=True).clonefile
+  except (OSError, AttributeError):
+    return None
+
+
+def clone_file(source: str, dest: str):
+  """Copy the file, as a copy-on-write clone where the file system supports it (APFS)"""
+  clonefile = _get_clonefile() if sys.platform == 'darwin' else None
+  if clonefile and clonefile(os.fsencode(source), os.fsencode(dest), 0) == 0:
+    return
+  shutil.copy2(source, dest)
+
+
+class ArtifactCache:
+  """
+  Compiled outputs shared by all projects and checkouts of the user, keyed
+  by a hash of what they're compiled from: the content of the unit input
+  (preprocessing is deterministic, so a fresh checkout gives the same one),
+  the compiler identity and the output type.
+
+  Recently used artifacts are kept up to the size cap, the rest is evicted.
+  """
+
+  def __init__(self, cache_dir: str, max_bytes: int):
+    self.cache_dir = cache_dir
+    self.artifacts_dir = p.join(cache_dir, 'artifacts')
+    self.max_bytes = max_bytes
+
+  def get_key(self, unit: CompilationUnit,
+              compiler_identity: str) -> Optional[str]:
+    """Get the key of the unit's output, None if it isn't cached"""
+    suffix = p.splitext(unit.output_path)[1]
+    if suffix not in CACHED_SUFFIXES:
+      return None
+    h = hashlib.sha256(
+        f'{ARTIFACT_CACHE_VERSION}\0{compiler_identity}\0{suffix}\0'.encode())
+    with open(unit.input_path, 'rb') as f:
+      h.update(f.read())
+    return h.hexdigest() + suffix
+
+  def _get_path(self, key: str) -> str:
+    return p.join(self.artifacts_dir, key[:2], key)
+
+  def restore(self, key: str, dest: str) -> bool:
+    """Copy the cached artifact to dest, returns whether it was cached"""
+    path = self._get_path(key)
+    try:
+      clone_file(path, dest)
+      ## Keeps it from being evicted
+      os.utime(path)
+    except OSError:
+      return False
+    return True
+
+  def store(self, key: str, output: str):
+    path = self._get_path(key)
+    try:
+      os.makedirs(p.dirname(path), exist_ok=True)
+      tmp_file = f'{path}.{os.getpid()}.tmp'
+      clone_file(output, tmp_file)
+      os.replace(tmp_file, path)
+    except OSError as e:
+      logger.warning('Cannot store a compiled artifact in the cache: %s', e)
+
+  def _get_entries(self) -> List[Tuple[float, int, str]]:
+    """(last use, size, path) of the artifacts"""
+    entries = []
+    try:
+      shards = list(os.scandir(self.artifacts_dir))
+    except OSError:
+      return entries
+    for shard in shards:
+      try:
+        for entry in os.scandir(shard.path):
+          st = entry.stat()
+          entries.append((st.st_mtime, st.st_size, entry.path))
+      except OSError:
+        continue
+    return entries
+
+  def get_stats(self) -> Dict[str, Any]:
+    entries = self._get_entries()
+    return {
+        'directory': self.cache_dir,
+        'artifacts': len(entries),
+        'size': sum(e[1] for e in entries),
+        'max_size': self.max_bytes,
+    }
+
+  def prune(self, max_bytes: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Evict least recently used artifacts until the cache fits in max_bytes
+    (the size cap by default). Returns the number of evicted artifacts and
+    their size.
+    """
+    max_bytes = self.max_bytes if max_bytes is None else max_bytes
+    entries = sorted(self._get_entries())
+    size = sum(e[1] for e in entries)
+    removed = freed = 0
+    for _, entry_size, path in entries:
+      if size <= max_bytes:
+        break
+      try:
+        os.remove(path)
+      except OSError as e:
+        logger.debug('Cannot evict a cached artifact %s: %s', path, e)
+        continue
+      size -= entry_size
+      removed += 1
+      freed += entry_size
+    return removed, freed
+
+
+def get_artifact_cache() -> ArtifactCache:
+  """Get the cache, its directory and size cap can be set with env variables"""
+  try:
+    max_mb = float(os.environ.get(CACHE_MAX_MB_ENV, ARTIFACT_CACHE_MAX_MB))
+  except ValueError:
+    logger.warning('Invalid %s, using the default size cap', CACHE_MAX_MB_ENV)
+    max_mb = ARTIFACT_CACHE_MAX_MB
+  return ArtifactCache(os.environ.get(CACHE_DIR_ENV, CACHE_DIR_ABS),
+                       int(max_mb * 1024 * 1024))
@@ -0,0 +1,131 @@
+import os
+from os import path as p
+import json
+import time
+from typing import Dict, List, Optional, Any
+from jxa_builder.core.constants import RACY_WINDOW_NS
+from jxa_builder.core.scan_cache import Fingerprint
+from jxa_builder.core.models import CompilationUnit
+from jxa_builder.utils.hash_file import hash_file
+from jxa_builder.utils.logger import logger
+
+## Bump whenever the fingerprint layout or the compilation rules change
+BUILD_MANIFEST_VERSION = 2
+
+
+def get_file_fingerprint(file_path: str,
+                         fingerprint: Fingerprint) -> Dict[str, Any]:
+  if fingerprint == 'content':
+    return {'hash': hash_file(file_path)}
+  st = os.stat(file_path)
+  return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def get_unit_fingerprint(source: str, preprocessed_source: str,
+                         fingerprint: Fingerprint, dependencies: List[str],
+                         **config: Any) -> Dict[str, Any]:
+  """
+  Get everything a compiled unit depends on.
+
+  The preprocessed source only differs from the original one by the rewritten
+  Library() names, so with the 'stat' fingerprint the original source stat
+  plus the versioned names of the dependencies describe it completely.
+  """
+  return {
+      'source':
+      get_file_fingerprint(
+          preprocessed_source if fingerprint == 'content' else source,
+          fingerprint),
+      'dependencies':
+      sorted(dependencies),
+      'config':
+      config,
+  }
+
+
+class BuildManifest:
+  """
+  Fingerprints of the compiled units and the state of the preprocessed mirror,
+  stored in the build directory
+  """
+
+  def __init__(self, manifest_file: str):
+    self.manifest_file = manifest_file
+    ## output path -> fingerprint
+    self.units: Dict[str, Dict[str, Any]] = {}
+    ## output path -> last compilation time in seconds
+    self.durations: Dict[str, float] = {}
+    ## mirror file -> how it was synced, see sync_mirror
+    self.mirror: Dict[str, Dict[str, Any]] = {}
+    self._written_ns = 0
+
+  @classmethod
+  def load(cls, manifest_file: str) -> 'BuildManifest':
+    manifest = cls(manifest_file)
+    if not p.isfile(manifest_file):
+      return manifest
+    try:
+      with open(manifest_file, 'r') as f:
+        data = json.load(f)
+      if data.get('version') != BUILD_MANIFEST_VERSION:
+        logger.debug('Discarding build manifest with other version: %s',
+                     manifest_file)
+        return manifest
+      manifest.units = data['units']
+      manifest.durations = data['durations']
+      manifest.mirror = data['mirror']
+      manifest._written_ns = data['written_ns']
+    except Exception as e:
+      logger.debug('Discarding unreadable build manifest %s: %s',
+                   manifest_file, e)
+    return manifest
+
+  def save(self):
+    self._written_ns = time.time_ns()
+    data = {
+        'version': BUILD_MANIFEST_VERSION,
+        'written_ns': self._written_ns,
+        'units': self.units,
+        'durations': self.durations,
+        'mirror': self.mirror,
+    }
+    try:
+      os.makedirs(p.dirname(self.manifest_file), exist_ok=True)
+      tmp_file = self.manifest_file + '.tmp'
+      with open(tmp_file, 'w') as f:
+        json.dump(data, f, indent=2)
+      os.replace(tmp_file, self.manifest_file)
+    except Exception as e:
+      logger.warning('Cannot write the build manifest %s: %s',
+                     self.manifest_file, e)
+
+  def is_up_to_date(self, output_path: str, fingerprint: Dict[str,
+                                                              Any]) -> bool:
+    if self.units.get(output_path) != fingerprint:
+      return False
+    mtime_ns: Optional[int] = fingerprint['source'].get('mtime_ns')
+    if mtime_ns is not None and self.is_racy(mtime_ns):
+      return False
+    return p.exists(output_path)
+
+  def is_racy(self, mtime_ns: int) -> bool:
+    """Whether a file with this mtime may have changed after the manifest was saved without changing its stat"""
+    return mtime_ns >= self._written_ns - RACY_WINDOW_NS
+
+  def update(self, output_path: str, fingerprint: Dict[str, Any]):
+    self.units[output_path] = fingerprint
+
+  def remove(self, output_path: str):
+    self.units.pop(output_path, None)
+
+  def get_costs(self, units: List[CompilationUnit]) -> Dict[str, float]:
+    """
+    Estimate compilation cost of the units by their last compilation time.
+    If some unit hasn't been compiled yet, sizes of the inputs are used instead.
+    """
+    if all(u.output_path in self.durations for u in units):
+      return {u.output_path: self.durations[u.output_path] for u in units}
+    return {
+        u.output_path: p.getsize(u.input_path) if p.exists(u.input_path) else 0
+        for u in units
+    }
@@ -0,0 +1,522 @@
+import os
+from os import path as p
+import shutil
+import json
+import threading
+from logging import DEBUG
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from jxa_builder.core.models import Module, CompilationUnit, LoadedPropInfo
+from jxa_builder.core.config_model import JxaProjectConfig
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+from jxa_builder.core.search_paths import get_ancestor_node_dirs, get_global_node_dirs
+from jxa_builder.core.get_project_config import get_project_config
+from jxa_builder.core.modify_app_internals import modify_app_internals
+from jxa_builder.core.sync_mirror import sync_mirror
+from jxa_builder.core.bundle import write_bundle
+from jxa_builder.core.minify import minify_sources
+from jxa_builder.core.scan_cache import ScanCache, Fingerprint
+from jxa_builder.core.compile_units import CompilationResult, compile_units
+from jxa_builder.core.shared_outputs import SharedOutputs
+from jxa_builder.core.compiler_backends import CompilerBackend, get_compiler_backend
+from jxa_builder.core.artifact_cache import get_artifact_cache
+from jxa_builder.core.build_manifest import BuildManifest, get_file_fingerprint, get_unit_fingerprint
+from jxa_builder.core.watcher import Watcher, get_watcher
+from jxa_builder.core.tracing import span
+from jxa_builder.core.manage_outputs import is_within
+from jxa_builder.core.constants import OUTPUT_DIR, LOCATIONS_FILE, PREPROCESSED_DIR, EXTERNAL_MIRROR_DIR, BUNDLE_FILE, MINIFIED_DIR, SCAN_CACHE_FILE, BUILD_MANIFEST_FILE, APPS_DIR_ABS, APP_LIBS_DIR, USER_LIBS_DIR_ABS, SYSTEM_LIBS_DIR_ABS, DEPS_DIR, NODE_DIR, JXA_JSON_FILE, PACKAGE_JSON_FILE
+from jxa_builder.utils.logger import logger
+from jxa_builder.utils.printit import log_print_error, log_print_warning, print_block, log_print_block
+
+
+@dataclass
+class BuildOptions:
+  force: bool = False
+  jobs: Optional[int] = None
+  compiler: str = 'osacompile'
+  compiler_backend: str = 'process'
+  no_cache: bool = False
+  fingerprint: Fingerprint = 'stat'
+  artifact_cache: bool = True
+
+
+def remove_path(path: str):
+  if p.isdir(path) and not p.islink(path):
+    shutil.rmtree(path)
+  elif p.lexists(path):
+    os.remove(path)
+
+
+class ProjectBuilder:
+  """
+  Builds a project.
+
+  The dependency graph, the scan cache and the build manifest stay in memory
+  between builds, so a long-lived builder (e.g. in watch mode) only rescans
+  the files passed to `invalidate` and only recompiles units whose
+  fingerprint changed.
+  """
+
+  def __init__(self,
+               project_dir: str,
+               overrides: Optional[Dict[str, LoadedPropInfo]] = None,
+               options: Optional[BuildOptions] = None,
+               shared_resolver: Optional[DependencyResolver] = None,
+               shared_outputs: Optional[SharedOutputs] = None,
+               compile_slots: Optional[threading.Semaphore] = None):
+    ## Resolved sources are real paths, they're compared with this one
+    project_dir = p.abspath(p.realpath(project_dir))
+    self.project_dir = project_dir
+    self.overrides = overrides
+    self.options = options or BuildOptions()
+    self.scan_cache = None if self.options.no_cache else ScanCache.load(
+        p.join(project_dir, SCAN_CACHE_FILE), self.options.fingerprint)
+    self.resolver = DependencyResolver(project_dir, self.scan_cache,
+                                       shared_resolver)
+    ## Set when building with other projects (see build_workspace)
+    self.shared_outputs = shared_outputs
+    self.compile_slots = compile_slots
+    manifest_file = p.join(project_dir, BUILD_MANIFEST_FILE)
+    self.manifest = BuildManifest(
+        manifest_file) if self.options.force else BuildManifest.load(
+            manifest_file)
+    ## Set by build
+    self.jxa_config: Optional[JxaProjectConfig] = None
+    self.main_module: Optional[Module] = None
+    self.dependency_modules: List[Module] = []
+    self.comp_units: List[CompilationUnit] = []
+
+  def invalidate(self, paths: Iterable[str]):
+    """Forget what is known about changed files"""
+    self.resolver.invalidate(paths)
+
+  def get_watched_paths(self) -> Tuple[Set[str], Set[str]]:
+    """
+    Get files and directories whose changes affect the build:
+    sources, configs, and the directories libraries are searched in.
+    """
+    files = set()
+    dirs = set()
+    package_dirs = {self.project_dir}
+    ## node_modules of the ancestors and the global ones are searched too
+    node_dirs = set(get_global_node_dirs())
+    if self.jxa_config and self.jxa_config.app_icon:
+      files.add(self.jxa_config.app_icon)
+    for source, package_path in self.resolver.package_paths.items():
+      files.add(source)
+      dirs.add(p.dirname(source))
+      node_dirs.update(get_ancestor_node_dirs(p.dirname(source)))
+      if p.isdir(package_path):
+        package_dirs.add(package_path)
+    dirs.update(d for d in node_dirs if p.isdir(d))
+    for package_dir in package_dirs:
+      files.add(p.join(package_dir, JXA_JSON_FILE))
+      files.add(p.join(package_dir, PACKAGE_JSON_FILE))
+      dirs.add(package_dir)
+      for deps_dir in (DEPS_DIR, NODE_DIR):
+        if p.isdir(p.join(package_dir, deps_dir)):
+          dirs.add(p.join(package_dir, deps_dir))
+    return files, dirs
+
+  def build(self) -> List[CompilationUnit]:
+    """Build the project, returns the units that were compiled"""
+    project_dir = self.project_dir
+    options = self.options
+    manifest = self.manifest
+    with span('config'):
+      jxa_config = get_project_config(project_dir, self.overrides)
+    self.jxa_config = jxa_config
+
+    if self.main_module:
+      ## Built before, libraries may have been installed to search paths
+      ## that aren't watched since then
+      self.resolver.forget_listings()
+    main_module = Module(
+        name=jxa_config.app_name if jxa_config.comp_mode == 'app' else 'main',
+        source=p.join(project_dir, jxa_config.main),
+        version=jxa_config.version)
+    self.main_module = main_module
+
+    if self.scan_cache:
+      self.scan_cache.begin_run()
+    with span('resolve'):
+      dependency_modules = self.resolver.resolve(main_module.source)
+    logger.debug('Gathered dependencies: %s', dependency_modules)
+    self.dependency_modules = dependency_modules
+    if self.scan_cache:
+      self.scan_cache.save()
+
+    preprocessed_dir = p.join(project_dir, PREPROCESSED_DIR)
+    output_dir = p.join(project_dir, OUTPUT_DIR)
+    locations_file = p.join(project_dir, LOCATIONS_FILE)
+
+    ## Without a manifest nothing is known about the outputs, so start clean
+    if not manifest.units and p.exists(output_dir):
+      try:
+        shutil.rmtree(output_dir)
+      except Exception as e:
+        log_print_error(f'Cannot delete the output directory: {e}')
+        exit(1)
+
+    if not p.exists(output_dir):
+      try:
+        os.makedirs(output_dir)
+      except Exception as e:
+        log_print_error(f'Cannot create the output directory: {e}')
+        exit(1)
+
+    def get_mirror_source(source: str) -> str:
+      if is_within(source, project_dir):
+        mirror_folder = p.join(preprocessed_dir,
+                               p.relpath(p.dirname(source), project_dir))
+      else:
+        ## e.g. packages in the global node_modules
+        mirror_folder = p.join(preprocessed_dir, EXTERNAL_MIRROR_DIR,
+                               p.dirname(source).lstrip(p.sep))
+      return p.normpath(p.join(mirror_folder, p.basename(source)))
+
+    comp_units: List[CompilationUnit] = []
+
+    if jxa_config.comp_mode == 'app':
+      main_suffix = '.app'
+    elif jxa_config.comp_mode == 'script':
+      main_suffix = '.scpt'
+    bundle_file = p.join(project_dir, BUNDLE_FILE)
+    comp_units.append(
+        CompilationUnit(
+            bundle_file
+            if jxa_config.bundle else get_mirror_source(main_module.source),
+            p.join(output_dir, main_module.name) + main_suffix,
+            p.join(APPS_DIR_ABS, main_module.name) + main_suffix))
+
+    ## A bundle has the dependencies inlined, they aren't compiled on their own
+    for dep in [] if jxa_config.bundle else dependency_modules:
+      ## Installation paths
+      if jxa_config.deps_install_mode == 'app':
+        if jxa_config.comp_mode == 'app':
+          ## output path because the app doesn't have to be installed
+          ## (the installation path would't exist)
+          lib_dest = p.join(comp_units[0].output_path, APP_LIBS_DIR)
+        else:
+          lib_dest = p.join(comp_units[0].installation_path, APP_LIBS_DIR)
+      elif jxa_config.deps_install_mode == 'user':
+        lib_dest = USER_LIBS_DIR_ABS
+      elif jxa_config.deps_install_mode == "system":
+        lib_dest = SYSTEM_LIBS_DIR_ABS
+      comp_units.append(
+          CompilationUnit(get_mirror_source(dep.source),
+                          f'{p.join(output_dir, dep.name_ver)}.scpt',
+                          f'{p.join(lib_dest, dep.name_ver)}.scpt'))
+    self.comp_units = comp_units
+
+    ## Versioned names of the libraries used by every dependant
+    lib_names: Dict[str, Dict[str, str]] = {}
+    for dep in dependency_modules:
+      for dependant_source in dep.dependant_sources:
+        lib_names.setdefault(dependant_source, {})[dep.name] = dep.name_ver
+
+    ## The mirror gets every source with its Library() calls pointed to the
+    ## versioned names
+    with span('sync_mirror'):
+      manifest.mirror = sync_mirror({} if jxa_config.bundle else {
+          unit.input_path: (source, lib_names.get(source, {}))
+          for source, unit in zip([main_module.source] +
+                                  [dep.source
+                                   for dep in dependency_modules], comp_units)
+      }, preprocessed_dir, manifest.mirror, manifest.is_racy)
+
+    with open(locations_file, 'w') as f:
+      f.write(json.dumps([asdict(d) for d in comp_units], indent=2))
+
+    logger.debug('Gathered compilation units: %s', comp_units)
+
+    ## Fingerprints of the units
+    name_vers = {dep.source: dep.name_ver for dep in dependency_modules}
+    main_unit = comp_units[0]
+    app_icon = get_file_fingerprint(
+        jxa_config.app_icon,
+        options.fingerprint) if jxa_config.app_icon else None
+    if jxa_config.bundle:
+      ## The bundle is made of all the sources and how they load each other
+      library_sources = {
+          source: self.resolver.get_library_sources(source)
+          for source in [main_module.source] +
+          [dep.source for dep in dependency_modules]
+      }
+      main_fingerprint = get_unit_fingerprint(
+          main_module.source,
+          main_module.source,
+          options.fingerprint, [],
+          comp_mode=jxa_config.comp_mode,
+          minify=jxa_config.minify,
+          app_icon=app_icon,
+          bundle=[{
+              'source': dep.source,
+              'libraries': library_sources[dep.source],
+              **get_file_fingerprint(dep.source, options.fingerprint)
+          } for dep in dependency_modules] +
+          [{
+              'source': main_module.source,
+              'libraries': library_sources[main_module.source]
+          }])
+    else:
+      main_fingerprint = get_unit_fingerprint(
+          main_module.source,
+          main_unit.input_path,
+          options.fingerprint, [
+              name_vers[dep.source] for dep in dependency_modules
+              if main_module.source in dep.dependant_sources
+          ],
+          comp_mode=jxa_config.comp_mode,
+          minify=jxa_config.minify,
+          app_icon=app_icon)
+    fingerprints = {main_unit.output_path: main_fingerprint}
+    for dep, unit in zip(dependency_modules, comp_units[1:]):
+      fingerprints[unit.output_path] = get_unit_fingerprint(
+          dep.source,
+          unit.input_path,
+          options.fingerprint, [name_vers[s] for s in dep.dependency_sources],
+          minify=jxa_config.minify)
+
+    ## Outputs that are no longer produced
+    for output_path in list(manifest.units):
+      if output_path not in fingerprints:
+        manifest.remove(output_path)
+        try:
+          remove_path(output_path)
+        except Exception as e:
+          log_print_warning(f'Cannot delete a stale output: {e}')
+
+    stale_units = [
+        unit for unit in comp_units if not manifest.is_up_to_date(
+            unit.output_path, fingerprints[unit.output_path])
+    ]
+    ## Libraries other projects of the workspace may compile too: the ones
+    ## claimed here are compiled here, the rest is copied from the project
+    ## that claimed them
+    shared_keys: Dict[str, str] = {}
+    claimed_units: List[CompilationUnit] = []
+    shared_units: List[CompilationUnit] = []
+    if self.shared_outputs:
+      shared_keys = {
+          unit.output_path:
+          SharedOutputs.get_key(dep.source, fingerprints[unit.output_path])
+          for dep, unit in zip(dependency_modules, comp_units[1:])
+      }
+      for unit in comp_units[1:]:
+        claimed = self.shared_outputs.claim(shared_keys[unit.output_path])
+        if unit not in stale_units:
+          if claimed:
+            self.shared_outputs.publish(shared_keys[unit.output_path],
+                                        unit.output_path)
+        elif claimed:
+          claimed_units.append(unit)
+        else:
+          shared_units.append(unit)
+    own_units = [u for u in stale_units if u not in shared_units]
+
+    if not stale_units:
+      logger.info('Everything is up to date')
+      manifest.save()
+      return []
+
+    ## Printed once the units are compiled
+    summary = [
+        f'{len(own_units)} of {len(comp_units)} units' +
+        (f' ({len(shared_units)} shared with other projects)'
+         if shared_units else '')
+    ]
+    if jxa_config.bundle:
+      with span('bundle'):
+        write_bundle(bundle_file, main_module.source, dependency_modules,
+                     library_sources, project_dir)
+      summary.append(
+          f'bundled {len(dependency_modules)} module(s) into {BUNDLE_FILE}')
+
+    artifact_cache = get_artifact_cache() if options.artifact_cache else None
+    ## Artifact cache hits and misses of all compile() calls
+    cache_counts = [0, 0]
+
+    def compile(units: List[CompilationUnit],
+                backend: CompilerBackend) -> List[CompilationResult]:
+      """Compile the units (minified first), restoring cached artifacts"""
+      if jxa_config.minify:
+        minified_files = minify_sources([u.input_path for u in units],
+                                        p.join(project_dir, MINIFIED_DIR),
+                                        len(comp_units))
+        units = [
+            replace(u, input_path=minified_files[u.input_path]) for u in units
+        ]
+      restored: List[CompilationResult] = []
+      ## output path -> key of the artifact to store after compilation
+      keys: Dict[str, str] = {}
+      if artifact_cache:
+        identity = backend.get_identity()
+        with span('artifact_cache', units=len(units)):
+          for unit in units:
+            try:
+              key = artifact_cache.get_key(unit, identity)
+            except OSError as e:
+              logger.debug('Cannot hash %s: %s', unit.input_path, e)
+              continue
+            if key is None:
+              continue
+            if artifact_cache.restore(key, unit.output_path):
+              restored.append(CompilationResult(unit, 0, cached=True))
+            else:
+              keys[unit.output_path] = key
+        restored_outputs = {r.unit.output_path for r in restored}
+        units = [u for u in units if u.output_path not in restored_outputs]
+        cache_counts[0] += len(restored)
+        cache_counts[1] += len(keys)
+      with span('compile_units', units=len(units)):
+        results = compile_units(units, backend, options.jobs,
+                                manifest.get_costs(units), self.compile_slots)
+      stored = [r for r in results if r.ok and r.unit.output_path in keys]
+      for result in stored:
+        artifact_cache.store(keys[result.unit.output_path],
+                             result.unit.output_path)
+      if stored:
+        artifact_cache.prune()
+      return restored + results
+
+    logger.info(
+        'Compiling %d of %d units%s...', len(own_units), len(comp_units),
+        f' ({len(shared_units)} shared with other projects)'
+        if shared_units else '')
+    try:
+      for unit in stale_units:
+        ## Forget the unit first, a failed compilation may leave partial output
+        manifest.remove(unit.output_path)
+        try:
+          remove_path(unit.output_path)
+        except Exception as e:
+          log_print_error(f'Cannot delete an old output: {e}')
+          exit(1)
+
+      backend = get_compiler_backend(options.compiler_backend,
+                                     options.compiler)
+      try:
+        results = compile(own_units, backend)
+        if self.shared_outputs:
+          ## Before waiting for other projects, they may be waiting too
+          compiled_outputs = {r.unit.output_path for r in results if r.ok}
+          for unit in claimed_units:
+            self.shared_outputs.publish(
+                shared_keys[unit.output_path], unit.output_path
+                if unit.output_path in compiled_outputs else None)
+          missing_units = []
+          for unit in shared_units:
+            try:
+              with span('copy_shared_output', unit=unit.output_path):
+                copied = self.shared_outputs.copy(
+                    shared_keys[unit.output_path], unit.output_path)
+            except Exception as e:
+              logger.warning('Cannot copy a shared output: %s', e)
+              copied = False
+            if copied:
+              manifest.update(unit.output_path, fingerprints[unit.output_path])
+            else:
+              remove_path(unit.output_path)
+              missing_units.append(unit)
+          ## The project that claimed them didn't compile them
+          if missing_units:
+            results += compile(missing_units, backend)
+      finally:
+        backend.close()
+      failed = None
+      for result in results:
+        if result.output.strip():
+          print_block(result.output.strip(),
+                      p.basename(result.unit.output_path))
+        if result.ok:
+          if not result.cached:
+            manifest.durations[result.unit.output_path] = result.duration
+          if result.unit.output_path != main_unit.output_path:
+            manifest.update(result.unit.output_path,
+                            fingerprints[result.unit.output_path])
+        elif not result.cancelled and not failed:
+          failed = result
+      compiled = [r for r in results if r.ok and not r.cached]
+      if artifact_cache:
+        summary.append(
+            f'artifact cache: {cache_counts[0]} hit(s), {cache_counts[1]} miss(es)'
+        )
+      if compiled:
+        total = sum(r.duration for r in compiled)
+        summary.append(
+            f'{backend.name} backend: {len(compiled)} unit(s) in {total:.3f}s, {total / len(compiled) * 1000:.1f}ms per unit'
+        )
+      log_print_block('\n'.join(summary), 'Compiled')
+      if compiled and logger.isEnabledFor(DEBUG):
+        logger.debug(
+            'Compilation times: %s', ', '.join(
+                f'{p.basename(r.unit.output_path)}: {r.duration * 1000:.1f}ms'
+                for r in compiled))
+      if failed:
+        log_print_error(
+            f'Something bad happened during compilation of "{failed.unit.input_path}" (exit code {failed.returncode})'
+        )
+        exit(1)
+
+      if main_unit in stale_units:
+        if jxa_config.comp_mode == 'app':
+          logger.info('Modifying app internals...')
+          with span('modify_app_internals'):
+            modify_app_internals(main_unit.output_path, jxa_config.app_icon)
+        manifest.update(main_unit.output_path,
+                        fingerprints[main_unit.output_path])
+    finally:
+      ## Never leave other projects waiting
+      for unit in claimed_units:
+        self.shared_outputs.publish(shared_keys[unit.output_path], None)
+      manifest.save()
+    return stale_units
+
+
+## Builders kept by a long-lived process (the daemon) between builds,
+## with watchers telling what changed in the meantime
+_warm_builders: Dict[Tuple[str, bool, str], Tuple[ProjectBuilder,
+                                                  Watcher]] = {}
+keep_warm = False
+
+
+def build_project(
+    project_dir: str,
+    overrides: Optional[Dict[str, LoadedPropInfo]] = None,
+    options: Optional[BuildOptions] = None) -> List[CompilationUnit]:
+  """
+  Build the project, returns the units that were compiled.
+  When keep_warm is set, the builder of the project is reused by the next call.
+  """
+  options = options or BuildOptions()
+  if not keep_warm:
+    return ProjectBuilder(project_dir, overrides, options).build()
+
+  key = (p.realpath(project_dir), options.no_cache, options.fingerprint)
+  if key in _warm_builders:
+    builder, watcher = _warm_builders.pop(key)
+    builder.invalidate(watcher.poll())
+    builder.overrides = overrides
+    builder.options = options
+    if options.force:
+      builder.manifest = BuildManifest(builder.manifest.manifest_file)
+  else:
+    builder = ProjectBuilder(project_dir, overrides, options)
+    watcher = get_watcher()
+  try:
+    return builder.build()
+  finally:
+    watcher.watch(*builder.get_watched_paths())
+    _warm_builders[key] = builder, watcher
+
+
+def forget_project_builders(project_dir: Optional[str] = None):
+  """Drop warm builders of the project (or all of them)"""
+  for key in list(_warm_builders):
+    if project_dir is None or key[0] == p.realpath(project_dir):
+      _warm_builders.pop(key)[1].close()
+
+
+def get_warm_projects() -> List[str]:
+  return sorted({key[0] for key in _warm_builders})
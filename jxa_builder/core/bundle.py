@@ -0,0 +1,92 @@
+import json
+from os import path as p
+from typing import Dict, List
+from jxa_builder.core.models import Module
+from jxa_builder.core.js_lexer import get_top_level_names
+from jxa_builder.core.constants import PROG_NAME
+from jxa_builder.utils.printit import log_print_error
+
+
+def _read(source: str) -> str:
+  try:
+    with open(source, 'r') as f:
+      code = f.read()
+  except Exception as e:
+    log_print_error(f'Cannot read a source "{source}": {e}')
+    exit(1)
+  ## A trailing line comment must not swallow what follows the module
+  return code if code.endswith('\n') else code + '\n'
+
+
+def get_bundle(main_source: str, modules: List[Module],
+               libraries: Dict[str, Dict[str, str]], project_dir: str) -> str:
+  """
+  Inline the modules into the main source, so it doesn't load any libraries
+  at run time.
+
+  Every module is wrapped in a function that returns an object with its top
+  level names (what a script library exposes), the function is called when
+  the module is loaded with Library() for the first time. Library() is
+  replaced with one that gives the bundled modules and falls back to the
+  original one for libraries that weren't resolved (e.g. system libraries).
+  The main source stays at the top level, so its handlers (e.g. run) keep
+  working.
+
+  Args:
+      modules: Dependencies of the main source, those that aren't reached from it are left out.
+      libraries: Source -> Library() argument -> source of the dependency.
+  """
+  ids = {module.source: i for i, module in enumerate(modules)}
+
+  def get_ids(source: str) -> str:
+    return json.dumps({
+        name: ids[dep_source]
+        for name, dep_source in libraries.get(source, {}).items()
+        if dep_source in ids
+    })
+
+  parts = [
+      f'// Bundled by {PROG_NAME}: {len(modules)} module(s)\n',
+      'Library = (function (systemLibrary) {\n  var modules = [\n'
+  ]
+  for module in modules:
+    code = _read(module.source)
+    names = get_top_level_names(code)
+    ## Names a library assigns without declaring are its own globals,
+    ## declared vars keep them in the module (they're hoisted)
+    assigned = [name for name, declared in names.items() if not declared]
+    getters = ''.join(f'  get {name}() {{ return {name}; }},\n'
+                      for name in names)
+    parts.append(
+        f'// {p.relpath(module.source, project_dir)}\n[{get_ids(module.source)}, function (Library) {{\n'
+        f'{code}' + (f'var {", ".join(assigned)};\n' if assigned else '') +
+        f'return {{\n{getters}}};\n}}],\n')
+  parts.append(f'''  ];
+  var loaded = [];
+  function getLibrary(ids) {{
+    return function (name) {{
+      return name in ids ? load(ids[name]) : systemLibrary(name);
+    }};
+  }}
+  function load(id) {{
+    if (!(id in loaded)) {{
+      loaded[id] = modules[id][1](getLibrary(modules[id][0]));
+    }}
+    return loaded[id];
+  }}
+  return getLibrary({get_ids(main_source)});
+}})(Library);
+''')
+  parts.append(_read(main_source))
+  return ''.join(parts)
+
+
+def write_bundle(dest: str, main_source: str, modules: List[Module],
+                 libraries: Dict[str, Dict[str, str]], project_dir: str):
+  code = get_bundle(main_source, modules, libraries, project_dir)
+  try:
+    with open(dest, 'w') as f:
+      f.write(code)
+  except Exception as e:
+    log_print_error(f'Cannot write the bundle "{dest}": {e}')
+    exit(1)
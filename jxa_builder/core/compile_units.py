@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from jxa_builder.core.models import CompilationUnit
+from jxa_builder.core.compiler_backends import CompilerBackend
+from jxa_builder.core.tracing import span
+
+
+@dataclass
+class CompilationResult:
+  unit: CompilationUnit
+  ## None when the job has not been started
+  returncode: Optional[int] = None
+  output: str = ''
+  duration: float = 0.0
+  ## Whether the job was skipped or terminated because another one failed
+  cancelled: bool = False
+  ## Whether the output was restored from the artifact cache
+  cached: bool = False
+
+  @property
+  def ok(self) -> bool:
+    return self.returncode == 0
+
+
+def compile_units(
+    units: List[CompilationUnit],
+    backend: CompilerBackend,
+    jobs: Optional[int] = None,
+    costs: Optional[Dict[str, float]] = None,
+    slots: Optional[threading.Semaphore] = None) -> List[CompilationResult]:
+  """
+  Compile units with the backend, using a pool of `jobs` workers (defaults to
+  the CPU count).
+
+  Units don't depend on each other at compile time (libraries are loaded at
+  run time), so the critical path of a build is its most expensive unit.
+  Units are started from the most expensive one according to `costs`
+  (output path -> estimated cost), so none of them ends up running alone at
+  the end. After the first failure no more jobs are started and the running
+  ones are cancelled.
+
+  A semaphore shared by several calls (`slots`, e.g. by the projects of a
+  workspace) bounds the number of units compiled at once by all of them.
+  """
+  jobs = max(1, jobs or os.cpu_count() or 1)
+  costs = costs or {}
+  queue = sorted(units,
+                 key=lambda u: costs.get(u.output_path, 0),
+                 reverse=True)
+  results = {u.output_path: CompilationResult(u) for u in units}
+  lock = threading.Lock()
+  failed = threading.Event()
+
+  def worker():
+    while True:
+      with lock:
+        if failed.is_set() or not queue:
+          return
+        unit = queue.pop(0)
+      result = results[unit.output_path]
+      with slots or nullcontext():
+        ## Another unit may have failed while this one waited for a slot
+        if failed.is_set():
+          return
+        start = time.perf_counter()
+        with span('compile', unit=os.path.basename(unit.output_path)):
+          result.returncode, result.output = backend.compile(unit)
+        result.duration = time.perf_counter() - start
+      if not result.ok:
+        with lock:
+          if failed.is_set():
+            result.cancelled = True
+          else:
+            failed.set()
+            backend.cancel()
+
+  threads = [
+      threading.Thread(target=worker, daemon=True)
+      for _ in range(min(jobs, len(units)))
+  ]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  for result in results.values():
+    if result.returncode is None:
+      result.cancelled = True
+  return [results[u.output_path] for u in units]
@@ -0,0 +1,303 @@
+import os
+from os import path as p
+import json
+import queue
+import shlex
+import shutil
+import subprocess
+import platform
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Tuple, Type
+from jxa_builder.core.models import CompilationUnit
+
+
+class CompilerBackend:
+  """
+  Compiles units to .scpt/.app outputs.
+
+  `compile` is called from several worker threads at once, `cancel` stops
+  all running compilations (it's called after the first failure), `close`
+  releases resources when the build is done.
+  """
+  name = ''
+
+  def compile(self, unit: CompilationUnit) -> Tuple[int, str]:
+    """Returns exit code and output of the compilation"""
+    raise NotImplementedError
+
+  def get_identity(self) -> str:
+    """
+    Identify what produces the outputs (e.g. for the artifact cache):
+    the same identity and input must give the same output
+    """
+    return self.name
+
+  def cancel(self):
+    pass
+
+  def close(self):
+    pass
+
+
+@lru_cache(maxsize=None)
+def get_tool_identity(command: str) -> str:
+  """Identify a command by its executable and the system version"""
+  args = shlex.split(command)
+  executable = shutil.which(args[0]) if args else None
+  try:
+    size = p.getsize(executable) if executable else None
+  except OSError:
+    size = None
+  return json.dumps([args, executable, size, platform.mac_ver()[0]])
+
+
+class ProcessBackend(CompilerBackend):
+  """Spawns a compiler process (osacompile by default) per unit"""
+  name = 'process'
+
+  def __init__(self, compiler: str = 'osacompile'):
+    self.compiler = compiler
+    self._running: List[subprocess.Popen] = []
+    self._cancelled = False
+    self._lock = threading.Lock()
+
+  def get_identity(self) -> str:
+    return f'{self.name}:{get_tool_identity(self.compiler)}'
+
+  def compile(self, unit: CompilationUnit) -> Tuple[int, str]:
+    command = shlex.split(self.compiler) + [
+        '-l', 'JavaScript', '-o', unit.output_path, unit.input_path
+    ]
+    try:
+      proc = subprocess.Popen(command,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT,
+                              text=True)
+    except OSError as e:
+      return -1, f'Cannot run "{command[0]}": {e}'
+    with self._lock:
+      self._running.append(proc)
+      if self._cancelled:
+        proc.terminate()
+    output, _ = proc.communicate()
+    with self._lock:
+      self._running.remove(proc)
+    return proc.returncode, output
+
+  def cancel(self):
+    with self._lock:
+      self._cancelled = True
+      for proc in self._running:
+        proc.terminate()
+
+
+## Reads {"input", "output"} requests line by line from stdin
+## and answers each with a {"ok", "error"} line
+COMPILE_SERVER_JS = r'''
+ObjC.import('Foundation');
+ObjC.import('OSAKit');
+
+const language = $.OSALanguage.languageForName('JavaScript');
+const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+
+function reply(response) {
+  stdout.writeData(
+    $(JSON.stringify(response) + '\n').dataUsingEncoding($.NSUTF8StringEncoding)
+  );
+}
+
+function compile(request) {
+  const error = $();
+  const source = $.NSString.stringWithContentsOfFileEncodingError(
+    request.input, $.NSUTF8StringEncoding, error
+  );
+  if (source.isNil()) {
+    return { ok: false, error: `Cannot read "${request.input}"` };
+  }
+  const script = $.OSAScript.alloc.initWithSourceLanguage(source, language);
+  const errorInfo = $();
+  if (!script.compileAndReturnError(errorInfo)) {
+    const info = ObjC.deepUnwrap(errorInfo) || {};
+    return {
+      ok: false,
+      error: info.OSAScriptErrorMessageKey || JSON.stringify(info),
+    };
+  }
+  const writeError = $();
+  const written = script.writeToURLOfTypeUsingStorageOptionsError(
+    $.NSURL.fileURLWithPath(request.output),
+    'com.apple.applescript.script', 0, writeError
+  );
+  if (!written) {
+    return { ok: false, error: writeError.localizedDescription.js };
+  }
+  return { ok: true, error: '' };
+}
+
+let buffer = '';
+while (true) {
+  const data = stdin.availableData;
+  if (data.length == 0) break;
+  buffer += $.NSString.alloc.initWithDataEncoding(
+    data, $.NSUTF8StringEncoding
+  ).js;
+  let end;
+  while ((end = buffer.indexOf('\n')) >= 0) {
+    const line = buffer.slice(0, end);
+    buffer = buffer.slice(end + 1);
+    if (!line) continue;
+    try {
+      reply(compile(JSON.parse(line)));
+    } catch (e) {
+      reply({ ok: false, error: String(e) });
+    }
+  }
+}
+'''
+
+## Lines of a compile server host's stderr kept for the error message
+STDERR_LINES = 100
+
+
+class CompileServerBackend(CompilerBackend):
+  """
+  Compiles scripts in long-lived osascript hosts (one per worker) that get
+  units over a pipe, so the process spawn and OSA/JavaScriptCore start-up
+  is paid once per host instead of once per unit.
+
+  Applets need the app bundle osacompile generates around the script,
+  so .app outputs are still compiled by the process backend.
+  """
+  name = 'server'
+
+  def __init__(self, compiler: str = 'osacompile'):
+    self._fallback = ProcessBackend(compiler)
+    self._idle: 'queue.Queue[subprocess.Popen]' = queue.Queue()
+    self._hosts: List[subprocess.Popen] = []
+    ## Host -> thread reading its stderr and the last lines it read.
+    ## stderr is drained all the time, a host writing more than the pipe
+    ## holds would block otherwise
+    self._stderr: Dict[subprocess.Popen, Tuple[threading.Thread,
+                                               'deque[str]']] = {}
+    self._lock = threading.Lock()
+
+  def get_identity(self) -> str:
+    return f'{self.name}:{get_tool_identity("osascript")}:{self._fallback.get_identity()}'
+
+  def _get_host(self) -> subprocess.Popen:
+    try:
+      return self._idle.get_nowait()
+    except queue.Empty:
+      host = subprocess.Popen(
+          ['osascript', '-l', 'JavaScript', '-e', COMPILE_SERVER_JS],
+          stdin=subprocess.PIPE,
+          stdout=subprocess.PIPE,
+          stderr=subprocess.PIPE,
+          text=True,
+          bufsize=1)
+      lines: 'deque[str]' = deque(maxlen=STDERR_LINES)
+      reader = threading.Thread(target=lambda: lines.extend(host.stderr),
+                                daemon=True)
+      reader.start()
+      with self._lock:
+        self._hosts.append(host)
+        self._stderr[host] = (reader, lines)
+      return host
+
+  def _get_stderr(self, host: subprocess.Popen) -> str:
+    """Last lines the (exited) host wrote to stderr"""
+    reader, lines = self._stderr[host]
+    reader.join(timeout=1)
+    return ''.join(lines)
+
+  def compile(self, unit: CompilationUnit) -> Tuple[int, str]:
+    if unit.output_path.endswith('.app'):
+      return self._fallback.compile(unit)
+    try:
+      host = self._get_host()
+    except OSError as e:
+      return -1, f'Cannot start the compile server: {e}'
+    try:
+      host.stdin.write(
+          json.dumps({
+              'input': unit.input_path,
+              'output': unit.output_path
+          }) + '\n')
+      host.stdin.flush()
+      line = host.stdout.readline()
+      response = json.loads(line)
+    except (OSError, ValueError):
+      ## The host died (or was terminated by cancel), don't reuse it
+      host.kill()
+      return -1, self._get_stderr(host)
+    self._idle.put(host)
+    return (0, '') if response['ok'] else (1, response['error'])
+
+  def cancel(self):
+    self._fallback.cancel()
+    with self._lock:
+      for host in self._hosts:
+        host.terminate()
+
+  def close(self):
+    with self._lock:
+      for host in self._hosts:
+        if host.poll() is None:
+          host.stdin.close()
+      for host in self._hosts:
+        try:
+          host.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+          host.kill()
+      self._hosts = []
+      self._stderr = {}
+
+
+class FakeBackend(CompilerBackend):
+  """
+  Copies sources instead of compiling them. Outputs don't work, but have the
+  layout of the real ones, so the rest of the pipeline can run on any system
+  (e.g. for benchmarks and CI on Linux).
+  """
+  name = 'fake'
+
+  def compile(self, unit: CompilationUnit) -> Tuple[int, str]:
+    try:
+      if unit.output_path.endswith('.app'):
+        contents = p.join(unit.output_path, 'Contents')
+        resources = p.join(contents, 'Resources')
+        os.makedirs(p.join(resources, 'Scripts'), exist_ok=True)
+        os.makedirs(p.join(contents, 'MacOS'), exist_ok=True)
+        shutil.copy(unit.input_path, p.join(resources, 'Scripts', 'main.scpt'))
+        with open(p.join(contents, 'Info.plist'), 'w') as f:
+          f.write('<key>CFBundleExecutable</key>\n<string>applet</string>\n'
+                  '<key>CFBundleIconFile</key>\n<string>applet</string>\n'
+                  '<key>CFBundleSignature</key>\n<string>aplt</string>\n')
+        for file in (
+            p.join(contents, 'MacOS', 'applet'),
+            p.join(resources, 'applet.icns'),
+            p.join(resources, 'applet.rsrc'),
+        ):
+          open(file, 'w').close()
+      else:
+        shutil.copy(unit.input_path, unit.output_path)
+    except OSError as e:
+      return 1, str(e)
+    return 0, ''
+
+
+COMPILER_BACKENDS: Dict[str, Type[CompilerBackend]] = {
+    ProcessBackend.name: ProcessBackend,
+    CompileServerBackend.name: CompileServerBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def get_compiler_backend(name: str,
+                         compiler: str = 'osacompile') -> CompilerBackend:
+  if name == FakeBackend.name:
+    return FakeBackend()
+  return COMPILER_BACKENDS[name](compiler)
@@ -1,4 +1,4 @@
-from os import path as p, environ
+from os import path as p, environ, getuid
 import importlib.util
 
 IS_RICH = environ.get(
@@ -9,6 +9,11 @@ PROG_NAME = 'jxa-builder'
 BUILD_DIR = 'build'
 OUTPUT_DIR = p.join(BUILD_DIR, 'output')
 PREPROCESSED_DIR = p.join(BUILD_DIR, 'preprocessed')
+## Mirror of sources outside the project (e.g. global packages)
+EXTERNAL_MIRROR_DIR = '@external'
+BUNDLE_FILE = p.join(BUILD_DIR, 'bundle.js')
+MINIFIED_DIR = p.join(BUILD_DIR, 'minified')
+PROFILE_DIR = p.join(BUILD_DIR, 'profile')
 DEPS_DIR = 'dependencies'
 NODE_DIR = 'node_modules'
 SYSTEM_ROOT_DIR_ABS = p.abspath(p.sep)
@@ -23,3 +28,20 @@ LOCATIONS_FILE = p.join(BUILD_DIR, 'locations.json')
 JXA_JSON_FILE = 'jxa.json'
 PACKAGE_JSON_FILE = 'package.json'
 LOG_FILE_ABS = p.join(USER_DIR_ABS, 'Library', 'Logs', f'{PROG_NAME}.log')
+## Size of the log file it's rotated at, and how many old logs are kept
+LOG_MAX_MB = 5
+LOG_BACKUP_COUNT = 3
+CACHE_DIR_ABS = p.join(USER_DIR_ABS, 'Library', 'Caches', PROG_NAME)
+## Size cap of the compiled artifact cache
+ARTIFACT_CACHE_MAX_MB = 1024
+SCAN_CACHE_FILE = p.join(BUILD_DIR, 'scan_cache.json')
+BUILD_MANIFEST_FILE = p.join(BUILD_DIR, 'manifest.json')
+INSTALL_STATE_FILE = p.join(BUILD_DIR, 'installed.json')
+FROZEN_STATE_FILE = p.join(BUILD_DIR, 'frozen.json')
+## Files modified shortly before a cache was written may be modified again
+## within the same mtime tick (1 s on HFS+), so their stat is not trusted
+RACY_WINDOW_NS = 2_000_000_000
+## In the per-user temporary directory, socket paths are limited to ~100 characters
+DAEMON_SOCKET_FILE_ABS = p.join(environ.get('TMPDIR', '/tmp'),
+                                f'{PROG_NAME}-{getuid()}.sock')
+DAEMON_IDLE_TIMEOUT = 15 * 60
@@ -0,0 +1,200 @@
+import os
+from os import path as p
+import io
+import codecs
+import json
+import time
+import socket
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Any, Dict, Union
+import jxa_builder.core.build_project as build_project
+from jxa_builder.core.constants import DAEMON_SOCKET_FILE_ABS, DAEMON_IDLE_TIMEOUT
+from jxa_builder.core.daemon_client import DAEMON_PROTOCOL_VERSION, DAEMON_COMMANDS, DISPLAY_MODE, PACKAGE_DIR, connect
+from jxa_builder.utils.logger import logger, shell_handler, update_level
+
+
+class _ResponseWriter(io.TextIOBase):
+  """
+  Sends everything written to it to the client as `stream` responses.
+
+  Bytes are accepted too: click writes them to streams that take them
+  (it checks with an empty write).
+  """
+
+  def __init__(self, conn: socket.socket, stream: str):
+    self.conn = conn
+    self.stream = stream
+    ## A character may be split between writes
+    self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+  def writable(self) -> bool:
+    return True
+
+  def isatty(self) -> bool:
+    return False
+
+  def write(self, text: Union[str, bytes]) -> int:
+    if text:
+      _respond(
+          self.conn, {
+              self.stream:
+              self._decoder.decode(text) if isinstance(text, bytes) else text
+          })
+    return len(text)
+
+
+def _respond(conn: socket.socket, response: Dict[str, Any]):
+  try:
+    conn.sendall((json.dumps(response) + '\n').encode())
+  except OSError:
+    ## The client is gone, the command still has to finish
+    pass
+
+
+class Daemon:
+  """
+  Runs build, install and uninstall commands sent by clients over a Unix
+  socket, keeping project builders (configs, dependency graphs, scan caches
+  and build manifests) warm between them.
+
+  Commands run one at a time, each with the working directory and
+  JXA_BUILDER_* env variables of its client. The daemon exits after
+  `idle_timeout` seconds without requests.
+  """
+
+  def __init__(self,
+               socket_file: str = DAEMON_SOCKET_FILE_ABS,
+               idle_timeout: float = DAEMON_IDLE_TIMEOUT):
+    self.socket_file = socket_file
+    self.idle_timeout = idle_timeout
+    self.started = time.time()
+    self.requests = 0
+    self._running = False
+    ## Imported here, so it's warm before the first request comes
+    from jxa_builder.cli import cli
+    self._cli = cli
+
+  def serve(self):
+    if connect(self.socket_file):
+      raise RuntimeError(
+          f'A daemon is already listening on {self.socket_file}')
+    ## Left by a daemon that was killed
+    if p.exists(self.socket_file):
+      os.remove(self.socket_file)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    ## The socket is created accessible to this user only, other users
+    ## must not be able to connect even before it's listening
+    old_umask = os.umask(0o077)
+    try:
+      server.bind(self.socket_file)
+    finally:
+      os.umask(old_umask)
+    server.listen()
+    server.settimeout(self.idle_timeout)
+    build_project.keep_warm = True
+    self._running = True
+    logger.info('Build daemon listening on %s', self.socket_file)
+    try:
+      while self._running:
+        try:
+          conn, _ = server.accept()
+        except socket.timeout:
+          logger.info('Build daemon stopped after being idle')
+          break
+        with conn:
+          conn.settimeout(None)
+          self._handle(conn)
+    finally:
+      server.close()
+      if p.exists(self.socket_file):
+        os.remove(self.socket_file)
+      build_project.forget_project_builders()
+      build_project.keep_warm = False
+
+  def _handle(self, conn: socket.socket):
+    try:
+      with conn.makefile('r', encoding='utf-8') as f:
+        request = json.loads(f.readline())
+    except (OSError, ValueError) as e:
+      logger.warning('Invalid daemon request: %s', e)
+      return
+    if (request.get('protocol') != DAEMON_PROTOCOL_VERSION
+        or request.get('package_dir') != PACKAGE_DIR):
+      ## Sent by another version of the builder, let it do the work itself
+      _respond(conn, {'fallback': True})
+      return
+    command = request.get('command')
+    if command == 'run' and request.get('display_mode') != DISPLAY_MODE:
+      ## The display mode (rich or classic) is chosen when the builder is
+      ## imported, the client has to run the command in its own
+      _respond(conn, {'fallback': True})
+      return
+    self.requests += 1
+    try:
+      self._dispatch(conn, request)
+    except Exception:
+      ## One bad request must not stop the daemon
+      logger.error('Daemon failed to handle %s', request, exc_info=True)
+      _respond(conn, {'exit': 1})
+
+  def _dispatch(self, conn: socket.socket, request: Dict[str, Any]):
+    command = request.get('command')
+    if command == 'run' and request['argv'][:1] and request['argv'][
+        0] in DAEMON_COMMANDS:
+      _respond(conn, {'exit': self._run(conn, request)})
+    elif command == 'status':
+      _respond(
+          conn, {
+              'pid': os.getpid(),
+              'uptime': time.time() - self.started,
+              'requests': self.requests,
+              'projects': build_project.get_warm_projects(),
+          })
+    elif command == 'invalidate':
+      build_project.forget_project_builders(request.get('project_dir'))
+      _respond(conn, {'exit': 0})
+    elif command == 'stop':
+      self._running = False
+      _respond(conn, {'exit': 0})
+    else:
+      _respond(conn, {'fallback': True})
+
+  def _run(self, conn: socket.socket, request: Dict[str, Any]) -> int:
+    """Run the command like the client would, returns its exit code"""
+    old_cwd = os.getcwd()
+    old_env = {
+        k: v
+        for k, v in os.environ.items() if k.startswith('JXA_BUILDER_')
+    }
+    stdout = _ResponseWriter(conn, 'stdout')
+    stderr = _ResponseWriter(conn, 'stderr')
+    old_stream = shell_handler.setStream(stderr)
+    old_level = shell_handler.level
+    start = time.perf_counter()
+    try:
+      for k in old_env:
+        del os.environ[k]
+      os.environ.update(request['env'])
+      os.chdir(request['cwd'])
+      with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+          self._cli.main(args=request['argv'], prog_name='jxa-builder')
+          code = 0
+        except SystemExit as e:
+          code = e.code if isinstance(e.code,
+                                      int) else (0 if e.code is None else 1)
+        except Exception:
+          traceback.print_exc()
+          code = 1
+    finally:
+      shell_handler.setStream(old_stream)
+      shell_handler.setLevel(old_level)
+      update_level()
+      for k in request['env']:
+        os.environ.pop(k, None)
+      os.environ.update(old_env)
+      os.chdir(old_cwd)
+    logger.debug('Daemon ran %s in %.3fs (exit code %s)', request['argv'],
+                 time.perf_counter() - start, code)
+    return code
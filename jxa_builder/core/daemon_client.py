@@ -0,0 +1,134 @@
+import os
+from os import path as p
+import sys
+import json
+import time
+import socket
+from typing import Any, Dict, List, Optional
+from jxa_builder.core.constants import DAEMON_SOCKET_FILE_ABS, DAEMON_IDLE_TIMEOUT, IS_RICH
+
+## Only standard library modules are imported here, a client has to start
+## faster than the work it sends to the daemon
+
+## Bump whenever requests or responses change
+DAEMON_PROTOCOL_VERSION = 1
+## Commands that are run by the daemon when it's running
+DAEMON_COMMANDS = ('build', 'install', 'uninstall')
+## Set to true to never use the daemon
+NO_DAEMON_ENV = 'JXA_BUILDER_NO_DAEMON'
+## The daemon must run the same code as the client
+PACKAGE_DIR = p.dirname(p.dirname(p.abspath(__file__)))
+## Display mode of this process (JXA_BUILDER_CLASSIC_DISPLAY_MODE),
+## a daemon runs only commands of clients with its own
+DISPLAY_MODE = 'rich' if IS_RICH else 'classic'
+
+
+def connect(
+    socket_file: str = DAEMON_SOCKET_FILE_ABS) -> Optional[socket.socket]:
+  """Connect to the daemon, returns None when it's not running"""
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.connect(socket_file)
+  except OSError:
+    sock.close()
+    return None
+  return sock
+
+
+def send_request(sock: socket.socket, request: Dict[str, Any]):
+  request = {
+      'protocol': DAEMON_PROTOCOL_VERSION,
+      'package_dir': PACKAGE_DIR,
+      **request
+  }
+  sock.sendall((json.dumps(request) + '\n').encode())
+
+
+def iter_responses(sock: socket.socket):
+  with sock.makefile('r', encoding='utf-8') as f:
+    for line in f:
+      yield json.loads(line)
+
+
+def run_in_daemon(argv: List[str]) -> Optional[int]:
+  """
+  Run the command in the daemon, forwarding its output.
+  Returns the exit code, or None when the command has to run in this process
+  (the daemon isn't running, can't run it, or the connection broke before
+  it started).
+  """
+  if not argv or argv[0] not in DAEMON_COMMANDS:
+    return None
+  if os.environ.get(NO_DAEMON_ENV, 'false').lower() in ('true', '1', 'yes'):
+    return None
+  sock = connect()
+  if not sock:
+    return None
+  started = False
+  try:
+    send_request(
+        sock, {
+            'command': 'run',
+            'argv': argv,
+            'cwd': os.getcwd(),
+            'display_mode': DISPLAY_MODE,
+            'env': {
+                k: v
+                for k, v in os.environ.items() if k.startswith('JXA_BUILDER_')
+            }
+        })
+    for response in iter_responses(sock):
+      if 'fallback' in response:
+        return None
+      started = True
+      if 'stdout' in response:
+        sys.stdout.write(response['stdout'])
+        sys.stdout.flush()
+      elif 'stderr' in response:
+        sys.stderr.write(response['stderr'])
+        sys.stderr.flush()
+      elif 'exit' in response:
+        return response['exit']
+  except (OSError, ValueError):
+    pass
+  finally:
+    sock.close()
+  if not started:
+    return None
+  sys.stderr.write('Lost the connection to the build daemon\n')
+  return 1
+
+
+def send_command(command: str, **kwargs: Any) -> Optional[Dict[str, Any]]:
+  """Send a control command to the daemon, returns None when it's not running"""
+  sock = connect()
+  if not sock:
+    return None
+  with sock:
+    send_request(sock, {'command': command, **kwargs})
+    for response in iter_responses(sock):
+      return response
+  return None
+
+
+def spawn_daemon(idle_timeout: float = DAEMON_IDLE_TIMEOUT,
+                 wait: float = 10) -> bool:
+  """Start the daemon in the background, returns whether it's reachable"""
+  import subprocess
+  subprocess.Popen([
+      sys.executable, '-m', 'jxa_builder.cli', 'daemon', 'run',
+      '--idle-timeout',
+      str(idle_timeout)
+  ],
+                   stdin=subprocess.DEVNULL,
+                   stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL,
+                   start_new_session=True)
+  deadline = time.monotonic() + wait
+  while time.monotonic() < deadline:
+    sock = connect()
+    if sock:
+      sock.close()
+      return True
+    time.sleep(0.05)
+  return False
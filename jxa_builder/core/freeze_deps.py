@@ -0,0 +1,101 @@
+import os
+from os import path as p
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from jxa_builder.core.constants import DEPS_DIR, NODE_DIR, RACY_WINDOW_NS
+from jxa_builder.core.install_tree import install_tree, remove_tree
+from jxa_builder.core.manage_outputs import load_install_state, save_install_state
+from jxa_builder.core.models import Module
+from jxa_builder.core.tracing import span
+from jxa_builder.utils.printit import log_print_error, log_print_warning
+from jxa_builder.utils.logger import logger
+
+
+def freeze_dependencies(project_dir: str, modules: List[Module],
+                        package_paths: Dict[str, str], state_file: str):
+  """
+  Sync nodejs dependencies of the project (modules resolved to a node_modules
+  directory) to the dependencies directory.
+
+  Package directories are known from the resolution, so node_modules is
+  never searched. Only files that differ from the frozen ones are copied
+  (see install_tree), packages are synced in parallel. Packages frozen by
+  a previous run that are no longer used are removed, other content of the
+  dependencies directory is left alone.
+
+  Args:
+      package_paths: Source -> package directory (or the source itself) of the modules, as set by DependencyResolver.resolve.
+  """
+  deps_dir = p.join(project_dir, DEPS_DIR)
+  state = load_install_state(state_file)
+  trusted_before_ns = state['written_ns'] - RACY_WINDOW_NS
+  ## Frozen copies are found before node_modules, they're synced from
+  ## where they were frozen from
+  frozen_from = {
+      dest: unit['source']
+      for dest, unit in state['units'].items() if 'source' in unit
+  }
+
+  ## Frozen name -> package directory (or source file) in node_modules
+  packages: Dict[str, str] = {}
+  ## Frozen packages which are used but whose node_modules copy is gone
+  ## (e.g. on a machine without nodejs), they're kept as they are
+  kept = set()
+  for module in modules:
+    package_path = package_paths[module.source]
+    if package_path in frozen_from:
+      if not p.exists(frozen_from[package_path]):
+        kept.add(package_path)
+        continue
+      package_path = frozen_from[package_path]
+    elif NODE_DIR not in package_path.split(p.sep):
+      continue
+    name = p.basename(package_path)
+    if packages.get(name, package_path) != package_path:
+      log_print_warning(
+          f'"{name}" is resolved to both "{packages[name]}" and "{package_path}", only the first one is frozen'
+      )
+      continue
+    packages[name] = package_path
+  counts = {'up to date': 0, 'frozen': 0, 'copied files': 0, 'pruned': 0}
+
+  def freeze(name: str, package_path: str) -> int:
+    dest = p.join(deps_dir, name)
+    with span('freeze_package', package=name):
+      unit_state, copied = install_tree(package_path, dest,
+                                        state['units'].get(dest, {}),
+                                        trusted_before_ns)
+    state['units'][dest] = {**unit_state, 'source': package_path}
+    return copied
+
+  try:
+    os.makedirs(deps_dir, exist_ok=True)
+  except Exception as e:
+    log_print_error(f'Cannot create the dependencies directory: {e}')
+    exit(1)
+  with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+    futures = [(name, executor.submit(freeze, name, package_path))
+               for name, package_path in packages.items()]
+    for name, future in futures:
+      e = future.exception()
+      if e:
+        log_print_error(f'Cannot copy nodejs dependency "{name}": {e}')
+        exit(1)
+      if future.result() == -1:
+        counts['up to date'] += 1
+      else:
+        counts['frozen'] += 1
+        counts['copied files'] += future.result()
+
+  frozen = {p.join(deps_dir, name) for name in packages} | kept
+  for dest in list(state['units']):
+    if dest not in frozen:
+      try:
+        remove_tree(dest)
+      except Exception as e:
+        log_print_warning(f'Cannot delete an unused dependency "{dest}": {e}')
+        continue
+      state['units'].pop(dest)
+      counts['pruned'] += 1
+  save_install_state(state_file, state)
+  logger.info('freeze: %s', ', '.join(f'{v} {k}' for k, v in counts.items()))
@@ -1,81 +1,285 @@
 from os import path as p
-import re
-from typing import List, Set, Optional
-from jxa_builder.core.get_project_config import get_project_config
-from jxa_builder.core.constants import DEPS_DIR, NODE_DIR
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from jxa_builder.core.get_project_config import get_project_config, get_package_info
+from jxa_builder.core.constants import DEPS_DIR, NODE_DIR, JXA_JSON_FILE, PACKAGE_JSON_FILE
 from jxa_builder.utils.printit import log_print_error
-from jxa_builder.core.models import Module
+from jxa_builder.core.models import Module, PackageInfo
+from jxa_builder.core.scan_cache import ScanCache
+from jxa_builder.core.js_lexer import iter_library_calls
+from jxa_builder.core.search_paths import DirListings, get_ancestor_node_dirs, get_global_node_dirs
+from jxa_builder.core.tracing import span
 from jxa_builder.utils.logger import logger
 
 
-def get_dependency_modules(root_package_path: str,
-                           package_path: Optional[str] = None) -> List[Module]:
-  """Recursively get all dependencies"""
-  dependencies = []
-  if not package_path:
-    package_path = root_package_path
-  if not p.exists(package_path):
-    log_print_error(f'"{package_path}" does not exist')
-    exit(1)
-  if p.isdir(package_path):
-    jxa_config = get_project_config(package_path)
-    source = p.join(package_path, jxa_config.main)
-  elif p.isfile(package_path):
-    source = package_path
-
-  ## Get library names from the source
-  try:
-    with open(source, 'r') as f:
-      code = f.read()
-  except Exception as e:
-    log_print_error(f'Cannot read a source "{source}": {e}')
-    exit(1)
-  code = re.sub(r'//.*\n', '', code)
-  code = re.sub(r'/\*[\s\S]*?\*/', '', code)
-  libraries: Set[str] = set(re.findall(r'Library\(["\'](.+?)["\']\)', code))
+class DependencyResolver:
+  """
+  Builds the dependency graph of a project.
+
+  Every source is read and scanned once and every library gets exactly one
+  node (keyed by its resolved source path), no matter through how many paths
+  it is reached.
+
+  Resolvers of several projects (e.g. in a workspace) can share what doesn't
+  depend on the project: scanned sources, package infos and directory
+  listings. Shared resolvers can be used from several threads, they share
+  a lock guarding these.
+  """
+
+  def __init__(self,
+               root_package_path: str,
+               scan_cache: Optional[ScanCache] = None,
+               shared: Optional['DependencyResolver'] = None):
+    self.root_package_path = root_package_path
+    self.scan_cache = scan_cache
+    ## source -> library specifiers found in it
+    self._libraries: Dict[str, List[str]] = {}
+    ## Same, but including sources scanned by the resolvers it's shared with
+    self._scanned: Dict[str, List[str]] = shared._scanned if shared else {}
+    ## source -> dependencies as returned by get_dependencies
+    self._edges: Dict[str, List[Tuple[str, str, str, str]]] = {}
+    ## package dir -> main source and version
+    self._package_infos: Dict[str, PackageInfo] = \
+      shared._package_infos if shared else {}
+    ## (source dir, package path, specifier) -> find_library result
+    self._found: Dict[Tuple[str, str, str], Tuple[Tuple[str, bool],
+                                                  List[str]]] = {}
+    self._listings = shared._listings if shared else DirListings()
+    self._lock = shared._lock if shared else threading.Lock()
+    ## Set by resolve: source -> module and source -> package path
+    ## (a package directory or the source itself) of the reached modules
+    self.modules: Dict[str, Module] = {}
+    self.package_paths: Dict[str, str] = {}
+
+  def invalidate(self, paths: Iterable[str]):
+    """
+    Forget what is known about changed files, so the next resolve rescans
+    them. A changed config or a file that isn't a known source (e.g. a new
+    library in a search path) can change where libraries resolve to, so all
+    resolutions are redone (rescanning is not needed for that).
+    """
+    resolve_all = False
+    for path in paths:
+      is_config = p.basename(path) in (JXA_JSON_FILE, PACKAGE_JSON_FILE)
+      self._libraries.pop(path, None)
+      self._edges.pop(path, None)
+      with self._lock:
+        self._scanned.pop(path, None)
+        if is_config:
+          self._package_infos.pop(p.dirname(path), None)
+      if is_config:
+        resolve_all = True
+      elif path not in self.package_paths:
+        resolve_all = True
+    if resolve_all:
+      self._edges = {}
+      self._found = {}
+      self._listings.clear()
+
+  def forget_listings(self):
+    """
+    List the searched directories again. A library may have been installed
+    to one that isn't watched, e.g. a node_modules directory that didn't
+    exist (see ProjectBuilder.get_watched_paths).
+    """
+    self._listings.clear()
+
+  def get_package_info(self, package_path: str) -> PackageInfo:
+    with self._lock:
+      info = self._package_infos.get(package_path)
+    if info is None:
+      ## Read outside of the lock, another thread may read it too
+      info = get_package_info(package_path)
+      with self._lock:
+        info = self._package_infos.setdefault(package_path, info)
+    return info
 
-  for lib in libraries:
+  def get_libraries(self, source: str) -> List[str]:
+    """Get library names used in the source"""
+    if source in self._libraries:
+      return self._libraries[source]
+
+    libraries = self.scan_cache.get_libraries(
+        source) if self.scan_cache else None
+    if libraries is None:
+      with self._lock:
+        libraries = self._scanned.get(source)
+      if libraries is None:
+        try:
+          with open(source, 'r') as f:
+            code = f.read()
+        except Exception as e:
+          log_print_error(f'Cannot read a source "{source}": {e}')
+          exit(1)
+        ## dict keeps the order stable between runs, unlike set
+        libraries = list(
+            dict.fromkeys(call.specifier for call in iter_library_calls(code)))
+        with self._lock:
+          self._scanned[source] = libraries
+      if self.scan_cache:
+        self.scan_cache.set_libraries(source, libraries)
+    self._libraries[source] = libraries
+    return libraries
+
+  def find_library(self, source: str, package_path: str,
+                   lib: str) -> Tuple[Tuple[str, bool], List[str]]:
+    """
+    Find the library used in the source (memoized).
+
+    Returns (library path, is package directory) and the searched directories.
+    """
+    key = (p.dirname(source), package_path, lib)
+    if key not in self._found:
+      self._found[key] = self._find_library(source, package_path, lib)
+    return self._found[key]
+
+  def _find_library(self, source: str, package_path: str,
+                    lib: str) -> Tuple[Tuple[str, bool], List[str]]:
     lib_path = p.join(p.dirname(source), lib)
     lib_path = p.abspath(p.realpath(lib_path))
     source_dir = p.dirname(lib_path)
     lib = p.basename(lib_path)
 
-    # TODO: add global node_modules search path
-    deps_search_paths = [
+    ## Then node_modules of the ancestors (e.g. hoisted packages) and
+    ## the global ones, like Node does
+    deps_search_paths = dict.fromkeys([
         source_dir,
-        p.join(root_package_path, DEPS_DIR),
-        p.join(root_package_path, NODE_DIR),
+        p.join(self.root_package_path, DEPS_DIR),
+        p.join(self.root_package_path, NODE_DIR),
         p.join(package_path, DEPS_DIR),
-        p.join(package_path, NODE_DIR)
-    ]  # some of the paths may repeat, but it's fine bcs it breaks the loop after the first match
+        p.join(package_path, NODE_DIR),
+        *get_ancestor_node_dirs(p.dirname(source)),
+        *get_global_node_dirs(),
+    ])
+    searched_dirs = []
     for deps_search_path in deps_search_paths:
+      searched_dirs.append(deps_search_path)
       lib_path = p.join(deps_search_path, lib)
 
-      if p.exists(lib_path):
-        lib_jxa_config = get_project_config(lib_path)
-        lib_source = p.join(lib_path, lib_jxa_config.main)
-        lib_version = lib_jxa_config.version
-        dependencies.append(
-            Module(name=lib,
-                   source=lib_source,
-                   version=lib_version,
-                   dependant_source=source))
-        dependencies += get_dependency_modules(root_package_path, lib_path)
-        break  # found
-      elif p.exists(lib_path + '.js'):
-        lib_source = lib_path + '.js'
-        dependencies.append(
-            Module(name=lib,
-                   source=lib_source,
-                   version='',
-                   dependant_source=source))
-        dependencies += get_dependency_modules(root_package_path, lib_source)
-        break  # found
+      if self._listings.exists(deps_search_path, lib):
+        return (lib_path, True), searched_dirs
+      elif self._listings.exists(deps_search_path, lib + '.js'):
+        return (lib_path + '.js', False), searched_dirs
+
+    log_print_error(
+        f'Could not find library "{lib}" (searched: {", ".join(searched_dirs)})\nIf you use a package manager, make sure it\'s actually installed(e.g. "npm list ")'
+    )
+    exit(1)
+
+  def get_library_sources(self, source: str) -> Dict[str, str]:
+    """Get sources of the libraries used in a resolved source by their Library() arguments"""
+    return {
+        lib: edge[0]
+        for lib, edge in zip(self.get_libraries(source), self._edges[source])
+    }
+
+  def get_dependencies(self, source: str,
+                       package_path: str) -> List[Tuple[str, str, str, str]]:
+    """
+    Resolve libraries used in the source (memoized).
+
+    Returns (source, package path, name, version) of each library.
+    """
+    if source in self._edges:
+      return self._edges[source]
+
+    resolved = self.scan_cache.get_resolved(
+        source) if self.scan_cache else None
+    if resolved is None:
+      resolved = []
+      searched_dirs = []
+      for lib in self.get_libraries(source):
+        found, lib_searched_dirs = self.find_library(source, package_path, lib)
+        resolved.append(found)
+        searched_dirs += lib_searched_dirs
+      if self.scan_cache:
+        self.scan_cache.set_resolved(source, resolved,
+                                     list(dict.fromkeys(searched_dirs)))
+
+    edges: List[Tuple[str, str, str, str]] = []
+    for lib_path, is_package in resolved:
+      if is_package:
+        lib_info = self.get_package_info(lib_path)
+        lib_source = lib_info.main
+        lib_version = lib_info.version
+        lib_name = p.basename(lib_path)
       else:
-        if deps_search_path == deps_search_paths[-1]:  # last iteration
-          log_print_error(
-              f'Could not find library "{lib}": "{lib_path}"\nIf you use a package manager, make sure it\'s actually installed(e.g. "npm list ")'
-          )
-          exit(1)
-  logger.debug(f'Gathered dependencies: {dependencies}')
+        lib_source = lib_path
+        lib_version = ''
+        lib_name = p.basename(lib_path)[:-len('.js')]
+
+      edges.append((lib_source, lib_path, lib_name, lib_version))
+
+    self._edges[source] = edges
+    return edges
+
+  def resolve(self, root_source: Optional[str] = None) -> List[Module]:
+    """
+    Walk the graph from the root source.
+
+    Returns modules in topological order: every module comes after all of its
+    own dependencies. Exits with an error if a circular dependency is found.
+    """
+    if not p.exists(self.root_package_path):
+      log_print_error(f'"{self.root_package_path}" does not exist')
+      exit(1)
+    if not root_source:
+      root_source = get_project_config(self.root_package_path).main
+
+    modules: Dict[str, Module] = {}
+    package_paths = {root_source: self.root_package_path}
+    ## Set before the walk, so sources reached before an error are known
+    ## (and watched) too
+    self.modules = modules
+    self.package_paths = package_paths
+    ordered: List[Module] = []
+    done = set()
+    ## Iterative DFS, so deep graphs don't hit the recursion limit
+    path = [root_source]
+    with span('resolve_source', source=root_source):
+      stack = [
+          iter(self.get_dependencies(root_source, self.root_package_path))
+      ]
+    while stack:
+      next_edge = next(stack[-1], None)
+      if next_edge is None:
+        stack.pop()
+        source = path.pop()
+        done.add(source)
+        if source != root_source:
+          ordered.append(modules[source])
+        continue
+      dep_source, dep_package_path, dep_name, dep_version = next_edge
+      if dep_source not in modules:
+        modules[dep_source] = Module(name=dep_name,
+                                     source=dep_source,
+                                     version=dep_version)
+        package_paths[dep_source] = dep_package_path
+      dependant_sources = modules[dep_source].dependant_sources
+      if path[-1] not in dependant_sources:
+        dependant_sources.append(path[-1])
+      if dep_source in done:
+        continue
+      if dep_source in path:
+        cycle = path[path.index(dep_source):] + [dep_source]
+        log_print_error('Circular dependency detected:\n  ' + '\n  -> '.join(
+            p.relpath(s, self.root_package_path) for s in cycle))
+        exit(1)
+      path.append(dep_source)
+      with span('resolve_source', source=dep_source):
+        stack.append(iter(self.get_dependencies(dep_source, dep_package_path)))
+
+    for module in ordered:
+      module.dependency_sources = [e[0] for e in self._edges[module.source]]
+    return ordered
+
+
+def get_dependency_modules(
+    root_package_path: str,
+    root_source: Optional[str] = None,
+    scan_cache: Optional[ScanCache] = None) -> List[Module]:
+  """Get all dependencies, deduplicated and topologically ordered"""
+  dependencies = DependencyResolver(root_package_path,
+                                    scan_cache).resolve(root_source)
+  logger.debug('Gathered dependencies: %s', dependencies)
   return dependencies
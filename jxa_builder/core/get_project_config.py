@@ -1,5 +1,7 @@
-from typing import Optional, Dict, Dict
+from typing import Optional, Dict, Tuple
+import os
 from os import path as p
+import re
 import json
 from pydantic import ValidationError
 from jxa_builder.core.constants import PACKAGE_JSON_FILE, JXA_JSON_FILE
@@ -7,36 +9,132 @@ from jxa_builder.utils.remove_empty_values import remove_empty_values
 from jxa_builder.utils.logger import logger
 from jxa_builder.utils.recase import recase
 from jxa_builder.utils.printit import log_print_error, log_print_warning
-from jxa_builder.core.models import JxaProjectConfig, SEM_VER, LoadedPropInfo
+from jxa_builder.core.models import LoadedPropInfo, PackageInfo
+from jxa_builder.core.config_model import JxaProjectConfig, SEM_VER
 from jxa_builder.core.constants import IS_RICH
 
+## Loaded files and configs are kept for the whole process (a build, or many
+## of them in watch mode or the daemon) and are reused while the stats of the
+## files they were loaded from don't change
+_Stat = Optional[Tuple[int, int]]
+## file path -> stat, parsed object
+_json_cache: Dict[str, Tuple[_Stat, Dict[str, any]]] = {}
+## (project dir, overrides) -> stats, config
+_config_cache: Dict[Tuple, Tuple[Tuple[_Stat, ...], JxaProjectConfig]] = {}
+## package dir -> stats, package info
+_package_info_cache: Dict[str, Tuple[Tuple[_Stat, ...], PackageInfo]] = {}
+_SEM_VER_RE = re.compile(SEM_VER)
+
+
+def clear_caches():
+  """Forget all loaded files and configs (e.g. to time cold loads)"""
+  _json_cache.clear()
+  _config_cache.clear()
+  _package_info_cache.clear()
+
+
+def _stat(path: str) -> _Stat:
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  return st.st_size, st.st_mtime_ns
+
+
+def _get_config_stats(project_dir: str) -> Tuple[_Stat, ...]:
+  """
+  Stats a config of the project depends on. The directory's one changes when
+  a file is added to or removed from it (e.g. the default icon).
+  """
+  return (_stat(p.join(project_dir, PACKAGE_JSON_FILE)),
+          _stat(p.join(project_dir, JXA_JSON_FILE)), _stat(project_dir))
+
 
 def get_json_obj(file_path: str) -> Dict[str, any]:
+  """Parse a json object file (memoized), the result must not be modified"""
+  stat = _stat(file_path)
+  cached = _json_cache.get(file_path)
+  if cached and cached[0] == stat:
+    return cached[1]
+
   if not p.exists(file_path):
-    return {}
-  if not p.isfile(file_path):
+    json_dict = {}
+  elif not p.isfile(file_path):
     log_print_warning(f'"{file_path}" is not a file.')
-    return {}
-
-  with open(file_path) as f:
-    try:
-      json_dict = json.load(f)
-    except json.JSONDecodeError as e:
-      error_msg = f'Invalid json syntax in "{file_path}" at line {e.lineno}, column {e.colno}: {e.msg}'
-      log_print_error(error_msg)
-      exit(1)
-    if not isinstance(json_dict, dict):
-      log_print_error
-      (f'Invalid type in "{file_path}": Expected an object, got {type(json_dict)}'
-       )
-      exit(1)
+    json_dict = {}
+  else:
+    with open(file_path) as f:
+      try:
+        json_dict = json.load(f)
+      except json.JSONDecodeError as e:
+        error_msg = f'Invalid json syntax in "{file_path}" at line {e.lineno}, column {e.colno}: {e.msg}'
+        log_print_error(error_msg)
+        exit(1)
+      if not isinstance(json_dict, dict):
+        log_print_error(
+            f'Invalid type in "{file_path}": Expected an object, got {type(json_dict)}'
+        )
+        exit(1)
+  _json_cache[file_path] = stat, json_dict
   return json_dict
 
 
+def get_package_info(package_dir: str) -> PackageInfo:
+  """
+  Get main source and version of a dependency package (memoized).
+
+  Only these two properties are read and checked, which is much cheaper
+  than validating the whole config. If they are invalid, the whole config
+  is validated to report the errors.
+  """
+  stats = _get_config_stats(package_dir)
+  cached = _package_info_cache.get(package_dir)
+  if cached and cached[0] == stats and p.isfile(cached[1].main):
+    return cached[1]
+
+  package_json = get_json_obj(p.join(package_dir, PACKAGE_JSON_FILE))
+  package_json_jxa = package_json.get('jxa', {})
+  jxa_json = get_json_obj(p.join(package_dir, JXA_JSON_FILE))
+  main = 'index.js'
+  version = '1.0.0'
+  ## Same priority as in get_project_config
+  for config in (package_json, package_json_jxa, jxa_json):
+    if not isinstance(config, dict):
+      continue
+    main = config.get('main') or main
+    version = config.get('version') or version
+
+  info = None
+  if isinstance(main, str) and isinstance(version, str):
+    main = p.join(package_dir, main.strip())
+    version = version.strip()
+    if p.isfile(main) and _SEM_VER_RE.match(version):
+      info = PackageInfo(main, version)
+  if info is None:
+    config = get_project_config(package_dir)
+    info = PackageInfo(config.main, config.version)
+  _package_info_cache[package_dir] = stats, info
+  return info
+
+
 def get_project_config(
     project_dir: str,
     overrides: Optional[Dict[str, LoadedPropInfo]] = None) -> JxaProjectConfig:
-  logger.debug(f'Getting project config of: {project_dir}')
+  """Get the validated config of the project (memoized)"""
+  key = (project_dir,
+         tuple(
+             sorted((k, v.value, v.origin, v.original_name)
+                    for k, v in overrides.items())) if overrides else ())
+  stats = _get_config_stats(project_dir)
+  cached = _config_cache.get(key)
+  if cached and cached[0] == stats:
+    config = cached[1]
+    ## Paths found by the validators have to still be there
+    if p.isfile(config.main) and (not config.app_icon
+                                  or p.isfile(config.app_icon)):
+      return config
+
+  logger.debug('Getting project config of: %s', project_dir)
 
   def to_snake_dict(d: Dict[str, any]) -> Dict[str, any]:
     return {recase(k, 'snake'): v for k, v in d.items()}
@@ -51,28 +149,27 @@ def get_project_config(
 
   # package.json
   package_json = get_json_obj(package_json_file)
-  package_json = {
+  package_json_props = {
       'app_name': package_json.get('name'),
       'version': package_json.get('version'),
       'main': package_json.get('main'),
   }
-  package_json = remove_empty_values(package_json)
-  if package_json:
+  package_json_props = remove_empty_values(package_json_props)
+  if package_json_props:
     properties.update({
         k:
         LoadedPropInfo(v, package_json_file, recase(k, 'camel'))
-        for k, v in package_json.items()
+        for k, v in package_json_props.items()
     })
 
   # package.json jxa property
-  package_json = get_json_obj(package_json_file)
   package_json = remove_empty_values(package_json)
   package_json_jxa = package_json.get('jxa', {})
-  package_json_jxa = to_snake_dict(package_json_jxa)
   if not isinstance(package_json_jxa, dict):
-    log_print_error
-    (f'Invalid type in "{package_json_file}": The "jxa" must be an object.')
+    log_print_error(
+        f'Invalid type in "{package_json_file}": The "jxa" must be an object.')
     exit(1)
+  package_json_jxa = to_snake_dict(package_json_jxa)
   if package_json_jxa:
     properties.update({
         k:
@@ -103,14 +200,18 @@ def get_project_config(
     })
 
   try:
-    return JxaProjectConfig(**{k: v.value for k, v in properties.items()})
+    config = JxaProjectConfig(**{k: v.value for k, v in properties.items()})
+    _config_cache[key] = stats, config
+    return config
   except ValidationError as e:
     errors = e.errors()
     error_msg = f'\n{len(errors)} validation error(s)'
     for error in e.errors():
       prop = error.get('loc', [])
       if prop:
-        prop_info = properties[prop[0]]
+        ## Defaults aren't in the loaded properties
+        prop_info = properties.get(
+            prop[0], LoadedPropInfo(None, '', recase(prop[0], 'camel')))
         error_msg += (f'\n[bold cyan]{prop_info.original_name}[/bold cyan]'
                       if IS_RICH else f'\n{prop_info.original_name}') + (
                           f" in {prop_info.origin}"
@@ -0,0 +1,205 @@
+import os
+from os import path as p
+import json
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+from jxa_builder.core.models import Module, CompilationUnit
+from jxa_builder.utils.format_size import format_size
+
+
+@dataclass
+class GraphNode:
+  name: str
+  version: str
+  source: str
+  ## Sources of the modules this one loads with Library()
+  dependencies: List[str]
+  source_size: int
+  ## None when the project wasn't built (or the module is new since then)
+  preprocessed_size: Optional[int] = None
+  compiled_size: Optional[int] = None
+  ## Seconds the last compilation took
+  compile_time: Optional[float] = None
+  ## Modules loaded with this one (itself included) and their size
+  ## (see _get_weight)
+  closure_modules: int = 0
+  closure_size: int = 0
+  duplicated: bool = False
+
+
+@dataclass
+class Graph:
+  project_dir: str
+  ## source -> node, the main module first
+  nodes: Dict[str, GraphNode]
+  ## Libraries found in more than one version or source: name -> node sources
+  duplicates: Dict[str, List[str]] = field(default_factory=dict)
+  ## Sources of the nodes with the largest closures, largest first
+  heaviest: List[str] = field(default_factory=list)
+  ## Units are compiled independently, so a build takes at least as long
+  ## as its slowest unit: its source and compile time
+  compile_critical_path: Optional[Dict[str, Any]] = None
+  ## The heaviest chain of Library() loads from the main module (what
+  ## loading the main module waits for)
+  load_chain: List[str] = field(default_factory=list)
+
+
+def _get_size(path: str) -> Optional[int]:
+  """Size of a file, or of all files of a directory (e.g. an applet)"""
+  if p.isdir(path):
+    return sum(
+        p.getsize(p.join(root, f)) for root, _, files in os.walk(path)
+        for f in files)
+  return p.getsize(path) if p.isfile(path) else None
+
+
+def _get_weight(node: GraphNode) -> int:
+  """What loading the module costs: its compiled size, or source size if not compiled"""
+  return node.compiled_size if node.compiled_size is not None else node.source_size
+
+
+def get_graph(project_dir: str,
+              main_module: Module,
+              modules: List[Module],
+              units: List[CompilationUnit],
+              durations: Dict[str, float],
+              top: int = 5) -> Graph:
+  """
+  Get the module graph with size and cost metrics.
+
+  Args:
+      modules: Dependencies of the main module in topological order, as returned by DependencyResolver.resolve.
+      units: Compilation units of the last build (locations.json), the main one first.
+      durations: Output path -> last compile time, as recorded in the build manifest.
+  """
+  ## Library units are named after the versioned name of their module
+  units_by_output = {p.basename(u.output_path): u for u in units[1:]}
+  main_deps = [
+      m.source for m in modules if main_module.source in m.dependant_sources
+  ]
+  nodes: Dict[str, GraphNode] = {}
+  for module, dependencies in [(main_module, main_deps)] + [
+      (m, m.dependency_sources) for m in modules
+  ]:
+    unit = units[0] if module is main_module and units else \
+      units_by_output.get(f'{module.name_ver}.scpt')
+    nodes[module.source] = GraphNode(
+        name=module.name,
+        version=module.version,
+        source=module.source,
+        dependencies=list(dependencies),
+        source_size=_get_size(module.source) or 0,
+        preprocessed_size=_get_size(unit.input_path) if unit else None,
+        compiled_size=_get_size(unit.output_path) if unit else None,
+        compile_time=durations.get(unit.output_path) if unit else None)
+  graph = Graph(project_dir, nodes)
+
+  ## Closures and the heaviest load chains, dependencies first
+  closures: Dict[str, set] = {}
+  chains: Dict[str, List[str]] = {}
+  chain_sizes: Dict[str, int] = {}
+  for source in list(nodes)[1:] + [main_module.source]:
+    node = nodes[source]
+    closure = {source}
+    for dep in node.dependencies:
+      closure |= closures[dep]
+    closures[source] = closure
+    node.closure_modules = len(closure)
+    node.closure_size = sum(_get_weight(nodes[s]) for s in closure)
+    heaviest_dep = max(node.dependencies,
+                       key=lambda d: chain_sizes[d],
+                       default=None)
+    chains[source] = [source] + (chains[heaviest_dep] if heaviest_dep else [])
+    chain_sizes[source] = _get_weight(node) + (chain_sizes[heaviest_dep]
+                                               if heaviest_dep else 0)
+  graph.load_chain = chains[main_module.source]
+
+  by_name: Dict[str, List[str]] = {}
+  for source, node in nodes.items():
+    if source != main_module.source:
+      by_name.setdefault(node.name, []).append(source)
+  graph.duplicates = {
+      name: sources
+      for name, sources in by_name.items() if len(sources) > 1
+  }
+  for sources in graph.duplicates.values():
+    for source in sources:
+      nodes[source].duplicated = True
+
+  graph.heaviest = sorted((s for s in nodes if s != main_module.source),
+                          key=lambda s: nodes[s].closure_size,
+                          reverse=True)[:top]
+  timed = [n for n in nodes.values() if n.compile_time is not None]
+  if timed:
+    slowest = max(timed, key=lambda n: n.compile_time)
+    graph.compile_critical_path = {
+        'source': slowest.source,
+        'compile_time': slowest.compile_time,
+        'total_compile_time': sum(n.compile_time for n in timed),
+    }
+  return graph
+
+
+def to_json(graph: Graph) -> str:
+  return json.dumps(asdict(graph), indent=2)
+
+
+def to_dot(graph: Graph) -> str:
+  """Duplicated libraries are red, the load chain is bold"""
+
+  def label(node: GraphNode) -> str:
+    lines = [f'{node.name}@{node.version}' if node.version else node.name]
+    lines.append(f'source {format_size(node.source_size)}' +
+                 (f', compiled {format_size(node.compiled_size)}' if node.
+                  compiled_size is not None else ''))
+    if node.compile_time is not None:
+      lines.append(f'compiled in {node.compile_time * 1000:.0f}ms')
+    lines.append(
+        f'closure {node.closure_modules} modules, {format_size(node.closure_size)}'
+    )
+    return '\n'.join(lines)
+
+  chain_edges = set(zip(graph.load_chain, graph.load_chain[1:]))
+  lines = ['digraph dependencies {', '  node [shape=box];']
+  ids = {source: f'n{i}' for i, source in enumerate(graph.nodes)}
+  for source, node in graph.nodes.items():
+    attrs = [f'label={json.dumps(label(node))}']
+    if node.duplicated:
+      attrs.append('color=red')
+    if source in graph.load_chain:
+      attrs.append('style=bold')
+    lines.append(f'  {ids[source]} [{", ".join(attrs)}];')
+  for source, node in graph.nodes.items():
+    for dep in node.dependencies:
+      style = ' [style=bold]' if (source, dep) in chain_edges else ''
+      lines.append(f'  {ids[source]} -> {ids[dep]}{style};')
+  lines.append('}')
+  return '\n'.join(lines) + '\n'
+
+
+def print_report(graph: Graph):
+  nodes = graph.nodes
+
+  def relpath(source: str) -> str:
+    return p.relpath(source, graph.project_dir)
+
+  print('Heaviest subtrees:')
+  for source in graph.heaviest:
+    node = nodes[source]
+    print(
+        f'  {node.name:<24} {format_size(node.closure_size):>10} in {node.closure_modules} module(s)  {relpath(source)}'
+    )
+  if graph.duplicates:
+    print('Duplicated libraries:')
+    for name, sources in graph.duplicates.items():
+      print(f'  {name}: ' +
+            ', '.join(f'{nodes[s].version or "(no version)"} ({relpath(s)})'
+                      for s in sources))
+  print('Load chain: ' + ' -> '.join(nodes[s].name for s in graph.load_chain))
+  if graph.compile_critical_path:
+    critical = graph.compile_critical_path
+    print(
+        f'Slowest unit: {nodes[critical["source"]].name} ({critical["compile_time"] * 1000:.0f}ms'
+        f' of {critical["total_compile_time"] * 1000:.0f}ms in total)')
+  else:
+    print('Compile times are known after a build')
@@ -0,0 +1,173 @@
+import os
+from os import path as p
+import stat
+import shutil
+from typing import Any, Dict, List, Tuple
+from jxa_builder.utils.hash_file import hash_file
+
+## Relative path ('' for a single file) -> [size, mtime_ns, sha256] of a file,
+## ['dir'] of a directory or ['link', target] of a symlink
+Records = Dict[str, List[Any]]
+
+
+def _walk(root: str) -> Dict[str, os.stat_result]:
+  """lstat of the root and everything in it, by relative path"""
+  stats = {'': os.lstat(root)}
+  if not stat.S_ISDIR(stats[''].st_mode):
+    return stats
+  for dir_path, dirs, files in os.walk(root):
+    rel_dir = p.relpath(dir_path, root)
+    for name in dirs + files:
+      rel = name if rel_dir == '.' else p.join(rel_dir, name)
+      stats[rel] = os.lstat(p.join(root, rel))
+  return stats
+
+
+def get_records(root: str, old: Records, trusted_before_ns: int) -> Records:
+  """
+  Describe the tree at root. Hashes of files whose size and mtime match
+  the old records are reused, unless they were modified after
+  `trusted_before_ns` (their content may have changed within the same mtime).
+  """
+  records: Records = {}
+  for rel, st in _walk(root).items():
+    path = p.join(root, rel) if rel else root
+    if stat.S_ISDIR(st.st_mode):
+      records[rel] = ['dir']
+    elif stat.S_ISLNK(st.st_mode):
+      records[rel] = ['link', os.readlink(path)]
+    else:
+      prev = old.get(rel)
+      if (prev and len(prev) == 3 and prev[:2] == [st.st_size, st.st_mtime_ns]
+          and st.st_mtime_ns < trusted_before_ns):
+        records[rel] = prev
+      else:
+        records[rel] = [st.st_size, st.st_mtime_ns, hash_file(path)]
+  return records
+
+
+def _get_unchanged(target_records: Records, installed: Records,
+                   dest: str) -> Tuple[set, bool]:
+  """
+  Get files of the target that are installed already and whether the whole
+  destination matches the target.
+  """
+  try:
+    dest_stats = _walk(dest)
+  except OSError:
+    return set(), False
+  unchanged = set()
+  for rel, record in target_records.items():
+    st = dest_stats.get(rel)
+    old = installed.get(rel)
+    if st is None or old is None:
+      continue
+    if record[0] == 'dir':
+      same = old == record and stat.S_ISDIR(st.st_mode)
+    elif record[0] == 'link':
+      same = old == record and stat.S_ISLNK(st.st_mode)
+    else:
+      ## Same content (the target may have been rebuilt with a new mtime),
+      ## and the installed file was not touched since it was installed
+      same = (len(old) == 3 and old[2] == record[2]
+              and stat.S_ISREG(st.st_mode)
+              and [st.st_size, st.st_mtime_ns] == old[:2])
+    if same:
+      unchanged.add(rel)
+  return unchanged, unchanged == set(target_records) and set(
+      dest_stats) == set(target_records)
+
+
+def _place(src_root: str,
+           dest_root: str,
+           rel: str,
+           record: List[Any],
+           link_from: str = ''):
+  src = p.join(src_root, rel) if rel else src_root
+  dest = p.join(dest_root, rel) if rel else dest_root
+  if record[0] == 'dir':
+    os.makedirs(dest, exist_ok=True)
+  elif record[0] == 'link':
+    os.symlink(record[1], dest)
+  else:
+    if link_from:
+      ## Unchanged files are shared with the current installation, nothing
+      ## writes into installed files, they are only replaced
+      try:
+        os.link(link_from, dest)
+        return
+      except OSError:
+        pass
+    shutil.copy2(src, dest)
+
+
+def remove_tree(path: str):
+  if p.isdir(path) and not p.islink(path):
+    shutil.rmtree(path)
+  elif p.lexists(path):
+    os.remove(path)
+
+
+def install_tree(target: str, dest: str, state: Dict[str, Any],
+                 trusted_before_ns: int) -> Tuple[Dict[str, Any], int]:
+  """
+  Install the target (a file or a directory) to dest, copying only files
+  that differ from the installed ones.
+
+  The new version is assembled next to dest and moved in place with renames,
+  so dest is never seen half-copied: a file is replaced atomically,
+  a directory is swapped with two renames.
+
+  Args:
+      state: What the previous installation recorded (as returned by it).
+
+  Returns the new state and the number of copied files (-1 when dest was
+  up to date).
+  """
+  target_records = get_records(target, state.get('target', {}),
+                               trusted_before_ns)
+  unchanged, up_to_date = _get_unchanged(target_records,
+                                         state.get('installed', {}), dest)
+  installed = {
+      rel: state['installed'][rel] if rel in unchanged else record
+      for rel, record in target_records.items()
+  }
+  if up_to_date:
+    return {'target': target_records, 'installed': installed}, -1
+
+  dest_dir = p.dirname(dest)
+  os.makedirs(dest_dir, exist_ok=True)
+  staging = p.join(dest_dir, f'.{p.basename(dest)}.{os.getpid()}.staging')
+  remove_tree(staging)
+  copied = 0
+  try:
+    for rel in sorted(target_records):
+      link_from = ''
+      if rel in unchanged and target_records[rel][0] not in ('dir', 'link'):
+        link_from = p.join(dest, rel) if rel else dest
+      else:
+        copied += target_records[rel][0] not in ('dir', 'link')
+      _place(target, staging, rel, target_records[rel], link_from)
+    ## Directory modes last, a read-only directory couldn't be filled
+    for rel in sorted(target_records, reverse=True):
+      if target_records[rel][0] == 'dir':
+        shutil.copystat(
+            p.join(target, rel) if rel else target,
+            p.join(staging, rel) if rel else staging)
+
+    if p.isdir(staging) and p.lexists(dest):
+      old = p.join(dest_dir, f'.{p.basename(dest)}.{os.getpid()}.old')
+      remove_tree(old)
+      os.rename(dest, old)
+      os.rename(staging, dest)
+      remove_tree(old)
+    else:
+      if p.isdir(dest) and not p.islink(dest):
+        shutil.rmtree(dest)
+      os.replace(staging, dest)
+  finally:
+    remove_tree(staging)
+
+  ## Copied files keep sizes and mtimes of the target ones (copy2),
+  ## linked ones are the installed files
+  return {'target': target_records, 'installed': installed}, copied
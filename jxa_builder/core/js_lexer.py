@@ -0,0 +1,333 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List
+
+## Tokens the lexer has to step over or look at, everything between them is
+## skipped by the regex engine. Braces only matter inside template
+## substitutions, where they have to be counted.
+_LITERAL_PATTERN = (
+    r'''(?P<string>"(?:[^"\\\n]|\\[\s\S])*"?|'(?:[^'\\\n]|\\[\s\S])*'?)'''
+    r'|(?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))'
+    r'|(?P<slash>/)|(?P<template>`)')
+_TOKEN_PATTERN = _LITERAL_PATTERN + r'|(?P<library>\bLibrary\s*\()'
+_TOKEN = re.compile(_TOKEN_PATTERN)
+_TOKEN_IN_TEMPLATE = re.compile(_TOKEN_PATTERN + r'|(?P<brace>[{}])')
+## Template literal text up to its end or the next substitution
+_TEMPLATE_TEXT = re.compile(r'(?:[^`\\$]|\\[\s\S]|\$(?!\{))*')
+_REGEX = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-zA-Z]*')
+_LIBRARY_ARG = re.compile(
+    r'''Library\s*\(\s*(?:"((?:[^"\\\n]|\\.)*)"|'((?:[^'\\\n]|\\.)*)'|`((?:[^`\\$]|\\.|\$(?!\{))*)`)\s*\)'''
+)
+## After these keywords a slash starts a regex, not a division
+_KEYWORDS_BEFORE_EXPRESSION = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await'
+}
+
+
+@dataclass
+class LibraryCall:
+  specifier: str
+  ## 1-based position of the Library identifier
+  line: int
+  column: int
+  ## Offsets of the specifier (without quotes) in the code
+  start: int
+  end: int
+
+
+def _slash_starts_regex(code: str, gap_start: int, pos: int,
+                        prev_is_value: bool) -> bool:
+  """
+  Decide whether "/" at pos starts a regex literal by looking at the last
+  significant character before it. Only the part of the code after the
+  last skipped token (gap_start) is examined, so the check stays local.
+  """
+  j = pos - 1
+  while j >= gap_start and code[j].isspace():
+    j -= 1
+  if j < gap_start:
+    ## Nothing but the previous token (string, template, regex, comment)
+    return not prev_is_value
+  char = code[j]
+  if char in ')]':
+    return False
+  if char.isalnum() or char in '_$':
+    k = j
+    while k >= gap_start and (code[k].isalnum() or code[k] in '_$'):
+      k -= 1
+    return code[k + 1:j + 1] in _KEYWORDS_BEFORE_EXPRESSION
+  ## Operators, punctuation and closing braces of blocks
+  return True
+
+
+def iter_library_calls(code: str) -> Iterator[LibraryCall]:
+  """
+  Find Library() calls with a literal argument in one linear scan.
+
+  Strings, template literals (including nested substitutions), regex literals
+  and comments are stepped over, so Library() text inside them is ignored.
+  """
+  pos = 0
+  ## Nothing after the last "Library" can be a call, so the scan stops there
+  ## (calls are usually at the top, vendored files often have none)
+  limit = code.rfind('Library')
+  ## Offset after the last token that was stepped over
+  gap_start = 0
+  ## Whether that token was a value (string, regex, template), so a slash after it is a division
+  prev_is_value = False
+  ## Open brace counts of the template substitutions we're in
+  templates: List[int] = []
+  line = 1
+  line_counted_to = 0
+
+  def skip_template_text(start: int) -> int:
+    """Step over template text starting at start, returns offset after it"""
+    end = _TEMPLATE_TEXT.match(code, start).end()
+    if code.startswith('${', end):
+      templates.append(0)
+      return end + 2
+    return end + 1  # closing backtick (or end of code)
+
+  while pos <= limit:
+    match = (_TOKEN_IN_TEMPLATE if templates else _TOKEN).search(code, pos)
+    if not match or match.start() > limit:
+      break
+    kind = match.lastgroup
+
+    if kind == 'string':
+      pos = gap_start = match.end()
+      prev_is_value = True
+    elif kind == 'comment':
+      ## A comment doesn't change the meaning of a slash after it,
+      ## so remember what the code before it ended with
+      prev_is_value = not _slash_starts_regex(code, gap_start, match.start(),
+                                              prev_is_value)
+      pos = gap_start = match.end()
+    elif kind == 'slash':
+      pos = match.start()
+      if _slash_starts_regex(code, gap_start, pos, prev_is_value):
+        regex = _REGEX.match(code, pos)
+        pos = regex.end() if regex else pos + 1
+        gap_start, prev_is_value = pos, True
+      else:
+        ## Division, a slash after an operator starts a regex
+        pos += 1
+        gap_start, prev_is_value = pos, False
+    elif kind == 'template':
+      pos = gap_start = skip_template_text(match.end())
+      prev_is_value = True
+    elif kind == 'brace':
+      pos = match.end()
+      if match.group() == '{':
+        templates[-1] += 1
+      elif templates[-1]:
+        templates[-1] -= 1
+      else:
+        ## End of a template substitution
+        templates.pop()
+        pos = gap_start = skip_template_text(pos)
+        prev_is_value = True
+    else:
+      call = _LIBRARY_ARG.match(code, match.start())
+      if call:
+        start = match.start()
+        group = next(i for i in (1, 2, 3) if call.group(i) is not None)
+        line += code.count('\n', line_counted_to, start)
+        line_counted_to = start
+        column = start - (code.rfind('\n', 0, start) + 1) + 1
+        yield LibraryCall(call.group(group), line, column, call.start(group),
+                          call.end(group))
+        pos = gap_start = call.end()
+        prev_is_value = True
+      else:
+        pos = match.end()
+
+
+_TOP_LEVEL_TOKEN = re.compile(
+    _LITERAL_PATTERN + r'|(?P<open>[{(\[])|(?P<close>[})\]])'
+    r'|(?P<declaration>\b(?:async\s+)?(?:function\s*\*?|class|var|let|const)\s+(?P<declared>[A-Za-z_$][\w$]*))'
+    r'|(?P<assignment>(?<![.\w$])(?P<assigned>[A-Za-z_$][\w$]*)\s*=(?![=>]))'
+    r'|(?P<word>[A-Za-z_$][\w$]*)')
+_RESERVED_WORDS = _KEYWORDS_BEFORE_EXPRESSION | {
+    'if', 'for', 'while', 'switch', 'function', 'class', 'var', 'let', 'const',
+    'this', 'null', 'true', 'false', 'undefined'
+}
+
+
+def get_top_level_names(code: str) -> Dict[str, bool]:
+  """
+  Get names the code declares (function, class, var, let, const) or assigns
+  to (implicit globals, e.g. `a = Library('a')`) outside of any braces,
+  parentheses or brackets, in the order they appear.
+
+  Returns name -> whether it's declared (not only assigned to).
+  Only the first name of a destructuring declaration is found.
+  """
+  names: Dict[str, bool] = {}
+  pos = 0
+  depth = 0
+  gap_start = 0
+  prev_is_value = False
+  ## Depths at which the template substitutions we're in were opened
+  templates: List[int] = []
+
+  def skip_template_text(start: int) -> int:
+    end = _TEMPLATE_TEXT.match(code, start).end()
+    if code.startswith('${', end):
+      templates.append(depth)
+      return end + 2
+    return end + 1
+
+  while True:
+    match = _TOP_LEVEL_TOKEN.search(code, pos)
+    if not match:
+      break
+    kind = match.lastgroup
+
+    if kind == 'string':
+      pos = gap_start = match.end()
+      prev_is_value = True
+    elif kind == 'comment':
+      prev_is_value = not _slash_starts_regex(code, gap_start, match.start(),
+                                              prev_is_value)
+      pos = gap_start = match.end()
+    elif kind == 'slash':
+      pos = match.start()
+      if _slash_starts_regex(code, gap_start, pos, prev_is_value):
+        regex = _REGEX.match(code, pos)
+        pos = regex.end() if regex else pos + 1
+        gap_start, prev_is_value = pos, True
+      else:
+        pos += 1
+        gap_start, prev_is_value = pos, False
+    elif kind == 'template':
+      pos = gap_start = skip_template_text(match.end())
+      prev_is_value = True
+    elif kind == 'open':
+      depth += 1
+      pos = match.end()
+    elif kind == 'close':
+      pos = match.end()
+      if templates and match.group() == '}' and depth == templates[-1]:
+        ## End of a template substitution
+        templates.pop()
+        pos = gap_start = skip_template_text(pos)
+        prev_is_value = True
+      else:
+        depth = max(depth - 1, 0)
+    else:
+      name = match.group('declared') or match.group('assigned')
+      if (name and depth == 0 and not templates
+          and name not in _RESERVED_WORDS):
+        names[name] = names.get(name, False) or kind == 'declaration'
+      ## Continue right after the name, what follows it is scanned as usual
+      pos = match.end('declared') if kind == 'declaration' else (
+          match.end('assigned') if kind == 'assignment' else match.end())
+  return names
+
+
+_STRIP_TOKEN = re.compile(_LITERAL_PATTERN + r'|(?P<space>\s+)')
+_STRIP_TOKEN_IN_TEMPLATE = re.compile(_STRIP_TOKEN.pattern +
+                                      r'|(?P<brace>[{}])')
+## No line break can be inserted after these or before the closing ones
+## (a line break after them never ends a statement)
+_NO_BREAK_AFTER = set(';{,([')
+_NO_BREAK_BEFORE = set('});,]')
+
+
+def _is_word_char(char: str) -> bool:
+  return char.isalnum() or char in '_$\\' or ord(char) > 127
+
+
+def strip_code(code: str) -> str:
+  """
+  Remove comments and whitespace that don't change the meaning of the code.
+
+  Strings, template literals and regex literals are kept as they are. Line
+  breaks are kept wherever a statement could end, so automatic semicolon
+  insertion works the same.
+  """
+  out: List[str] = []
+  pos = 0
+  gap_start = 0
+  prev_is_value = False
+  templates: List[int] = []
+  ## Pending whitespace: '', ' ' or '\n'
+  space = ''
+
+  def emit(text: str):
+    nonlocal space
+    if not text:
+      return
+    prev = out[-1][-1] if out else ''
+    if space and prev:
+      char = text[0]
+      if space == '\n' and prev not in _NO_BREAK_AFTER and char not in _NO_BREAK_BEFORE:
+        out.append('\n')
+      elif ((_is_word_char(prev) and _is_word_char(char))
+            or (prev in '+-' and char == prev) or (prev == char == '/')
+            or (prev.isdigit() and char == '.')):
+        out.append(' ')
+    space = ''
+    out.append(text)
+
+  def skip_template_text(start: int) -> int:
+    end = _TEMPLATE_TEXT.match(code, start).end()
+    if code.startswith('${', end):
+      templates.append(0)
+      return end + 2
+    return end + 1
+
+  while True:
+    match = (_STRIP_TOKEN_IN_TEMPLATE if templates else _STRIP_TOKEN).search(
+        code, pos)
+    if not match:
+      emit(code[pos:])
+      break
+    emit(code[pos:match.start()])
+    kind = match.lastgroup
+
+    if kind in ('space', 'comment'):
+      if kind == 'comment':
+        prev_is_value = not _slash_starts_regex(code, gap_start, match.start(),
+                                                prev_is_value)
+        gap_start = match.end()
+      if '\n' in match.group() or match.group().startswith('//'):
+        space = '\n'
+      elif not space:
+        space = ' '
+      pos = match.end()
+    elif kind == 'string':
+      emit(match.group())
+      pos = gap_start = match.end()
+      prev_is_value = True
+    elif kind == 'slash':
+      start = match.start()
+      if _slash_starts_regex(code, gap_start, start, prev_is_value):
+        regex = _REGEX.match(code, start)
+        pos = regex.end() if regex else start + 1
+        gap_start, prev_is_value = pos, True
+      else:
+        pos = start + 1
+        gap_start, prev_is_value = pos, False
+      emit(code[start:pos])
+    elif kind == 'template':
+      start = match.start()
+      pos = gap_start = skip_template_text(match.end())
+      prev_is_value = True
+      emit(code[start:pos])
+    else:
+      ## Brace in a template substitution
+      start = match.start()
+      pos = match.end()
+      if match.group() == '{':
+        templates[-1] += 1
+      elif templates[-1]:
+        templates[-1] -= 1
+      else:
+        templates.pop()
+        pos = gap_start = skip_template_text(pos)
+        prev_is_value = True
+      emit(code[start:pos])
+  return ''.join(out) + ('\n' if out else '')
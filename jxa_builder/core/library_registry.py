@@ -0,0 +1,138 @@
+import os
+from os import path as p
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, List
+from jxa_builder.core.constants import USER_LIBS_DIR_ABS, SYSTEM_LIBS_DIR_ABS, PROG_NAME
+from jxa_builder.utils.hash_file import hash_file
+from jxa_builder.utils.logger import logger
+
+REGISTRY_FILE = f'.{PROG_NAME}-registry.json'
+## Libraries directories shared by all the projects
+SHARED_LIBS_DIRS = (USER_LIBS_DIR_ABS, SYSTEM_LIBS_DIR_ABS)
+
+
+def hash_output(path: str) -> str:
+  """Get sha256 hex digest of a file, or of the files of a directory (e.g. an applet)"""
+  if not p.isdir(path):
+    return hash_file(path)
+  h = hashlib.sha256()
+  for root, dirs, files in os.walk(path):
+    dirs.sort()
+    for f in sorted(files):
+      file_path = p.join(root, f)
+      h.update(
+          f'{p.relpath(file_path, path)}\0{hash_file(file_path)}\0'.encode())
+  return h.hexdigest()
+
+
+class LibraryRegistry:
+  """
+  Libraries installed to a shared libraries directory, with the hash of the
+  installed output and the projects using it (their reference count).
+
+  Libraries installed before the registry existed have no entry, they're
+  copied and removed like before.
+  """
+
+  def __init__(self, libs_dir: str):
+    self.libs_dir = libs_dir
+    self.path = p.join(libs_dir, REGISTRY_FILE)
+    ## name -> {'hash': ..., 'projects': [...]}
+    self.libraries: Dict[str, Dict[str, Any]] = {}
+    self.changed = False
+    try:
+      with open(self.path, 'r') as f:
+        libraries = json.load(f).get('libraries')
+      if isinstance(libraries, dict):
+        self.libraries = libraries
+    except Exception as e:
+      if p.exists(self.path):
+        logger.debug('Discarding unreadable registry %s: %s', self.path, e)
+
+  def is_installed(self, name: str, digest: str) -> bool:
+    """Whether the identical library is installed"""
+    entry = self.libraries.get(name)
+    return bool(entry) and entry.get('hash') == digest and p.lexists(
+        p.join(self.libs_dir, name))
+
+  def get_users(self, name: str, project: str) -> List[str]:
+    """
+    Get the other projects using the installed library.
+    Projects that don't exist anymore don't count.
+    """
+    entry = self.libraries.get(name)
+    if not entry or not p.lexists(p.join(self.libs_dir, name)):
+      return []
+    return [
+        proj for proj in entry['projects'] if proj != project and p.isdir(proj)
+    ]
+
+  def get_conflicts(self, name: str, digest: str, project: str) -> List[str]:
+    """
+    Get the other projects using another build of the library (a different
+    hash under the same name), which installing this one replaces.
+    """
+    entry = self.libraries.get(name)
+    if not entry or entry.get('hash') == digest:
+      return []
+    return self.get_users(name, project)
+
+  def add(self, name: str, digest: str, project: str):
+    """Record that the project installed the library (once it's installed)"""
+    entry = self.libraries.get(name)
+    if entry and entry['hash'] == digest:
+      if project in entry['projects']:
+        return
+      entry['projects'].append(project)
+    else:
+      ## Another build replaced the installed one, the projects that used it
+      ## keep their references, so it's removed only when none is left
+      ## (see get_conflicts)
+      self.libraries[name] = {
+          'hash': digest,
+          'projects': self.get_users(name, project) + [project]
+      }
+    self.changed = True
+
+  def release(self, name: str, project: str) -> bool:
+    """
+    Drop the project's reference to the library, returns whether the library
+    can be removed (no other project uses it). Projects that don't exist
+    anymore don't count.
+    """
+    entry = self.libraries.get(name)
+    if not entry:
+      return True
+    projects = [
+        proj for proj in entry['projects'] if proj != project and p.isdir(proj)
+    ]
+    if projects != entry['projects']:
+      entry['projects'] = projects
+      self.changed = True
+    if not projects:
+      del self.libraries[name]
+      self.changed = True
+    return not projects
+
+  def dumps(self) -> str:
+    return json.dumps({'libraries': self.libraries}, indent=2, sort_keys=True)
+
+  def save(self):
+    tmp_file = f'{self.path}.{os.getpid()}.tmp'
+    try:
+      with open(tmp_file, 'w') as f:
+        f.write(self.dumps())
+      os.replace(tmp_file, self.path)
+    finally:
+      if p.exists(tmp_file):
+        os.remove(tmp_file)
+
+  def stage(self) -> str:
+    """Write the registry to a temporary file, for a privileged install"""
+    staging_dir = tempfile.mkdtemp(prefix=f'{PROG_NAME}-')
+    staged = p.join(staging_dir, REGISTRY_FILE)
+    with open(staged, 'w') as f:
+      f.write(self.dumps())
+    return staged
@@ -1,11 +1,16 @@
 import os
 from os import path as p
-import shutil
-import subprocess
 import json
-from typing import Literal, List
-from jxa_builder.core.constants import SYSTEM_TMP_DIR_ABS, APPS_DIR_ABS
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Literal, List, Optional, Tuple
+from jxa_builder.core.constants import APPS_DIR_ABS, INSTALL_STATE_FILE, RACY_WINDOW_NS
 from jxa_builder.core.models import CompilationUnit
+from jxa_builder.core.install_tree import install_tree, remove_tree
+from jxa_builder.core.privileged_install import needs_privileges, run_privileged, PrivilegedInstallError
+from jxa_builder.core.library_registry import LibraryRegistry, SHARED_LIBS_DIRS, hash_output
+from jxa_builder.core.tracing import span
 from jxa_builder.utils.printit import log_print_error, log_print_warning
 from jxa_builder.utils.logger import logger
 
@@ -13,6 +18,36 @@ from jxa_builder.utils.logger import logger
 # Instead of the locations file, gather deps in folders (the preprocessed folder)
 
 
+def load_install_state(state_file: str) -> Dict[str, Any]:
+  """What was installed by the previous runs, see install_tree"""
+  try:
+    with open(state_file, 'r') as f:
+      state = json.load(f)
+    if isinstance(state.get('units'), dict):
+      return state
+  except Exception as e:
+    if p.exists(state_file):
+      logger.debug('Discarding unreadable install state %s: %s', state_file, e)
+  return {'written_ns': 0, 'units': {}}
+
+
+def save_install_state(state_file: str, state: Dict[str, Any]):
+  state['written_ns'] = time.time_ns()
+  try:
+    ## freeze-nodejs-deps may run before anything was built
+    os.makedirs(p.dirname(state_file), exist_ok=True)
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+      json.dump(state, f)
+    os.replace(tmp_file, state_file)
+  except Exception as e:
+    logger.warning('Cannot write the install state %s: %s', state_file, e)
+
+
+def is_within(path: str, directory: str) -> bool:
+  return path.startswith(directory.rstrip(p.sep) + p.sep)
+
+
 def manage_outputs(action: Literal['install', 'uninstall'],
                    locations_file: str,
                    deps_only: bool = False):
@@ -22,10 +57,6 @@ def manage_outputs(action: Literal['install', 'uninstall'],
   
   Common func body for both install and uninstall commands
   """
-  system_tmp = SYSTEM_TMP_DIR_ABS
-  perm_problem = False
-  shell_command = ''
-  output_dir = ''
   if p.exists(locations_file):
     try:
       with open(locations_file, 'r') as f:
@@ -39,72 +70,155 @@ def manage_outputs(action: Literal['install', 'uninstall'],
           loc for loc in locations
           if p.dirname(loc.installation_path) != APPS_DIR_ABS
       ]
-    for loc in locations:
-      target = loc.output_path
-      dest_file = loc.installation_path
-      dest_file_dir = p.dirname(dest_file)
-      if not output_dir:
-        output_dir = p.dirname(target)
-      if target != dest_file:
-        try:
-          if p.exists(dest_file) and p.exists(target):
-            shutil.rmtree(dest_file) if p.isdir(dest_file) else os.remove(
-                dest_file)
-          if action == 'install' and p.exists(target):
-            os.makedirs(dest_file_dir, exist_ok=True)
-            shutil.copytree(
-                target, dest_file_dir,
-                dirs_exist_ok=True) if p.isdir(target) else shutil.copy(
-                    target, dest_file_dir)
-        ## - To perform action that needs sudo it will use constructed shell command
-        ##   that is invoked by JXA's doShellScript with administrator privileges,
-        ##   so convinient Touch ID can be used to authenticate (however sudo also works).
-        ## - The shell command is used instead of running the python script itself
-        ##   to avoid Operatin not permitted error (with admin privils home dir cannot be accessed).
-        ## - Files to be installed are first copied to the system temporary directory
-        ##   beacuse of the same reason as above.
-        ##   More info: https://stackoverflow.com/a/68694914
-        except Exception as e:
-          # except PermissionError as e:
-          target = p.join(system_tmp, p.basename(target))
-          perm_problem = True
-          ## The assembled command is executed later, so all the checks need to be done again
-          shell_command += f'[ -e "{dest_file}" ] && [ -e "{target}" ] && rm -r "{dest_file}" || true;'  ## true to make exit code 0
-          if action == 'install':
-            shell_command += f'[ -e "{target}" ] && (mkdir -p "{dest_file_dir}" && mv "{target}" "{dest_file_dir}");'
+    state_file = p.join(p.dirname(locations_file),
+                        p.basename(INSTALL_STATE_FILE))
+    state = load_install_state(state_file)
+    trusted_before_ns = state['written_ns'] - RACY_WINDOW_NS
+    units = [
+        loc for loc in locations if loc.output_path != loc.installation_path
+    ]
 
-    if perm_problem:
-      jxa_command = f'''
-      const app = Application.currentApplication();
-      app.includeStandardAdditions = true;
-      app.doShellScript('{shell_command}', {{
-        administratorPrivileges: true,
-        alteringLineEndings: false,
-        withPrompt: "Administration privileges are needed to perform the task.\\nPlease enter your password:",
-      }});
-      '''
-      logger.debug(f'JXA command: {jxa_command}')
+    ## Libraries in the shared directories are reference counted by project
+    ## (see LibraryRegistry): an identical library installed by another
+    ## project isn't copied again, and a library is removed only when
+    ## no other project uses it
+    project_dir = p.realpath(p.dirname(p.dirname(p.abspath(locations_file))))
+    registries: Dict[str, LibraryRegistry] = {}
+    shared: List[CompilationUnit] = []
+    ## Libraries to record once they're installed: registry, name and hash
+    installed_libraries: List[Tuple[LibraryRegistry, str, str]] = []
+    for unit in units:
+      libs_dir = p.dirname(unit.installation_path)
+      if libs_dir not in SHARED_LIBS_DIRS or not p.exists(unit.output_path):
+        continue
+      if libs_dir not in registries:
+        registries[libs_dir] = LibraryRegistry(libs_dir)
+      registry = registries[libs_dir]
+      name = p.basename(unit.installation_path)
       if action == 'install':
+        digest = hash_output(unit.output_path)
+        conflicts = registry.get_conflicts(name, digest, project_dir)
+        if conflicts:
+          log_print_warning(
+              f'Replacing "{unit.installation_path}" with another build of it, the installed one is used by: '
+              + ', '.join(conflicts) +
+              '. Change the version of the library to install both.')
+        if registry.is_installed(name, digest):
+          shared.append(unit)
+        installed_libraries.append((registry, name, digest))
+      elif not registry.release(name, project_dir):
+        shared.append(unit)
+    units = [u for u in units if u not in shared]
+
+    def record_libraries(registries_to_record: List[LibraryRegistry]):
+      for registry, name, digest in installed_libraries:
+        if registry in registries_to_record:
+          registry.add(name, digest, project_dir)
+
+    ## Registries this user cannot write to are installed by the privileged
+    ## helper, after the outputs and only if all of them were installed
+    privileged_registries = [
+        r for r in registries.values() if needs_privileges(r.path)
+    ]
+    record_libraries(privileged_registries)
+    staged_registries = [
+        CompilationUnit(input_path='',
+                        output_path=r.stage(),
+                        installation_path=r.path)
+        for r in privileged_registries if r.changed
+    ]
+
+    def manage_unit(unit: CompilationUnit) -> Optional[int]:
+      """Returns the number of copied files, -1 if up to date, None if skipped"""
+      target = unit.output_path
+      dest_file = unit.installation_path
+      if not p.exists(target):
+        return None
+      if action == 'uninstall':
+        with span('uninstall_unit', dest=dest_file):
+          remove_tree(dest_file)
+        state['units'].pop(dest_file, None)
+        return 0
+      with span('install_unit', dest=dest_file):
+        unit_state, copied = install_tree(target, dest_file,
+                                          state['units'].get(dest_file, {}),
+                                          trusted_before_ns)
+      state['units'][dest_file] = unit_state
+      return copied
+
+    ## Libraries embedded in another output go first,
+    ## so the output is installed with them
+    embedded = [
+        u for u in units if any(
+            is_within(u.installation_path, o.output_path) for o in units)
+    ]
+    rest = [u for u in units if u not in embedded]
+    ## Destinations this user cannot write to are handled together,
+    ## by a single privileged helper (see run_privileged)
+    privileged = [
+        u for u in rest
+        if p.exists(u.output_path) and needs_privileges(u.installation_path)
+        and (action == 'install' or p.lexists(u.installation_path))
+    ]
+    phases = [embedded, [u for u in rest if u not in privileged]]
+    done = 'installed' if action == 'install' else 'removed'
+    counts = {'up to date': 0, done: 0, 'copied files': 0}
+    if action == 'install':
+      counts['up to date'] += len(shared)
+    else:
+      counts['used by other projects'] = len(shared)
+    denied: List[CompilationUnit] = []
+    ## Destinations are independent, so they're handled in parallel,
+    ## the privileged ones while the others are being installed
+    ## (once the embedded libraries are in the outputs they archive)
+    try:
+      with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        privileged_future = None
+        for phase in phases:
+          futures = [(unit, executor.submit(manage_unit, unit))
+                     for unit in phase]
+          if phase is not embedded and (
+              privileged or staged_registries) and not privileged_future:
+            privileged_future = executor.submit(run_privileged, action,
+                                                privileged, staged_registries)
+          for unit, future in futures:
+            e = future.exception()
+            if isinstance(e, PermissionError):
+              denied.append(unit)
+            elif e:
+              log_print_error(
+                  f'Cannot {action} "{unit.installation_path}": {e}')
+              exit(1)
+            elif future.result() == -1:
+              counts['up to date'] += 1
+            elif future.result() is not None:
+              counts[done] += 1
+              counts['copied files'] += future.result()
+        if privileged_future and privileged_future.exception():
+          raise privileged_future.exception()
+      ## Permissions deeper in a destination only show up when replacing it
+      if denied:
+        run_privileged(action, denied)
+    except PrivilegedInstallError as e:
+      log_print_error(str(e))
+      exit(1)
+    finally:
+      for unit in staged_registries:
+        shutil.rmtree(p.dirname(unit.output_path), ignore_errors=True)
+    for unit in privileged + denied:
+      state['units'].pop(unit.installation_path, None)
+      counts[done] += 1
+    save_install_state(state_file, state)
+    record_libraries(
+        [r for r in registries.values() if r not in privileged_registries])
+    for registry in registries.values():
+      if registry.changed and registry not in privileged_registries:
         try:
-          shutil.copytree(output_dir, system_tmp, dirs_exist_ok=True)
+          registry.save()
         except Exception as e:
-          log_print_error(
-              f'Cannot copy output directory to temporary directory (system): {e}'
-          )
-          exit(1)
-      try:
-        subprocess.run(['osascript', '-l', 'JavaScript', '-e', jxa_command],
-                       text=True)
-      except subprocess.CalledProcessError as e:
-        log_print_error(f'Cannot run {action} action: {e}')
-        exit(1)
-      if action == 'install':
-        if p.exists(system_tmp):
-          try:
-            shutil.rmtree(system_tmp)
-          except Exception as e:
-            log_print_warning(
-                f'Cannot delete temporary directory (system): {e}')
+          logger.warning('Cannot write the registry %s: %s', registry.path, e)
+    logger.info('%s: %s', action,
+                ', '.join(f'{v} {k}' for k, v in counts.items()))
 
   else:
     log_print_error(f'Locations file: {locations_file} not found')
@@ -0,0 +1,123 @@
+import os
+from os import path as p
+import hashlib
+import importlib.util
+from typing import Dict, List, Tuple
+from jxa_builder.core.js_lexer import strip_code
+from jxa_builder.core.tracing import span
+from jxa_builder.utils.printit import log_print_error, log_print_block
+from jxa_builder.utils.logger import logger
+
+## Names of local variables are shortened when calmjs.parse is installed
+## (it only parses ES5, other sources are only stripped)
+IS_CALMJS = importlib.util.find_spec('calmjs') is not None and \
+  importlib.util.find_spec('calmjs.parse') is not None
+## Bump whenever the output of the minifier changes
+MINIFIER_VERSION = 1
+## Cached results kept per compiled unit
+CACHE_ENTRIES_PER_UNIT = 4
+
+
+def minify_code(code: str) -> str:
+  """
+  Remove comments and whitespace and, with calmjs.parse, shorten names
+  of local variables.
+
+  Top level names (what a script library exposes), properties (e.g. JXA and
+  ObjC bridge names) and strings (e.g. Library() arguments) are never changed.
+  """
+  if IS_CALMJS:
+    from calmjs.parse import es5
+    from calmjs.parse.exceptions import ECMASyntaxError
+    from calmjs.parse.unparsers.es5 import minify_print
+    try:
+      return minify_print(es5(code), obfuscate=True,
+                          obfuscate_globals=False) + '\n'
+    except ECMASyntaxError:
+      pass
+  return strip_code(code)
+
+
+def _get_cache_key(code: bytes) -> str:
+  h = hashlib.sha256(f'{MINIFIER_VERSION}:{IS_CALMJS}:'.encode())
+  h.update(code)
+  return h.hexdigest()
+
+
+def minify_file(source: str, cache_dir: str) -> Tuple[str, int, int, bool]:
+  """
+  Minify the source into the cache directory, unless a file with the same
+  content was minified already.
+
+  Returns the minified file, sizes before and after, and whether it was cached.
+  """
+  try:
+    with open(source, 'rb') as f:
+      code = f.read()
+  except Exception as e:
+    log_print_error(f'Cannot read a source "{source}": {e}')
+    exit(1)
+  dest = p.join(cache_dir, _get_cache_key(code) + '.js')
+  if p.isfile(dest):
+    ## Keeps recently used results from being pruned
+    os.utime(dest)
+    return dest, len(code), p.getsize(dest), True
+  try:
+    minified = minify_code(code.decode('utf-8')).encode('utf-8')
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f'{dest}.{os.getpid()}.tmp'
+    with open(tmp_file, 'wb') as f:
+      f.write(minified)
+    os.replace(tmp_file, dest)
+  except Exception as e:
+    log_print_error(f'Cannot minify a source "{source}": {e}')
+    exit(1)
+  return dest, len(code), len(minified), False
+
+
+def prune_cache(cache_dir: str, keep: int):
+  """Remove all but `keep` most recently used results"""
+  try:
+    entries = [e for e in os.scandir(cache_dir) if e.name.endswith('.js')]
+  except OSError:
+    return
+  entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+  for entry in entries[keep:]:
+    try:
+      os.remove(entry.path)
+    except OSError as e:
+      logger.debug('Cannot delete a minified source %s: %s', entry.path, e)
+
+
+def minify_sources(sources: List[str], cache_dir: str,
+                   units_count: int) -> Dict[str, str]:
+  """
+  Minify the sources, reporting sizes of each of them.
+
+  Returns source -> minified file.
+  """
+  minified_files = {}
+  if not sources:
+    return minified_files
+  total_before = total_after = cached = 0
+  lines = []
+  ## Sources are shown relative to their common directory (many are index.js)
+  base_dir = p.dirname(
+      p.commonpath(sources)) if len(sources) == 1 else p.commonpath(sources)
+  for source in sources:
+    with span('minify', source=source):
+      minified_files[source], before, after, was_cached = minify_file(
+          source, cache_dir)
+    total_before += before
+    total_after += after
+    cached += was_cached
+    lines.append(
+        f'{p.relpath(source, base_dir)}: {before} -> {after} bytes ({after / max(before, 1):.0%})'
+        + (' (cached)' if was_cached else ''))
+  lines.append(
+      f'{len(sources)} source(s) ({cached} cached): {total_before} -> {total_after} bytes'
+  )
+  log_print_block('\n'.join(lines), 'Minified')
+  prune_cache(cache_dir,
+              max(len(sources), units_count) * CACHE_ENTRIES_PER_UNIT)
+  return minified_files
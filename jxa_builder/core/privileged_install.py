@@ -0,0 +1,159 @@
+import os
+from os import path as p
+import json
+import shlex
+import shutil
+import tarfile
+import tempfile
+import subprocess
+from logging import DEBUG
+from typing import List, Literal, Optional
+from jxa_builder.core.constants import SYSTEM_TMP_DIR_ABS, PROG_NAME
+from jxa_builder.core.models import CompilationUnit
+from jxa_builder.utils.printit import log_print_warning
+from jxa_builder.utils.logger import logger
+from jxa_builder.core.tracing import span
+
+ARCHIVE_FILE = 'outputs.tar'
+MANIFEST_FILE = 'manifest.tsv'
+HELPER_FILE = 'helper.sh'
+
+## Runs as root with the work directory as its argument. The manifest has
+## one operation per line: install<TAB>path in the archive<TAB>destination
+## or remove<TAB>-<TAB>destination. An installed destination is swapped with
+## renames, the old version is restored when the new one cannot be moved in.
+## commit<TAB>path in the archive<TAB>destination is an install done only
+## when all the previous operations succeeded.
+HELPER_SCRIPT = r'''set -u
+work="$1"
+status=0
+tab="$(printf '\t')"
+mkdir -p "$work/staging" || exit 1
+if [ -f "$work/outputs.tar" ]; then
+  tar -xpf "$work/outputs.tar" -C "$work/staging" || { rm -rf "$work"; exit 1; }
+fi
+while IFS="$tab" read -r op src dest; do
+  old="$dest.jxa-builder-old.$$"
+  if [ "$op" = commit ]; then
+    [ "$status" -eq 0 ] || continue
+    op=install
+  fi
+  case "$op" in
+    install)
+      mkdir -p "$(dirname "$dest")" || { status=1; continue; }
+      if [ -e "$dest" ] || [ -L "$dest" ]; then
+        mv "$dest" "$old" || { status=1; continue; }
+      fi
+      if mv "$work/staging/$src" "$dest"; then
+        rm -rf "$old"
+      else
+        status=1
+        if [ -e "$old" ] || [ -L "$old" ]; then mv "$old" "$dest"; fi
+      fi
+      ;;
+    remove)
+      rm -rf "$dest" || status=1
+      ;;
+  esac
+done < "$work/manifest.tsv"
+rm -rf "$work"
+exit $status
+'''
+
+
+def needs_privileges(dest: str) -> bool:
+  """Whether dest cannot be replaced by this user"""
+  directory = p.dirname(dest)
+  while directory and not p.exists(directory):
+    parent = p.dirname(directory)
+    if parent == directory:
+      break
+    directory = parent
+  return not os.access(directory, os.W_OK | os.X_OK)
+
+
+class PrivilegedInstallError(Exception):
+  pass
+
+
+def run_privileged(action: Literal['install', 'uninstall'],
+                   units: List[CompilationUnit],
+                   extra_files: Optional[List[CompilationUnit]] = None):
+  """
+  Install or uninstall the units with administrator privileges, asking
+  for them once for all the units. Extra files (e.g. library registries)
+  are installed after the units whatever the action, only if all the units
+  were installed or removed.
+
+  Outputs of the units are staged as a single archive in the system temporary
+  directory, along with a manifest of the operations and a helper script
+  that performs them. The helper is run by JXA's doShellScript, so
+  convenient Touch ID can be used to authenticate (however sudo also works).
+
+  Raises PrivilegedInstallError if the outputs cannot be staged or the helper fails.
+  """
+  ## With administrator privileges the home directory cannot be accessed,
+  ## hence everything the helper needs is in the system temporary directory.
+  ## More info: https://stackoverflow.com/a/68694914
+  tmp_root = p.dirname(SYSTEM_TMP_DIR_ABS)
+  operations = [(u, 'install' if action == 'install' else 'remove')
+                for u in units] + [(u, 'commit') for u in extra_files or []]
+  lines = []
+  try:
+    work_dir = tempfile.mkdtemp(prefix=f'{PROG_NAME}-', dir=tmp_root)
+    names = [
+        f'{i}/{p.basename(u.output_path)}'
+        for i, (u, _) in enumerate(operations)
+    ]
+    for (unit, op), name in zip(operations, names):
+      dest = unit.installation_path
+      if any(c in dest for c in '\t\n'):
+        raise ValueError(f'unsupported characters in "{dest}"')
+      lines.append(f'{op}\t{"-" if op == "remove" else name}\t{dest}\n')
+    if any(op != 'remove' for _, op in operations):
+      with tarfile.open(p.join(work_dir, ARCHIVE_FILE), 'w') as archive:
+        for (unit, op), name in zip(operations, names):
+          if op != 'remove':
+            archive.add(unit.output_path, arcname=name)
+    with open(p.join(work_dir, MANIFEST_FILE), 'w') as f:
+      f.writelines(lines)
+    helper = p.join(work_dir, HELPER_FILE)
+    with open(helper, 'w') as f:
+      f.write(HELPER_SCRIPT)
+  except Exception as e:
+    raise PrivilegedInstallError(
+        f'Cannot stage outputs in the temporary directory: {e}') from e
+
+  shell_command = f'/bin/sh {shlex.quote(helper)} {shlex.quote(work_dir)}'
+  jxa_command = f'''
+  const app = Application.currentApplication();
+  app.includeStandardAdditions = true;
+  app.doShellScript({json.dumps(shell_command)}, {{
+    administratorPrivileges: true,
+    alteringLineEndings: false,
+    withPrompt: "Administration privileges are needed to perform the task.\\nPlease enter your password:",
+  }});
+  '''
+  if logger.isEnabledFor(DEBUG):
+    logger.debug('Privileged manifest:\n%s', ''.join(lines))
+  try:
+    with span('privileged_helper', units=len(operations)):
+      result = subprocess.run(
+          ['osascript', '-l', 'JavaScript', '-e', jxa_command],
+          text=True,
+          capture_output=True)
+  except OSError as e:
+    result = None
+    error = str(e)
+  else:
+    error = result.stderr.strip()
+  finally:
+    ## The helper removes the work directory, unless it didn't run
+    if p.exists(work_dir):
+      try:
+        shutil.rmtree(work_dir)
+      except Exception as e:
+        log_print_warning(f'Cannot delete temporary directory (system): {e}')
+  if not result or result.returncode != 0:
+    raise PrivilegedInstallError(
+        f'Cannot run {action} action with privileges: {error}')
@@ -0,0 +1,34 @@
+import shutil
+from typing import Dict, List
+from jxa_builder.core.js_lexer import iter_library_calls
+
+
+def rewrite_libraries(source: str, dest: str, names: Dict[str, str]):
+  """
+  Copy the source to dest, replacing names in all Library() calls in one pass.
+
+  Calls are found by the same lexer as the dependency resolution
+  (see iter_library_calls), so Library() text in comments and strings
+  is left untouched.
+
+  Args:
+      names (Dict[str, str]): Library name (the last component of the Library() argument) -> new name. Calls with other names are left untouched.
+  """
+  if not names:
+    shutil.copy2(source, dest)
+    return
+
+  ## newline='' keeps the original line endings
+  with open(source, 'r', newline='') as src:
+    code = src.read()
+  parts: List[str] = []
+  pos = 0
+  for call in iter_library_calls(code):
+    new_name = names.get(call.specifier.rsplit('/', 1)[-1])
+    if new_name is not None:
+      parts.append(code[pos:call.start])
+      parts.append(new_name)
+      pos = call.end
+  parts.append(code[pos:])
+  with open(dest, 'w', newline='') as dst:
+    dst.write(''.join(parts))
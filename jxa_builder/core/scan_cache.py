@@ -0,0 +1,143 @@
+import os
+from os import path as p
+import json
+import time
+from typing import Dict, List, Optional, Tuple, Literal
+from jxa_builder.core.constants import RACY_WINDOW_NS
+from jxa_builder.utils.hash_file import hash_file
+from jxa_builder.utils.logger import logger
+
+## Bump whenever the entry layout or the scanning rules change
+SCAN_CACHE_VERSION = 2
+
+Fingerprint = Literal['stat', 'content']
+
+
+class ScanCache:
+  """
+  Persistent cache of Library() scan results, stored in the build directory.
+
+  An entry is reused when the size and mtime of the source didn't change
+  (or, with the 'content' fingerprint, when its content hash is the same).
+  Resolved targets are additionally bound to the mtimes of the directories
+  that were searched, so a library that appears in a search path with a
+  higher priority invalidates them.
+  """
+
+  def __init__(self, cache_file: str, fingerprint: Fingerprint = 'stat'):
+    self.cache_file = cache_file
+    self.fingerprint = fingerprint
+    self._entries: Dict[str, dict] = {}
+    self._used: Dict[str, dict] = {}
+    self._dir_mtimes: Dict[str, Optional[int]] = {}
+    self._written_ns = 0
+
+  @classmethod
+  def load(cls,
+           cache_file: str,
+           fingerprint: Fingerprint = 'stat') -> 'ScanCache':
+    cache = cls(cache_file, fingerprint)
+    if not p.isfile(cache_file):
+      return cache
+    try:
+      with open(cache_file, 'r') as f:
+        data = json.load(f)
+      if data.get('version') != SCAN_CACHE_VERSION:
+        logger.debug('Discarding scan cache with other version: %s',
+                     cache_file)
+        return cache
+      cache._entries = data['entries']
+      cache._written_ns = data['written_ns']
+    except Exception as e:
+      logger.debug('Discarding unreadable scan cache %s: %s', cache_file, e)
+    return cache
+
+  def begin_run(self):
+    """
+    Start a new run in a long-lived process (e.g. watch mode).
+    Entries will be validated against the file system again.
+    """
+    self._entries.update(self._used)
+    self._used = {}
+    self._dir_mtimes = {}
+
+  def save(self):
+    """Write entries used during this run (entries of removed files are dropped)"""
+    self._written_ns = time.time_ns()
+    data = {
+        'version': SCAN_CACHE_VERSION,
+        'written_ns': self._written_ns,
+        'entries': self._used,
+    }
+    try:
+      os.makedirs(p.dirname(self.cache_file), exist_ok=True)
+      tmp_file = self.cache_file + '.tmp'
+      with open(tmp_file, 'w') as f:
+        json.dump(data, f)
+      os.replace(tmp_file, self.cache_file)
+    except Exception as e:
+      logger.warning('Cannot write the scan cache %s: %s', self.cache_file, e)
+
+  def _dir_mtime(self, dir_path: str) -> Optional[int]:
+    if dir_path not in self._dir_mtimes:
+      try:
+        self._dir_mtimes[dir_path] = os.stat(dir_path).st_mtime_ns
+      except OSError:
+        self._dir_mtimes[dir_path] = None
+    return self._dir_mtimes[dir_path]
+
+  def _get_entry(self, source: str) -> Optional[dict]:
+    if source in self._used:
+      return self._used[source]
+    entry = self._entries.get(source)
+    if entry is None:
+      return None
+    try:
+      st = os.stat(source)
+    except OSError:
+      return None
+    if (st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']
+        and st.st_mtime_ns < self._written_ns - RACY_WINDOW_NS):
+      self._used[source] = entry
+      return entry
+    if self.fingerprint == 'content' and entry.get('hash') == hash_file(
+        source):
+      entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+      self._used[source] = entry
+      return entry
+    return None
+
+  def get_libraries(self, source: str) -> Optional[List[str]]:
+    entry = self._get_entry(source)
+    return entry['libraries'] if entry else None
+
+  def set_libraries(self, source: str, libraries: List[str]):
+    try:
+      st = os.stat(source)
+    except OSError:
+      return
+    self._used[source] = {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'hash': hash_file(source) if self.fingerprint == 'content' else None,
+        'libraries': libraries,
+        'resolved': None,
+    }
+
+  def get_resolved(self, source: str) -> Optional[List[Tuple[str, bool]]]:
+    """Get resolved (library path, is package directory) pairs"""
+    entry = self._get_entry(source)
+    if not entry or entry.get('resolved') is None:
+      return None
+    for dir_path, mtime_ns in entry['searched_dirs'].items():
+      if self._dir_mtime(dir_path) != mtime_ns:
+        return None
+    return [tuple(r) for r in entry['resolved']]
+
+  def set_resolved(self, source: str, resolved: List[Tuple[str, bool]],
+                   searched_dirs: List[str]):
+    entry = self._used.get(source)
+    if entry is None:
+      return
+    entry['resolved'] = [list(r) for r in resolved]
+    entry['searched_dirs'] = {d: self._dir_mtime(d) for d in searched_dirs}
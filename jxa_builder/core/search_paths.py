@@ -0,0 +1,90 @@
+import os
+from os import path as p
+import sys
+import shutil
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from jxa_builder.core.constants import NODE_DIR
+
+## Default macOS file systems are case-insensitive, names are compared
+## the way the file system would
+IS_CASE_INSENSITIVE = sys.platform == 'darwin'
+
+
+def _fold(name: str) -> str:
+  return name.casefold() if IS_CASE_INSENSITIVE else name
+
+
+class DirListings:
+  """
+  Entries of searched directories. Each directory is listed once with
+  os.scandir, instead of probing every candidate path with a stat.
+  Listings can be shared by threads (e.g. resolvers of a workspace).
+  """
+
+  def __init__(self):
+    ## directory -> names of its entries (empty if it can't be listed)
+    self._listings: Dict[str, Dict[str, str]] = {}
+    self._lock = threading.Lock()
+
+  def list_dir(self, dir_path: str) -> Dict[str, str]:
+    with self._lock:
+      listing = self._listings.get(dir_path)
+    if listing is None:
+      listing = {}
+      try:
+        with os.scandir(dir_path) as entries:
+          for entry in entries:
+            listing[_fold(entry.name)] = entry.name
+      except OSError:
+        pass
+      with self._lock:
+        listing = self._listings.setdefault(dir_path, listing)
+    return listing
+
+  def exists(self, dir_path: str, name: str) -> bool:
+    return _fold(name) in self.list_dir(dir_path)
+
+  def clear(self):
+    with self._lock:
+      self._listings = {}
+
+
+def get_ancestor_node_dirs(dir_path: str) -> List[str]:
+  """
+  Get node_modules directories searched from the directory the way Node does:
+  the one in the directory and in each of its ancestors (hoisted packages),
+  except in node_modules directories themselves.
+  """
+  node_dirs = []
+  while True:
+    if p.basename(dir_path) != NODE_DIR:
+      node_dirs.append(p.join(dir_path, NODE_DIR))
+    parent = p.dirname(dir_path)
+    if parent == dir_path:
+      return node_dirs
+    dir_path = parent
+
+
+@lru_cache(maxsize=None)
+def get_global_node_dirs() -> Tuple[str, ...]:
+  """
+  Get global node_modules directories: NODE_PATH, ~/.node_modules,
+  ~/.node_libraries and node_modules of the npm prefix (where `npm install -g`
+  puts packages, next to the bin directory of node unless configured).
+  """
+  node_dirs = [
+      d for d in os.environ.get('NODE_PATH', '').split(os.pathsep) if d
+  ]
+  home = p.expanduser('~')
+  node_dirs += [p.join(home, '.node_modules'), p.join(home, '.node_libraries')]
+  prefix: Optional[str] = os.environ.get('NPM_CONFIG_PREFIX') or \
+    os.environ.get('npm_config_prefix')
+  if not prefix:
+    node = shutil.which('node')
+    if node:
+      prefix = p.dirname(p.dirname(node))
+  if prefix:
+    node_dirs.append(p.join(prefix, 'lib', NODE_DIR))
+  return tuple(dict.fromkeys(p.abspath(d) for d in node_dirs))
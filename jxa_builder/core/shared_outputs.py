@@ -0,0 +1,55 @@
+import json
+import shutil
+import threading
+from os import path as p
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class SharedOutputs:
+  """
+  Compiled libraries shared by the projects built in one process (a workspace).
+
+  A library with the same source and unit fingerprint (so the same versioned
+  dependencies and config) is compiled by the first project that claims it,
+  the other projects wait for it and copy its output.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    ## key -> set when the output is known, and the output (None if the
+    ## project that claimed it didn't produce it)
+    self._entries: Dict[str, Tuple[threading.Event, List[Optional[str]]]] = {}
+
+  @staticmethod
+  def get_key(source: str, fingerprint: Dict[str, Any]) -> str:
+    return json.dumps([p.realpath(source), fingerprint], sort_keys=True)
+
+  def claim(self, key: str) -> bool:
+    """Whether the caller is the one to produce the output"""
+    with self._lock:
+      if key in self._entries:
+        return False
+      self._entries[key] = (threading.Event(), [None])
+      return True
+
+  def publish(self, key: str, output_path: Optional[str]):
+    """Tell the waiting projects where the claimed output is (once)"""
+    event, output = self._entries[key]
+    if not event.is_set():
+      output[0] = output_path
+      event.set()
+
+  def copy(self, key: str, dest: str) -> bool:
+    """
+    Wait for the output and copy it to dest.
+    Returns False when there is nothing to copy.
+    """
+    event, output = self._entries[key]
+    event.wait()
+    if output[0] is None:
+      return False
+    if p.isdir(output[0]):
+      shutil.copytree(output[0], dest, symlinks=True)
+    else:
+      shutil.copy2(output[0], dest)
+    return True
@@ -0,0 +1,111 @@
+import os
+from os import path as p
+import shutil
+from typing import Any, Callable, Dict, Tuple
+from jxa_builder.core.rewrite_libraries import rewrite_libraries
+from jxa_builder.core.tracing import span
+from jxa_builder.utils.logger import logger
+from jxa_builder.utils.printit import log_print_error, log_print_warning
+
+
+def _remove(path: str):
+  ## A linked mirror file shares its content with the source, it must never be
+  ## opened for writing, only replaced
+  if p.lexists(path):
+    os.remove(path)
+
+
+def sync_mirror(files: Dict[str, Tuple[str, Dict[str, str]]], mirror_dir: str,
+                state: Dict[str, Dict[str, Any]],
+                is_racy: Callable[[int], bool]) -> Dict[str, Dict[str, Any]]:
+  """
+  Update the mirror directory, so it contains exactly the given files.
+
+  Args:
+      files: Mirror file -> (source, library names to rewrite in it, see rewrite_libraries).
+      state: What the previous sync did (as returned by it).
+      is_racy: Whether a file with the given mtime may have changed since the previous sync without changing its stat.
+
+  Files whose source and library names didn't change are skipped. Files that
+  don't need rewriting are hard-linked to their sources (copied when linking
+  isn't possible), the rest is written. Files that are no longer mirrored
+  are removed.
+
+  Returns the new state.
+  """
+  new_state: Dict[str, Dict[str, Any]] = {}
+  counts = {'skipped': 0, 'linked': 0, 'copied': 0, 'written': 0}
+  for dest, (source, names) in files.items():
+    ## Names the rewrite would leave the same (libraries without a version)
+    names = {k: v for k, v in names.items() if k != v}
+    try:
+      st = os.stat(source)
+    except OSError as e:
+      log_print_error(f'Cannot read a source "{source}": {e}')
+      exit(1)
+    entry = {
+        'source': source,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'names': names,
+    }
+    old = state.get(dest)
+    if old and {k: v for k, v in old.items() if k != 'mode'} == entry:
+      if old['mode'] == 'linked':
+        try:
+          dest_st = os.stat(dest)
+          up_to_date = (dest_st.st_ino, dest_st.st_dev) == (st.st_ino,
+                                                            st.st_dev)
+        except OSError:
+          up_to_date = False
+      else:
+        up_to_date = p.exists(dest) and not is_racy(st.st_mtime_ns)
+      if up_to_date:
+        new_state[dest] = old
+        counts['skipped'] += 1
+        continue
+
+    try:
+      os.makedirs(p.dirname(dest), exist_ok=True)
+    except Exception as e:
+      log_print_error(f'Cannot create the temporary directory: {e}')
+      exit(1)
+    try:
+      _remove(dest)
+      if names:
+        with span('rewrite_libraries', source=source):
+          rewrite_libraries(source, dest, names)
+        mode = 'written'
+      else:
+        with span('mirror_copy', source=source):
+          try:
+            os.link(source, dest)
+            mode = 'linked'
+          except OSError:
+            ## e.g. the build directory is on another volume
+            shutil.copy2(source, dest)
+            mode = 'copied'
+    except Exception as e:
+      log_print_error(
+          f'Cannot copy a source "{source}" to the temporary directory: {e}')
+      exit(1)
+    new_state[dest] = {**entry, 'mode': mode}
+    counts[mode] += 1
+
+  removed = 0
+  if p.isdir(mirror_dir):
+    for root, dirs, dir_files in os.walk(mirror_dir, topdown=False):
+      for file in dir_files:
+        path = p.join(root, file)
+        if path not in new_state:
+          try:
+            os.remove(path)
+            removed += 1
+          except OSError as e:
+            log_print_warning(f'Cannot delete a stale temporary file: {e}')
+      if root != mirror_dir and not os.listdir(root):
+        os.rmdir(root)
+
+  logger.debug('Mirror: %s, %d removed',
+               ', '.join(f'{v} {k}' for k, v in counts.items()), removed)
+  return new_state
@@ -0,0 +1,153 @@
+import os
+from os import path as p
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+from jxa_builder.core.constants import IS_RICH
+from jxa_builder.utils.logger import logger
+
+## Spans are recorded only while tracing, otherwise span() returns this
+## shared no-op context manager
+_NO_SPAN = nullcontext()
+_tracer: Optional['Tracer'] = None
+
+
+class Tracer:
+  """Records spans as Chrome trace events"""
+
+  def __init__(self):
+    self.start_ns = time.perf_counter_ns()
+    self.pid = os.getpid()
+    self.main_tid = threading.get_native_id()
+    ## Appending to a list is atomic, spans are recorded from worker threads
+    self.events: List[Dict[str, Any]] = []
+
+  @contextmanager
+  def span(self, name: str, args: Dict[str, Any]):
+    start = time.perf_counter_ns()
+    try:
+      yield
+    finally:
+      end = time.perf_counter_ns()
+      self.events.append({
+          'name': name,
+          'ph': 'X',
+          'ts': (start - self.start_ns) / 1000,
+          'dur': (end - start) / 1000,
+          'pid': self.pid,
+          'tid': threading.get_native_id(),
+          'args': args,
+      })
+
+  def write_chrome_trace(self, trace_file: str):
+    """Write a trace that can be opened in https://ui.perfetto.dev or chrome://tracing"""
+    workers = [
+        tid for tid in dict.fromkeys(e['tid'] for e in self.events)
+        if tid != self.main_tid
+    ]
+    thread_names = [{
+        'name': 'thread_name',
+        'ph': 'M',
+        'pid': self.pid,
+        'tid': tid,
+        'args': {
+            'name': name
+        }
+    } for tid, name in [(self.main_tid, 'main')] +
+                    [(tid, f'worker {i + 1}')
+                     for i, tid in enumerate(workers)]]
+    with open(trace_file, 'w') as f:
+      json.dump(
+          {
+              'traceEvents': thread_names + self.events,
+              'displayTimeUnit': 'ms'
+          }, f)
+
+  def get_summary(self) -> List[Dict[str, Any]]:
+    """Count, total, mean and max duration (ms) of spans by name, slowest first"""
+    durations: Dict[str, List[float]] = {}
+    for event in self.events:
+      durations.setdefault(event['name'], []).append(event['dur'] / 1000)
+    return sorted(({
+        'name': name,
+        'count': len(ds),
+        'total_ms': sum(ds),
+        'mean_ms': sum(ds) / len(ds),
+        'max_ms': max(ds),
+    } for name, ds in durations.items()),
+                  key=lambda s: -s['total_ms'])
+
+
+def span(name: str, **args: Any):
+  """
+  Time the enclosed block as a span named `name`, args are shown with it.
+  Does nothing unless tracing.
+  """
+  if _tracer is None:
+    return _NO_SPAN
+  return _tracer.span(name, args)
+
+
+def print_summary(summary: List[Dict[str, Any]]):
+  columns = ['count', 'total_ms', 'mean_ms', 'max_ms']
+  if IS_RICH:
+    from rich.table import Table
+    from rich import print as rich_print
+    table = Table(title='Build profile')
+    table.add_column('span')
+    for column in columns:
+      table.add_column(column.replace('_', ' '), justify='right')
+    for s in summary:
+      table.add_row(s['name'], str(s['count']),
+                    *(f'{s[c]:.1f}' for c in columns[1:]))
+    rich_print(table)
+  else:
+    print(f'{"span":<24}' + ''.join(f'{c.replace("_", " "):>12}'
+                                    for c in columns))
+    for s in summary:
+      print(f'{s["name"]:<24}{s["count"]:>12}' + ''.join(f'{s[c]:>12.1f}'
+                                                         for c in columns[1:]))
+
+
+@contextmanager
+def tracing(profile_dir: str, enabled: bool = True, cprofile: bool = False):
+  """
+  Record spans of the enclosed block. Afterwards a Chrome trace is written
+  to the profile directory and a summary is printed. With cprofile the
+  calling thread is also profiled with cProfile (the stats are written
+  next to the trace).
+  """
+  global _tracer
+  if not enabled:
+    yield
+    return
+  profiler = None
+  if cprofile:
+    import cProfile
+    profiler = cProfile.Profile()
+  _tracer = tracer = Tracer()
+  if profiler:
+    profiler.enable()
+  try:
+    with span('total'):
+      yield
+  finally:
+    if profiler:
+      profiler.disable()
+    _tracer = None
+    try:
+      os.makedirs(profile_dir, exist_ok=True)
+      trace_file = p.join(profile_dir, 'trace.json')
+      tracer.write_chrome_trace(trace_file)
+      print_summary(tracer.get_summary())
+      print(f'Trace written to {trace_file}')
+      if profiler:
+        import pstats
+        stats_file = p.join(profile_dir, 'cprofile.prof')
+        profiler.dump_stats(stats_file)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+        print(f'cProfile stats written to {stats_file}')
+    except Exception as e:
+      logger.warning('Cannot write the profile: %s', e)
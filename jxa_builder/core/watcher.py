@@ -0,0 +1,163 @@
+import os
+from os import path as p
+import threading
+import time
+import importlib.util
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+IS_WATCHDOG = importlib.util.find_spec('watchdog') is not None
+
+## stat result parts compared to detect a change
+_Stat = Optional[Tuple[int, int]]
+
+
+def _stat(path: str) -> _Stat:
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  return st.st_size, st.st_mtime_ns
+
+
+class Watcher:
+  """
+  Waits for changes of watched files and directories.
+
+  A directory is watched for its entries being added, removed or renamed,
+  files are watched for their content. `wait` blocks until something changes
+  and no other change follows for `debounce` seconds (editors often write a
+  file in several steps), then returns the changed paths.
+  """
+
+  def __init__(self, debounce: float = 0.1):
+    self.debounce = debounce
+    self.files: Set[str] = set()
+    self.dirs: Set[str] = set()
+
+  def watch(self, files: Iterable[str], dirs: Iterable[str]):
+    """Replace the watched paths"""
+    self.files = set(files)
+    self.dirs = set(dirs)
+
+  def wait(self) -> Set[str]:
+    raise NotImplementedError
+
+  def poll(self) -> Set[str]:
+    """Get paths changed since the last call without waiting"""
+    raise NotImplementedError
+
+  def close(self):
+    pass
+
+
+class PollingWatcher(Watcher):
+  """Stats watched paths every `interval` seconds"""
+  name = 'polling'
+
+  def __init__(self, debounce: float = 0.1, interval: float = 0.5):
+    super().__init__(debounce)
+    self.interval = interval
+    self._stats: Dict[str, _Stat] = {}
+
+  def watch(self, files: Iterable[str], dirs: Iterable[str]):
+    super().watch(files, dirs)
+    ## Paths watched before keep their stats, so changes made during a build
+    ## are still picked up by the next wait
+    self._stats = {
+        path: self._stats[path] if path in self._stats else _stat(path)
+        for path in self.files | self.dirs
+    }
+
+  def poll(self) -> Set[str]:
+    changed = set()
+    for path, old in self._stats.items():
+      new = _stat(path)
+      if new != old:
+        self._stats[path] = new
+        changed.add(path)
+    return changed
+
+  def wait(self) -> Set[str]:
+    changed: Set[str] = set()
+    while not changed:
+      time.sleep(self.interval)
+      changed = self.poll()
+    while True:
+      time.sleep(self.debounce)
+      more = self.poll()
+      if not more:
+        return changed
+      changed |= more
+
+
+class EventWatcher(Watcher):
+  """
+  Gets change events from the system (FSEvents on macOS, inotify on Linux)
+  through watchdog.
+  """
+  name = 'events'
+
+  def __init__(self, debounce: float = 0.1):
+    super().__init__(debounce)
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    self._handler = FileSystemEventHandler()
+    self._handler.on_any_event = self._on_event
+    self._observer = Observer()
+    self._observer.start()
+    self._scheduled: Dict[str, object] = {}
+    self._changed: Set[str] = set()
+    self._condition = threading.Condition()
+
+  def _on_event(self, event):
+    if event.event_type in ('opened', 'closed_no_write'):
+      return
+    paths = [event.src_path, getattr(event, 'dest_path', '')]
+    with self._condition:
+      for path in filter(None, paths):
+        path = os.fsdecode(path)
+        if path in self.files or path in self.dirs:
+          self._changed.add(path)
+        if p.dirname(path) in self.dirs:
+          self._changed.add(p.dirname(path))
+      if self._changed:
+        self._condition.notify()
+
+  def watch(self, files: Iterable[str], dirs: Iterable[str]):
+    super().watch(files, dirs)
+    ## Files are watched through their directories
+    observed = self.dirs | {p.dirname(f) for f in self.files}
+    observed = {d for d in observed if p.isdir(d)}
+    for d in set(self._scheduled) - observed:
+      self._observer.unschedule(self._scheduled.pop(d))
+    for d in observed - set(self._scheduled):
+      self._scheduled[d] = self._observer.schedule(self._handler, d)
+
+  def wait(self) -> Set[str]:
+    with self._condition:
+      while not self._changed:
+        ## With a timeout, so the wait can be interrupted with ctrl+c
+        self._condition.wait(1)
+      while True:
+        count = len(self._changed)
+        self._condition.wait(self.debounce)
+        if len(self._changed) == count:
+          changed, self._changed = self._changed, set()
+          return changed
+
+  def poll(self) -> Set[str]:
+    with self._condition:
+      changed, self._changed = self._changed, set()
+      return changed
+
+  def close(self):
+    self._observer.stop()
+    self._observer.join()
+
+
+def get_watcher(debounce: float = 0.1,
+                poll_interval: Optional[float] = None) -> Watcher:
+  """Get an event based watcher if watchdog is installed, otherwise (or when a poll interval is given) a polling one"""
+  if IS_WATCHDOG and poll_interval is None:
+    return EventWatcher(debounce)
+  return PollingWatcher(debounce, poll_interval or 0.5)
@@ -0,0 +1,172 @@
+import os
+from os import path as p
+import io
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from jxa_builder.core.models import LoadedPropInfo
+from jxa_builder.core.build_project import BuildOptions, ProjectBuilder
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+from jxa_builder.core.get_project_config import get_json_obj
+from jxa_builder.core.shared_outputs import SharedOutputs
+from jxa_builder.core.tracing import span
+from jxa_builder.core.constants import IS_RICH, BUILD_DIR, DEPS_DIR, NODE_DIR, JXA_JSON_FILE, PACKAGE_JSON_FILE
+from jxa_builder.utils.printit import log_print_error
+from jxa_builder.utils.logger import logger
+
+## Directories that never contain projects of the workspace (packages in
+## them are dependencies)
+SKIPPED_DIRS = {BUILD_DIR, DEPS_DIR, NODE_DIR}
+
+
+@dataclass
+class ProjectResult:
+  project_dir: str
+  compiled: int
+  duration: float
+  ## None if the project was built
+  error: Optional[str] = None
+  ## What the build printed
+  output: str = ''
+
+
+class _ProjectOutputs(io.TextIOBase):
+  """
+  Stream keeping apart what the threads building projects print, so the
+  output of each project is shown in one piece once it's built. Other
+  threads write to the stream it replaces.
+  """
+
+  def __init__(self, stream: io.TextIOBase):
+    self.stream = stream
+    self._local = threading.local()
+
+  def capture(self) -> io.StringIO:
+    """Keep what the calling thread prints in the returned buffer"""
+    self._local.buffer = io.StringIO()
+    return self._local.buffer
+
+  def writable(self) -> bool:
+    return True
+
+  def isatty(self) -> bool:
+    ## Captured output is printed to the same stream, so it's formatted for it
+    return self.stream.isatty()
+
+  def write(self, text: str) -> int:
+    buffer = getattr(self._local, 'buffer', None)
+    return (buffer or self.stream).write(text)
+
+  def flush(self):
+    self.stream.flush()
+
+
+def is_project(dir_path: str) -> bool:
+  """Whether the directory has a jxa.json or a package.json with a jxa field"""
+  return p.isfile(p.join(dir_path, JXA_JSON_FILE)) or 'jxa' in get_json_obj(
+      p.join(dir_path, PACKAGE_JSON_FILE))
+
+
+def find_projects(root_dir: str) -> List[str]:
+  """Find projects in the root directory and all its subdirectories"""
+  projects = []
+  for dir_path, dirs, _ in os.walk(root_dir):
+    dirs[:] = sorted(d for d in dirs
+                     if d not in SKIPPED_DIRS and not d.startswith('.'))
+    if is_project(dir_path):
+      projects.append(dir_path)
+  return projects
+
+
+def print_report(results: List[ProjectResult], root_dir: str):
+  rows = [(p.relpath(r.project_dir,
+                     root_dir), str(r.compiled), f'{r.duration:.2f}s', r.error
+           or 'ok') for r in results]
+  if IS_RICH:
+    from rich.table import Table
+    from rich import print as rich_print
+    table = Table(title='Workspace build')
+    table.add_column('project')
+    table.add_column('compiled', justify='right')
+    table.add_column('time', justify='right')
+    table.add_column('status')
+    for row in rows:
+      table.add_row(*row)
+    rich_print(table)
+  else:
+    print(f'{"project":<32}{"compiled":>10}{"time":>10}  status')
+    for name, compiled, duration, status in rows:
+      print(f'{name:<32}{compiled:>10}{duration:>10}  {status}')
+
+
+def build_workspace(
+    root_dir: str,
+    overrides: Optional[Dict[str, LoadedPropInfo]] = None,
+    options: Optional[BuildOptions] = None) -> List[ProjectResult]:
+  """
+  Build all projects of the workspace concurrently, in one process.
+
+  The projects share the config cache, what their resolvers learned (scanned
+  sources, package infos, directory listings) and compiled libraries: a
+  library with the same source, version and dependencies is compiled once
+  and copied to the other projects. Config overrides apply to every project.
+  Compilations of all the projects share `options.jobs` slots (the CPU count
+  by default).
+
+  Projects report errors in their output, which the calling thread prints
+  once the project is built. Exits with an error if any project failed
+  (after all of them finished).
+  """
+  projects = find_projects(root_dir)
+  if not projects:
+    log_print_error(
+        f'No projects ({JXA_JSON_FILE} or {PACKAGE_JSON_FILE} with a "jxa" field) found in "{root_dir}"'
+    )
+    exit(1)
+  logger.info('Building %s project(s) of %s', len(projects), root_dir)
+  shared_resolver = DependencyResolver(root_dir)
+  shared_outputs = SharedOutputs()
+  compile_slots = threading.BoundedSemaphore(
+      max(1, (options.jobs if options else None) or os.cpu_count() or 1))
+  outputs = _ProjectOutputs(sys.stdout)
+
+  def build(project_dir: str) -> ProjectResult:
+    start = time.perf_counter()
+    output = outputs.capture()
+    error = None
+    compiled = []
+    try:
+      with span('build_project', project=project_dir):
+        compiled = ProjectBuilder(project_dir, overrides, options,
+                                  shared_resolver, shared_outputs,
+                                  compile_slots).build()
+    except SystemExit:
+      ## The error is in the output
+      error = 'failed'
+    except Exception as e:
+      error = f'failed: {e}'
+    return ProjectResult(project_dir, len(compiled),
+                         time.perf_counter() - start, error, output.getvalue())
+
+  results: Dict[str, ProjectResult] = {}
+  with redirect_stdout(outputs), ThreadPoolExecutor(
+      max_workers=min(len(projects),
+                      os.cpu_count() or 1)) as executor:
+    futures = [executor.submit(build, project) for project in projects]
+    for future in as_completed(futures):
+      result = future.result()
+      results[result.project_dir] = result
+      if result.output:
+        outputs.stream.write(
+            f'{p.relpath(result.project_dir, root_dir)}:\n{result.output}')
+        outputs.stream.flush()
+  ordered = [results[project] for project in projects]
+
+  print_report(ordered, root_dir)
+  if any(r.error for r in ordered):
+    exit(1)
+  return ordered
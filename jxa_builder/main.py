@@ -0,0 +1,15 @@
+import sys
+from jxa_builder.core.daemon_client import run_in_daemon
+
+
+def main():
+  """Entry point, sends the command to the build daemon when it's running"""
+  code = run_in_daemon(sys.argv[1:])
+  if code is not None:
+    sys.exit(code)
+  from jxa_builder.cli import cli
+  cli()
+
+
+if __name__ == "__main__":
+  main()
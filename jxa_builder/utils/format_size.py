@@ -0,0 +1,6 @@
+def format_size(size: float) -> str:
+  for unit in ('B', 'KB', 'MB'):
+    if size < 1024:
+      return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+    size /= 1024
+  return f'{size:.1f}GB'
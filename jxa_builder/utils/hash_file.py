@@ -0,0 +1,10 @@
+import hashlib
+
+
+def hash_file(file_path: str) -> str:
+  """Get sha256 hex digest of a file, read in chunks"""
+  h = hashlib.sha256()
+  with open(file_path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 16), b''):
+      h.update(chunk)
+  return h.hexdigest()
@@ -1,15 +1,38 @@
+import atexit
 import logging
-from jxa_builder.core.constants import LOG_FILE_ABS
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from os import environ
+from jxa_builder.core.constants import LOG_FILE_ABS, LOG_MAX_MB, LOG_BACKUP_COUNT
+
+
+def _get_env_number(name: str, default: float) -> float:
+  try:
+    return float(environ.get(name, default))
+  except ValueError:
+    return default
+
 
-# TODO: Make log file circular
 logger = logging.getLogger(__name__)
 
 shell_handler = logging.StreamHandler()
-file_handler = logging.FileHandler(LOG_FILE_ABS)
+## The file is opened by the first record, not when the module is imported.
+## It's rotated when it grows over the size cap, keeping a number of old logs
+## (jxa-builder.log.1, ...)
+file_handler = RotatingFileHandler(
+    LOG_FILE_ABS,
+    maxBytes=int(
+        _get_env_number('JXA_BUILDER_LOG_MAX_MB', LOG_MAX_MB) * 1024 * 1024),
+    backupCount=int(
+        _get_env_number('JXA_BUILDER_LOG_BACKUPS', LOG_BACKUP_COUNT)),
+    delay=True)
+
+## The file gets every record unless set otherwise (e.g. INFO)
+file_level = environ.get('JXA_BUILDER_LOG_LEVEL', 'DEBUG').upper()
 
-logger.setLevel(logging.DEBUG)
 shell_handler.setLevel(100)
-file_handler.setLevel(logging.DEBUG)
+file_handler.setLevel(file_level if isinstance(
+    logging.getLevelName(file_level), int) else logging.DEBUG)
 
 fmt_shell = '{levelname:<9} {filename}:{funcName}:{lineno} {message}'
 fmt_file = '[{asctime}] {levelname:<9} {filename}:{funcName}:{lineno} {message}'
@@ -21,5 +44,44 @@ file_formatter = logging.Formatter(fmt_file, date_fmt, style='{')
 shell_handler.setFormatter(shell_formatter)
 file_handler.setFormatter(file_formatter)
 
+
+class LazyQueueHandler(QueueHandler):
+  """
+  Puts records in a queue (with their message formatted) for a listener
+  that writes them in a background thread. The listener is started by the
+  first record, so commands that log nothing (e.g. --help) start no thread.
+  """
+
+  def __init__(self, handler: logging.Handler):
+    super().__init__(queue.SimpleQueue())
+    self.listener = QueueListener(self.queue, handler)
+    self._started = False
+
+  def emit(self, record: logging.LogRecord):
+    ## Records are emitted with the handler lock held
+    if not self._started:
+      self._started = True
+      self.listener.start()
+      ## Writes the records that are left
+      atexit.register(self.listener.stop)
+    super().emit(record)
+
+
+## The file is written by a background thread
+file_queue_handler = LazyQueueHandler(file_handler)
+file_queue_handler.setLevel(file_handler.level)
+
 logger.addHandler(shell_handler)
-logger.addHandler(file_handler)
+logger.addHandler(file_queue_handler)
+
+
+def update_level():
+  """
+  Set the logger level to the lowest level of its handlers (call it after
+  changing them), so records no handler wants are dropped before their
+  arguments are formatted
+  """
+  logger.setLevel(min(h.level for h in logger.handlers))
+
+
+update_level()
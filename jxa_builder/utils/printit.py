@@ -1,13 +1,14 @@
 from jxa_builder.core.constants import IS_RICH
 from jxa_builder.utils.logger import logger
-if IS_RICH:
-  from rich.panel import Panel
-  from rich.text import Text
-  from rich import print as rich_print
+
+## rich is imported on first use, most commands never print a panel
 
 
 def print_error(error_msg: str, title: str = 'Error'):
   if IS_RICH:
+    from rich.panel import Panel
+    from rich.text import Text
+    from rich import print as rich_print
     rich_print(
         Panel(Text.from_markup(error_msg),
               title=title,
@@ -19,6 +20,9 @@ def print_error(error_msg: str, title: str = 'Error'):
 
 def print_warning(warning_msg: str, title: str = 'Warning'):
   if IS_RICH:
+    from rich.panel import Panel
+    from rich.text import Text
+    from rich import print as rich_print
     rich_print(
         Panel(Text(warning_msg),
               title=title,
@@ -28,6 +32,16 @@ def print_warning(warning_msg: str, title: str = 'Warning'):
     print(warning_msg)
 
 
+def print_block(text: str, title: str):
+  if IS_RICH:
+    from rich.panel import Panel
+    from rich.text import Text
+    from rich import print as rich_print
+    rich_print(Panel(Text(text), title=title, title_align='left'))
+  else:
+    print(f'--- {title}\n{text}')
+
+
 def log_print_error(
     error_msg: str,
     title: str = 'Error',
@@ -35,6 +49,7 @@ def log_print_error(
 ):
   print_error(error_msg, title)
   if IS_RICH:
+    from rich.text import Text
     error_msg = Text.from_markup(error_msg).plain
   logger.fatal(error_msg, exc_info=incl_traceback, stacklevel=2)
 
@@ -42,5 +57,11 @@ def log_print_error(
 def log_print_warning(warning_msg: str, title: str = 'Warning'):
   print_warning(warning_msg, title)
   if IS_RICH:
+    from rich.text import Text
     warning_msg = Text(warning_msg).plain
   logger.warning(warning_msg, stacklevel=2)
+
+
+def log_print_block(text: str, title: str):
+  print_block(text, title)
+  logger.info('%s:\n%s', title, text, stacklevel=2)
@@ -1,6 +1,9 @@
+from functools import lru_cache
 from typing import Literal
 
 
+## Called for every key of every config, with few distinct keys
+@lru_cache(maxsize=1024)
 def recase(
     text: str, target_case: Literal['camel', 'constant', 'sentence', 'snake',
                                     'dot', 'kebab', 'path', 'pascal', 'header',
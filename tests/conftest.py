@@ -0,0 +1,20 @@
+import os
+from os import path as p
+from typing import Callable, Dict
+import pytest
+
+
+@pytest.fixture
+def make_files(tmp_path) -> Callable[[Dict[str, str]], str]:
+  """Write files (relative path -> content) to a temporary directory, returns the directory"""
+  root = str(tmp_path.resolve())
+
+  def make(files: Dict[str, str]) -> str:
+    for rel, content in files.items():
+      path = p.join(root, rel)
+      os.makedirs(p.dirname(path), exist_ok=True)
+      with open(path, 'w') as f:
+        f.write(content)
+    return root
+
+  return make
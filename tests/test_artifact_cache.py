@@ -0,0 +1,88 @@
+import os
+from os import path as p
+from jxa_builder.core.artifact_cache import ArtifactCache, CACHE_DIR_ENV
+from jxa_builder.core.build_project import BuildOptions, ProjectBuilder
+from jxa_builder.core.compiler_backends import FakeBackend
+from jxa_builder.core.models import CompilationUnit
+
+
+def make_unit(directory,
+              name: str,
+              content: str,
+              suffix: str = '.scpt') -> CompilationUnit:
+  source = directory / f'{name}.js'
+  source.write_text(content)
+  output = str(directory / f'{name}{suffix}')
+  return CompilationUnit(str(source), output, output)
+
+
+def read(path: str) -> str:
+  with open(path) as f:
+    return f.read()
+
+
+def test_artifacts_are_keyed_by_content(tmp_path):
+  cache = ArtifactCache(str(tmp_path / 'cache'), 1024)
+  (tmp_path / 'other').mkdir()
+  a = make_unit(tmp_path, 'a', 'x = 1;')
+  key = cache.get_key(a, 'osacompile 1')
+  ## Another checkout, or another file with the same content
+  assert cache.get_key(make_unit(tmp_path / 'other', 'b', 'x = 1;'),
+                       'osacompile 1') == key
+  assert cache.get_key(make_unit(tmp_path, 'c', 'x = 2;'),
+                       'osacompile 1') != key
+  assert cache.get_key(a, 'osacompile 2') != key
+  assert cache.get_key(make_unit(tmp_path, 'd', 'x = 1;', '.app'),
+                       'osacompile 1') is None
+
+
+def test_stored_artifacts_are_restored(tmp_path):
+  cache = ArtifactCache(str(tmp_path / 'cache'), 1024)
+  unit = make_unit(tmp_path, 'a', 'x = 1;')
+  key = cache.get_key(unit, 'fake')
+  dest = str(tmp_path / 'restored.scpt')
+  assert not cache.restore(key, dest)
+  with open(unit.output_path, 'w') as f:
+    f.write('compiled')
+  cache.store(key, unit.output_path)
+  assert cache.restore(key, dest)
+  assert read(dest) == 'compiled'
+
+
+def test_least_recently_used_artifacts_are_evicted(tmp_path):
+  cache = ArtifactCache(str(tmp_path / 'cache'), 20)
+  output = tmp_path / 'output.scpt'
+  output.write_text('0123456789')
+  for i, key in enumerate(['aa.scpt', 'bb.scpt', 'cc.scpt']):
+    cache.store(key, str(output))
+    os.utime(cache._get_path(key), (i, i))
+  ## Restoring marks it as used
+  assert cache.restore('aa.scpt', str(tmp_path / 'restored.scpt'))
+  assert cache.prune() == (1, 10)
+  assert not p.exists(cache._get_path('bb.scpt'))
+  assert cache.get_stats()['artifacts'] == 2
+  assert cache.prune(0) == (2, 20)
+
+
+def test_another_checkout_is_built_from_the_cache(make_files, tmp_path,
+                                                  monkeypatch):
+  monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / 'cache'))
+  files = {
+      'jxa.json':
+      '{"main": "src/index.js", "version": "1.0.0", "comp_mode": "script", "deps_install_mode": "user"}',
+      'src/index.js': 'a = Library("a");\n',
+      'src/a.js': 'x = 1;\n',
+  }
+  root = make_files({f'w1/{k}': v for k, v in files.items()})
+  make_files({f'w2/{k}': v for k, v in files.items()})
+  options = BuildOptions(compiler_backend='fake')
+  ProjectBuilder(p.join(root, 'w1'), options=options).build()
+
+  def compile(self, unit):
+    raise AssertionError(f'{unit.input_path} should be restored')
+
+  monkeypatch.setattr(FakeBackend, 'compile', compile)
+  compiled = ProjectBuilder(p.join(root, 'w2'), options=options).build()
+  assert len(compiled) == 2
+  for unit in compiled:
+    assert read(unit.output_path) == read(unit.input_path)
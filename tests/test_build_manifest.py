@@ -0,0 +1,103 @@
+import os
+import json
+import time
+from jxa_builder.core.build_manifest import BuildManifest, get_unit_fingerprint
+from jxa_builder.core.models import CompilationUnit
+
+PAST_NS = time.time_ns() - 3600 * 10**9
+
+
+def make_unit(tmp_path, content: str = 'a = 1;', mtime_ns: int = PAST_NS):
+  source = tmp_path / 'a.js'
+  source.write_text(content)
+  os.utime(source, ns=(mtime_ns, mtime_ns))
+  output = tmp_path / 'a.scpt'
+  output.write_text('compiled')
+  return str(source), str(output)
+
+
+def test_unit_is_up_to_date_after_save(tmp_path):
+  source, output = make_unit(tmp_path)
+  manifest_file = str(tmp_path / 'build' / 'manifest.json')
+  manifest = BuildManifest(manifest_file)
+  fingerprint = get_unit_fingerprint(source, source, 'stat', ['b1_0_0'])
+  manifest.update(output, fingerprint)
+  manifest.save()
+  loaded = BuildManifest.load(manifest_file)
+  assert loaded.is_up_to_date(
+      output, get_unit_fingerprint(source, source, 'stat', ['b1_0_0']))
+
+
+def test_changed_dependencies_or_config_invalidate(tmp_path):
+  source, output = make_unit(tmp_path)
+  manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+  manifest.update(output,
+                  get_unit_fingerprint(source, source, 'stat', ['b1_0_0']))
+  manifest.save()
+  assert not manifest.is_up_to_date(
+      output, get_unit_fingerprint(source, source, 'stat', ['b1_1_0']))
+  assert not manifest.is_up_to_date(
+      output,
+      get_unit_fingerprint(source, source, 'stat', ['b1_0_0'], minify=True))
+
+
+def test_changed_source_invalidates(tmp_path):
+  source, output = make_unit(tmp_path)
+  manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+  manifest.update(output, get_unit_fingerprint(source, source, 'stat', []))
+  manifest.save()
+  make_unit(tmp_path, 'a = 2;', PAST_NS + 10**9)
+  assert not manifest.is_up_to_date(
+      output, get_unit_fingerprint(source, source, 'stat', []))
+
+
+def test_content_fingerprint_ignores_touched_source(tmp_path):
+  source, output = make_unit(tmp_path)
+  manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+  manifest.update(output, get_unit_fingerprint(source, source, 'content', []))
+  manifest.save()
+  make_unit(tmp_path, mtime_ns=PAST_NS + 10**9)
+  assert manifest.is_up_to_date(
+      output, get_unit_fingerprint(source, source, 'content', []))
+
+
+def test_source_modified_around_the_save_is_not_trusted(tmp_path):
+  source, output = make_unit(tmp_path, mtime_ns=time.time_ns())
+  manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+  fingerprint = get_unit_fingerprint(source, source, 'stat', [])
+  manifest.update(output, fingerprint)
+  manifest.save()
+  assert not manifest.is_up_to_date(output, fingerprint)
+
+
+def test_missing_output_invalidates(tmp_path):
+  source, output = make_unit(tmp_path)
+  manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+  fingerprint = get_unit_fingerprint(source, source, 'stat', [])
+  manifest.update(output, fingerprint)
+  manifest.save()
+  os.remove(output)
+  assert not manifest.is_up_to_date(output, fingerprint)
+
+
+def test_other_version_is_discarded(tmp_path):
+  source, output = make_unit(tmp_path)
+  manifest_file = str(tmp_path / 'manifest.json')
+  manifest = BuildManifest(manifest_file)
+  manifest.update(output, get_unit_fingerprint(source, source, 'stat', []))
+  manifest.save()
+  with open(manifest_file) as f:
+    data = json.load(f)
+  data['version'] = -1
+  with open(manifest_file, 'w') as f:
+    json.dump(data, f)
+  assert BuildManifest.load(manifest_file).units == {}
+
+
+def test_costs_fall_back_to_input_sizes(tmp_path):
+  source, output = make_unit(tmp_path, 'a = 12345;')
+  unit = CompilationUnit(source, output, output)
+  manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+  assert manifest.get_costs([unit]) == {output: len('a = 12345;')}
+  manifest.durations[output] = 0.5
+  assert manifest.get_costs([unit]) == {output: 0.5}
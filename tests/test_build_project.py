@@ -0,0 +1,44 @@
+from os import path as p
+import pytest
+from jxa_builder.core.build_project import BuildOptions, ProjectBuilder
+
+OPTIONS = BuildOptions(compiler_backend='fake', artifact_cache=False)
+
+
+def test_relative_project_dir(make_files, monkeypatch):
+  root = make_files({
+      'w/jxa.json':
+      '{"main": "src/index.js", "version": "1.0.0", "comp_mode": "script", "deps_install_mode": "user"}',
+      'w/src/index.js': 'a = Library("a");\n',
+      'w/src/a.js': 'x = 1;\n',
+  })
+  monkeypatch.chdir(root)
+  compiled = ProjectBuilder('./w', options=OPTIONS).build()
+  assert sorted(p.basename(u.input_path)
+                for u in compiled) == ['a.js', 'index.js']
+  ## Sources of the project are mirrored next to each other
+  for unit in compiled:
+    assert unit.input_path.startswith(
+        p.join(root, 'w', 'build', 'preprocessed', 'src') + p.sep)
+    assert p.isfile(unit.output_path)
+
+
+def test_package_installed_to_an_ancestor_is_found_by_a_reused_builder(
+    make_files):
+  root = make_files({
+      'w/jxa.json':
+      '{"main": "src/index.js", "version": "1.0.0", "comp_mode": "script", "deps_install_mode": "user"}',
+      'w/src/index.js': 'a = Library("hoisted");\n',
+  })
+  builder = ProjectBuilder(p.join(root, 'w'), options=OPTIONS)
+  with pytest.raises(SystemExit):
+    builder.build()
+  ## e.g. hoisted by a package manager to the root of a monorepo
+  make_files({
+      'node_modules/hoisted/package.json':
+      '{"name": "hoisted", "version": "1.0.0", "main": "index.js"}',
+      'node_modules/hoisted/index.js': 'x = 1;\n',
+  })
+  assert len(builder.build()) == 2
+  _, dirs = builder.get_watched_paths()
+  assert p.join(root, 'node_modules') in dirs
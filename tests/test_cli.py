@@ -0,0 +1,37 @@
+import sys
+from os import path as p
+import subprocess
+from typing import List
+import pytest
+from jxa_builder.commands._shared_options import build_options
+from jxa_builder.core.compiler_backends import COMPILER_BACKENDS
+from jxa_builder.utils.click_importer import click
+
+ROOT_DIR = p.dirname(p.dirname(p.abspath(__file__)))
+
+
+def get_loaded_modules(module: str) -> List[str]:
+  """Modules loaded by importing the module in a new interpreter"""
+  return subprocess.run(
+      [sys.executable, '-c', f'import sys, {module}; print(*sys.modules)'],
+      cwd=ROOT_DIR,
+      capture_output=True,
+      text=True,
+      check=True).stdout.split()
+
+
+@pytest.mark.parametrize('command', ['install', 'uninstall', 'graph'])
+def test_commands_do_not_load_compiler_backends(command):
+  assert 'jxa_builder.core.compiler_backends' not in get_loaded_modules(
+      f'jxa_builder.commands.{command}')
+
+
+def test_compiler_backend_choices():
+
+  @click.command()
+  @build_options
+  def command(**_):
+    pass
+
+  option = next(o for o in command.params if o.name == 'compiler_backend')
+  assert list(option.type.choices) == list(COMPILER_BACKENDS)
@@ -0,0 +1,102 @@
+import threading
+from os import path as p
+from typing import List, Set, Tuple
+from jxa_builder.core.compile_units import compile_units
+from jxa_builder.core.compiler_backends import FakeBackend
+from jxa_builder.core.models import CompilationUnit
+
+
+class ScriptedBackend(FakeBackend):
+  """
+  Fake backend that fails units with the given names, and keeps units named
+  "slow" compiling until the compilation is cancelled
+  """
+
+  def __init__(self, failing: Set[str] = frozenset()):
+    self.failing = failing
+    self.started: List[str] = []
+    self.running = 0
+    self.max_running = 0
+    self.cancelled = threading.Event()
+    self._lock = threading.Lock()
+
+  def compile(self, unit: CompilationUnit) -> Tuple[int, str]:
+    name = p.splitext(p.basename(unit.output_path))[0]
+    with self._lock:
+      self.started.append(name)
+      self.running += 1
+      self.max_running = max(self.max_running, self.running)
+    try:
+      if name == 'slow':
+        self.cancelled.wait(10)
+        return -1, 'terminated'
+      if name in self.failing:
+        return 1, f'{name} failed'
+      return super().compile(unit)
+    finally:
+      with self._lock:
+        self.running -= 1
+
+  def cancel(self):
+    self.cancelled.set()
+
+
+def make_units(tmp_path, names: List[str]) -> List[CompilationUnit]:
+  units = []
+  for name in names:
+    source = tmp_path / f'{name}.js'
+    source.write_text(f'{name} = 1;')
+    output = str(tmp_path / f'{name}.scpt')
+    units.append(CompilationUnit(str(source), output, output))
+  return units
+
+
+def test_results_keep_the_order_of_the_units(tmp_path):
+  units = make_units(tmp_path, ['a', 'b', 'c', 'd'])
+  results = compile_units(units, ScriptedBackend(), jobs=3)
+  assert [r.unit for r in results] == units
+  assert all(r.ok and not r.cancelled for r in results)
+  assert all(p.isfile(u.output_path) for u in units)
+
+
+def test_most_expensive_units_start_first(tmp_path):
+  units = make_units(tmp_path, ['a', 'b', 'c'])
+  backend = ScriptedBackend()
+  costs = {units[0].output_path: 1, units[2].output_path: 3}
+  compile_units(units, backend, jobs=1, costs=costs)
+  assert backend.started == ['c', 'a', 'b']
+
+
+def test_no_units_start_after_a_failure(tmp_path):
+  units = make_units(tmp_path, ['a', 'b', 'c'])
+  backend = ScriptedBackend(failing={'b'})
+  results = compile_units(units, backend, jobs=1)
+  assert backend.started == ['a', 'b']
+  assert backend.cancelled.is_set()
+  a, b, c = results
+  assert a.ok
+  assert (b.returncode, b.output, b.cancelled) == (1, 'b failed', False)
+  assert (c.returncode, c.cancelled) == (None, True)
+
+
+def test_running_units_are_cancelled_after_a_failure(tmp_path):
+  units = make_units(tmp_path, ['slow', 'bad'])
+  costs = {units[0].output_path: 2, units[1].output_path: 1}
+  results = compile_units(units,
+                          ScriptedBackend(failing={'bad'}),
+                          jobs=2,
+                          costs=costs)
+  slow, bad = results
+  assert not bad.ok and not bad.cancelled
+  assert slow.returncode == -1 and slow.cancelled
+
+
+def test_shared_slots_bound_the_compilations(tmp_path):
+  units = make_units(tmp_path, ['a', 'b', 'c', 'd'])
+  backend = ScriptedBackend()
+  results = compile_units(units,
+                          backend,
+                          jobs=4,
+                          slots=threading.BoundedSemaphore(1))
+  assert all(r.ok for r in results)
+  assert backend.max_running == 1
@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+from os import path as p
+import pytest
+from jxa_builder.core.compiler_backends import CompileServerBackend, FakeBackend
+from jxa_builder.core.models import CompilationUnit
+
+## Stands in for osascript running the compile server: copies the input,
+## after writing more to stderr than a pipe holds
+NOISY_HOST = f'''#!{sys.executable}
+import sys, json, shutil
+for line in sys.stdin:
+  request = json.loads(line)
+  sys.stderr.write('warning: noise\\n' * 20000)
+  sys.stderr.flush()
+  if request['input'].endswith('fail.js'):
+    sys.exit(1)
+  shutil.copy(request['input'], request['output'])
+  print(json.dumps({{'ok': True, 'error': ''}}), flush=True)
+'''
+
+
+def test_fake_backend_copies_scripts(tmp_path):
+  source = tmp_path / 'a.js'
+  source.write_text('a = 1;')
+  output = str(tmp_path / 'a.scpt')
+  assert FakeBackend().compile(CompilationUnit(str(source), output,
+                                               output)) == (0, '')
+  with open(output) as f:
+    assert f.read() == 'a = 1;'
+
+
+def test_fake_backend_creates_applet_layout(tmp_path):
+  source = tmp_path / 'main.js'
+  source.write_text('run = () => 1;')
+  output = str(tmp_path / 'app.app')
+  assert FakeBackend().compile(CompilationUnit(str(source), output,
+                                               output))[0] == 0
+  for rel in ('Contents/Info.plist', 'Contents/MacOS/applet',
+              'Contents/Resources/Scripts/main.scpt'):
+    assert p.isfile(p.join(output, rel))
+
+
+@pytest.fixture
+def noisy_host(tmp_path, monkeypatch):
+  bin_dir = tmp_path / 'bin'
+  bin_dir.mkdir()
+  host = bin_dir / 'osascript'
+  host.write_text(NOISY_HOST)
+  host.chmod(0o755)
+  monkeypatch.setenv('PATH', f'{bin_dir}{os.pathsep}{os.environ["PATH"]}')
+
+
+def run_with_timeout(backend: CompileServerBackend,
+                     units,
+                     timeout: float = 30):
+  """Compile units in a thread, a host blocked on a full stderr pipe would
+  never answer"""
+  results = []
+
+  def compile_units():
+    for unit in units:
+      results.append(backend.compile(unit))
+
+  thread = threading.Thread(target=compile_units, daemon=True)
+  thread.start()
+  thread.join(timeout=timeout)
+  try:
+    assert not thread.is_alive()
+  finally:
+    backend.cancel()
+    backend.close()
+  return results
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs a shebang script')
+def test_compile_server_drains_stderr(tmp_path, noisy_host):
+  source = tmp_path / 'a.js'
+  source.write_text('a = 1;')
+  units = [
+      CompilationUnit(str(source), str(tmp_path / f'a{i}.scpt'),
+                      str(tmp_path / f'a{i}.scpt')) for i in range(3)
+  ]
+  assert run_with_timeout(CompileServerBackend(), units) == [(0, '')] * 3
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs a shebang script')
+def test_compile_server_reports_stderr_of_a_dead_host(tmp_path, noisy_host):
+  source = tmp_path / 'fail.js'
+  source.write_text('')
+  output = str(tmp_path / 'fail.scpt')
+  [(returncode, error)
+   ] = run_with_timeout(CompileServerBackend(),
+                        [CompilationUnit(str(source), output, output)])
+  assert returncode == -1
+  assert error.startswith('warning: noise')
@@ -0,0 +1,97 @@
+import os
+import json
+import socket
+import threading
+from typing import Any, Dict, List
+import pytest
+from jxa_builder.core import daemon as daemon_module
+from jxa_builder.core.daemon import Daemon
+from jxa_builder.core.daemon_client import DISPLAY_MODE, connect, iter_responses, send_request
+
+
+@pytest.fixture
+def daemon():
+  """A daemon serving on a temporary socket, stopped after the test"""
+  ## Unix socket paths are short, pytest temporary directories may be too long
+  socket_file = f'/tmp/jxa-builder-test-{os.getpid()}.sock'
+  server = Daemon(socket_file, idle_timeout=30)
+  thread = threading.Thread(target=server.serve, daemon=True)
+  thread.start()
+  for _ in range(500):
+    if os.path.exists(socket_file):
+      break
+    thread.join(0.01)
+  yield server
+  request(server, {'command': 'stop'})
+  thread.join(timeout=10)
+  assert not thread.is_alive()
+
+
+def request(server: Daemon, req: Dict[str, Any]) -> List[Dict[str, Any]]:
+  """
+  Send a request, returns the responses. The client functions would write
+  to stdout, which the daemon redirects while it runs a command.
+  """
+  sock = connect(server.socket_file)
+  assert sock
+  with sock:
+    send_request(sock, req)
+    return list(iter_responses(sock))
+
+
+def run(server: Daemon, argv: List[str]):
+  """Returns the exit code and what the command printed"""
+  responses = request(
+      server, {
+          'command': 'run',
+          'argv': argv,
+          'cwd': os.getcwd(),
+          'display_mode': DISPLAY_MODE,
+          'env': {},
+      })
+  output = ''.join(
+      r.get('stdout', '') + r.get('stderr', '') for r in responses)
+  return responses[-1]['exit'], output
+
+
+def test_help(daemon):
+  code, output = run(daemon, ['build', '--help'])
+  assert code == 0
+  assert 'Usage:' in output
+
+
+def test_usage_errors(daemon):
+  code, output = run(daemon, ['build', '--nope'])
+  assert code == 2
+  assert 'Traceback' not in output and '--nope' in output
+  code, output = run(daemon, ['build', '--comp-mode', 'bogus'])
+  assert code == 2
+  assert 'Traceback' not in output
+  assert request(daemon, {'command': 'status'})[0]['requests'] == 3
+
+
+def test_failed_request_does_not_stop_the_daemon(daemon, monkeypatch):
+
+  def fail(conn, request):
+    raise TypeError('not serializable')
+
+  monkeypatch.setattr(daemon, '_run', fail)
+  assert run(daemon, ['build'])[0] == 1
+  monkeypatch.undo()
+  assert run(daemon, ['build', '--help'])[0] == 0
+
+
+def test_response_writer_accepts_bytes():
+  client, server = socket.socketpair()
+  with client, server:
+    writer = daemon_module._ResponseWriter(server, 'stdout')
+    ## Click checks whether a stream takes bytes with an empty write
+    assert writer.write(b'') == 0
+    text = 'Usage: …\n'.encode()
+    writer.write(text[:-2])
+    writer.write(text[-2:])
+    writer.write('done\n')
+    server.shutdown(socket.SHUT_WR)
+    with client.makefile('r', encoding='utf-8') as f:
+      chunks = [json.loads(line)['stdout'] for line in f]
+  assert ''.join(chunks) == 'Usage: …\ndone\n'
@@ -0,0 +1,82 @@
+from os import path as p
+import pytest
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+
+JXA_JSON = '{"main": "src/index.js", "version": "1.0.0"}'
+
+
+def resolve(project_dir: str):
+  return DependencyResolver(project_dir).resolve(
+      p.join(project_dir, 'src', 'index.js'))
+
+
+def test_diamond_is_deduplicated(make_files):
+  project_dir = make_files({
+      'jxa.json': JXA_JSON,
+      'src/index.js': 'a = Library("a");\nb = Library("b");\n',
+      'src/a.js': 'c = Library("c");\n',
+      'src/b.js': 'c = Library("c");\n',
+      'src/c.js': '',
+  })
+  modules = resolve(project_dir)
+  assert sorted(m.name for m in modules) == ['a', 'b', 'c']
+  c = next(m for m in modules if m.name == 'c')
+  assert sorted(p.basename(s) for s in c.dependant_sources) == ['a.js', 'b.js']
+
+
+def test_modules_are_topologically_ordered(make_files):
+  project_dir = make_files({
+      'jxa.json': JXA_JSON,
+      'src/index.js': 'a = Library("a");\nd = Library("d");\n',
+      'src/a.js': 'b = Library("b");\n',
+      'src/b.js': 'c = Library("c");\nd = Library("d");\n',
+      'src/c.js': '',
+      'src/d.js': 'c = Library("c");\n',
+  })
+  modules = resolve(project_dir)
+  position = {m.source: i for i, m in enumerate(modules)}
+  for module in modules:
+    for dep in module.dependency_sources:
+      assert position[dep] < position[module.source]
+
+
+def test_same_library_through_different_paths_is_one_module(make_files):
+  project_dir = make_files({
+      'jxa.json': JXA_JSON,
+      'src/index.js': 'c = Library("lib/c");\na = Library("lib/a");\n',
+      'src/lib/a.js': 'c = Library("c");\n',
+      'src/lib/c.js': '',
+  })
+  modules = resolve(project_dir)
+  assert [m.name for m in modules].count('c') == 1
+
+
+def test_cycle_exits(make_files, capsys):
+  project_dir = make_files({
+      'jxa.json': JXA_JSON,
+      'src/index.js': 'a = Library("a");\n',
+      'src/a.js': 'b = Library("b");\n',
+      'src/b.js': 'a = Library("a");\n',
+  })
+  with pytest.raises(SystemExit):
+    resolve(project_dir)
+  assert 'Circular dependency' in capsys.readouterr().out
+
+
+def test_self_dependency_exits(make_files):
+  project_dir = make_files({
+      'jxa.json': JXA_JSON,
+      'src/index.js': 'a = Library("a");\n',
+      'src/a.js': 'a = Library("a");\n',
+  })
+  with pytest.raises(SystemExit):
+    resolve(project_dir)
+
+
+def test_missing_library_exits(make_files):
+  project_dir = make_files({
+      'jxa.json': JXA_JSON,
+      'src/index.js': 'a = Library("missing");\n',
+  })
+  with pytest.raises(SystemExit):
+    resolve(project_dir)
@@ -0,0 +1,58 @@
+import os
+from os import path as p
+from jxa_builder.core.freeze_deps import freeze_dependencies
+from jxa_builder.core.get_dependency_modules import DependencyResolver
+
+
+def freeze(project_dir: str):
+  resolver = DependencyResolver(project_dir)
+  modules = resolver.resolve(p.join(project_dir, 'src', 'index.js'))
+  freeze_dependencies(project_dir, modules, resolver.package_paths,
+                      p.join(project_dir, 'build', 'frozen.json'))
+
+
+def package(name: str, main: str):
+  return {
+      f'node_modules/{name}/package.json':
+      f'{{"name": "{name}", "version": "1.0.0", "main": "index.js"}}',
+      f'node_modules/{name}/index.js': main,
+      f'node_modules/{name}/README.md': name,
+  }
+
+
+def test_dependencies_are_synced_incrementally(make_files):
+  root = make_files({
+      'jxa.json': '{"main": "src/index.js", "version": "1.0.0"}',
+      'src/index.js': 'a = Library("a");\n',
+      **package('a', 'b = Library("b");\n'),
+      **package('b', 'x = 1;\n'),
+  })
+  freeze(root)
+  deps_dir = p.join(root, 'dependencies')
+  assert sorted(os.listdir(deps_dir)) == ['a', 'b']
+  readme = p.join(deps_dir, 'a', 'README.md')
+  inode = os.stat(readme).st_ino
+
+  ## Frozen copies are resolved first, they're synced from node_modules
+  make_files({'node_modules/a/index.js': 'b = Library("b");\ny = 2;\n'})
+  freeze(root)
+  with open(p.join(deps_dir, 'a', 'index.js')) as f:
+    assert f.read() == 'b = Library("b");\ny = 2;\n'
+  ## Unchanged files are not copied again
+  assert os.stat(readme).st_ino == inode
+
+
+def test_unused_dependencies_are_pruned(make_files):
+  root = make_files({
+      'jxa.json': '{"main": "src/index.js", "version": "1.0.0"}',
+      'src/index.js': 'a = Library("a");\nb = Library("b");\n',
+      'dependencies/vendored.js': '',
+      **package('a', ''),
+      **package('b', ''),
+  })
+  freeze(root)
+  make_files({'src/index.js': 'a = Library("a");\n'})
+  freeze(root)
+  ## Only what was frozen is removed
+  assert sorted(os.listdir(p.join(root,
+                                  'dependencies'))) == ['a', 'vendored.js']
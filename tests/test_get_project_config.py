@@ -0,0 +1,77 @@
+import os
+from os import path as p
+import pytest
+from jxa_builder.core.get_project_config import clear_caches, get_json_obj, get_package_info, get_project_config
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+  clear_caches()
+  yield
+  clear_caches()
+
+
+def write(path: str, content: str):
+  """Write the file with a new mtime, even within the file system's granularity"""
+  mtime_ns = os.stat(path).st_mtime_ns + 10**9 if p.exists(path) else None
+  with open(path, 'w') as f:
+    f.write(content)
+  if mtime_ns:
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_json_is_parsed_once(make_files):
+  root = make_files({'a.json': '{"a": 1}'})
+  path = p.join(root, 'a.json')
+  assert get_json_obj(path) is get_json_obj(path)
+  write(path, '{"a": 2}')
+  assert get_json_obj(path) == {'a': 2}
+
+
+def test_config_is_reloaded_when_jxa_json_changes(make_files):
+  root = make_files({
+      'jxa.json': '{"main": "src/index.js", "version": "1.0.0"}',
+      'src/index.js': '',
+  })
+  config = get_project_config(root)
+  assert get_project_config(root) is config
+  write(p.join(root, 'jxa.json'),
+        '{"main": "src/index.js", "version": "1.1.0"}')
+  assert get_project_config(root).version == '1.1.0'
+
+
+def test_config_is_reloaded_when_package_json_changes(make_files):
+  root = make_files({
+      'package.json':
+      '{"name": "a", "version": "1.0.0", "jxa": {"main": "src/index.js"}}',
+      'src/index.js': '',
+  })
+  assert get_project_config(root).version == '1.0.0'
+  write(p.join(root, 'package.json'),
+        '{"name": "a", "version": "2.0.0", "jxa": {"main": "src/index.js"}}')
+  assert get_project_config(root).version == '2.0.0'
+
+
+def test_package_info_is_reloaded_when_package_json_changes(make_files):
+  root = make_files({
+      'package.json': '{"version": "1.0.0", "main": "index.js"}',
+      'index.js': '',
+      'lib.js': '',
+  })
+  info = get_package_info(root)
+  assert (info.main, info.version) == (p.join(root, 'index.js'), '1.0.0')
+  assert get_package_info(root) is info
+  write(p.join(root, 'package.json'), '{"version": "1.0.1", "main": "lib.js"}')
+  info = get_package_info(root)
+  assert (info.main, info.version) == (p.join(root, 'lib.js'), '1.0.1')
+
+
+def test_package_info_is_reloaded_when_its_main_is_removed(make_files):
+  root = make_files({
+      'jxa.json': '{"version": "1.0.0", "main": "index.js"}',
+      'index.js': '',
+  })
+  get_package_info(root)
+  os.remove(p.join(root, 'index.js'))
+  with pytest.raises(SystemExit):
+    get_package_info(root)
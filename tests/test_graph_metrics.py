@@ -0,0 +1,95 @@
+from os import path as p
+import json
+from jxa_builder.core.graph_metrics import get_graph, to_dot, to_json
+from jxa_builder.core.models import CompilationUnit, Module
+
+
+def make_graph(make_files, durations=None):
+  """
+  main -> a -> c, main -> b -> c (another copy of c in vendor/),
+  a is compiled to a smaller file than its source
+  """
+  root = make_files({
+      'src/index.js': 'm' * 10,
+      'src/a.js': 'a' * 100,
+      'src/b.js': 'b' * 10,
+      'src/c.js': 'c' * 50,
+      'src/vendor/c.js': 'c' * 5,
+      'build/index.js': 'm' * 10,
+      'build/main.scpt': 'm' * 8,
+      'build/a.js': 'a' * 100,
+      'build/a.scpt': 'a' * 2,
+  })
+  src = p.join(root, 'src')
+  index, a, b, c, c2 = (p.join(src, f) for f in ('index.js', 'a.js', 'b.js',
+                                                 'c.js', 'vendor/c.js'))
+  main_module = Module('index', index, '')
+  modules = [
+      Module('c', c, '', [a]),
+      Module('c', c2, '', [b]),
+      Module('a', a, '', [index], [c]),
+      Module('b', b, '', [index], [c2]),
+  ]
+  build = p.join(root, 'build')
+  units = [
+      CompilationUnit(p.join(build, 'index.js'), p.join(build, 'main.scpt'),
+                      ''),
+      CompilationUnit(p.join(build, 'a.js'), p.join(build, 'a.scpt'), ''),
+  ]
+  graph = get_graph(root, main_module, modules, units, durations or {})
+  return graph, (index, a, b, c, c2)
+
+
+def test_nodes_and_sizes(make_files):
+  graph, (index, a, b, c, c2) = make_graph(make_files)
+  assert list(graph.nodes) == [index, c, c2, a, b]
+  assert graph.nodes[index].dependencies == [a, b]
+  assert graph.nodes[a].source_size == 100
+  assert graph.nodes[a].preprocessed_size == 100
+  assert graph.nodes[a].compiled_size == 2
+  assert graph.nodes[b].compiled_size is None
+
+
+def test_closures_use_compiled_sizes_when_known(make_files):
+  graph, (index, a, b, c, c2) = make_graph(make_files)
+  nodes = graph.nodes
+  assert (nodes[a].closure_modules, nodes[a].closure_size) == (2, 52)
+  assert (nodes[b].closure_modules, nodes[b].closure_size) == (2, 15)
+  assert nodes[index].closure_modules == 5
+  assert nodes[index].closure_size == 8 + 52 + 15
+
+
+def test_duplicates_and_heaviest(make_files):
+  graph, (index, a, b, c, c2) = make_graph(make_files)
+  assert graph.duplicates == {'c': [c, c2]}
+  assert graph.nodes[c].duplicated and not graph.nodes[a].duplicated
+  assert graph.heaviest == [a, c, b, c2]
+
+
+def test_load_chain_follows_the_heaviest_dependency(make_files):
+  graph, (index, a, b, c, c2) = make_graph(make_files)
+  assert graph.load_chain == [index, a, c]
+
+
+def test_compile_critical_path(make_files):
+  graph, _ = make_graph(make_files)
+  assert graph.compile_critical_path is None
+  build = p.join(graph.project_dir, 'build')
+  graph, (index, a, b, c, c2) = make_graph(make_files, {
+      p.join(build, 'main.scpt'): 0.25,
+      p.join(build, 'a.scpt'): 0.5,
+  })
+  assert graph.compile_critical_path == {
+      'source': a,
+      'compile_time': 0.5,
+      'total_compile_time': 0.75,
+  }
+
+
+def test_outputs(make_files):
+  graph, _ = make_graph(make_files)
+  assert set(json.loads(to_json(graph))['nodes']) == set(graph.nodes)
+  dot = to_dot(graph)
+  assert dot.startswith('digraph dependencies {')
+  assert dot.count('color=red') == 2
+  assert 'n0 -> n3 [style=bold];' in dot
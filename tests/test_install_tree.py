@@ -0,0 +1,119 @@
+import os
+from os import path as p
+import time
+from jxa_builder.core.install_tree import get_records, install_tree, remove_tree
+
+PAST_NS = time.time_ns() - 3600 * 10**9
+
+
+def make_target(tmp_path):
+  target = tmp_path / 'build' / 'app.app'
+  (target / 'Contents' / 'Resources').mkdir(parents=True)
+  (target / 'Contents' / 'Info.plist').write_text('plist')
+  (target / 'Contents' / 'Resources' / 'main.scpt').write_text('main')
+  (target / 'Contents' / 'Resources' / 'lib.scpt').write_text('lib')
+  return str(target)
+
+
+def read(path: str) -> str:
+  with open(path) as f:
+    return f.read()
+
+
+def test_first_install_copies_everything(tmp_path):
+  target = make_target(tmp_path)
+  dest = str(tmp_path / 'Applications' / 'app.app')
+  _, copied = install_tree(target, dest, {}, time.time_ns())
+  assert copied == 3
+  assert read(p.join(dest, 'Contents', 'Resources', 'main.scpt')) == 'main'
+  assert [name for name in os.listdir(p.dirname(dest))
+          if name != 'app.app'] == []
+
+
+def test_unchanged_target_is_up_to_date(tmp_path):
+  target = make_target(tmp_path)
+  dest = str(tmp_path / 'Applications' / 'app.app')
+  state, _ = install_tree(target, dest, {}, time.time_ns())
+  assert install_tree(target, dest, state, time.time_ns())[1] == -1
+
+
+def test_only_changed_files_are_copied(tmp_path):
+  target = make_target(tmp_path)
+  dest = str(tmp_path / 'Applications' / 'app.app')
+  state, _ = install_tree(target, dest, {}, time.time_ns())
+  lib = p.join(dest, 'Contents', 'Resources', 'lib.scpt')
+  inode = os.stat(lib).st_ino
+  with open(p.join(target, 'Contents', 'Resources', 'main.scpt'), 'w') as f:
+    f.write('main 2')
+  state, copied = install_tree(target, dest, state, time.time_ns())
+  assert copied == 1
+  assert read(p.join(dest, 'Contents', 'Resources', 'main.scpt')) == 'main 2'
+  ## The unchanged file is shared with the previous installation
+  assert os.stat(lib).st_ino == inode
+  assert install_tree(target, dest, state, time.time_ns())[1] == -1
+
+
+def test_rebuilt_target_with_same_content_is_up_to_date(tmp_path):
+  target = make_target(tmp_path)
+  dest = str(tmp_path / 'Applications' / 'app.app')
+  state, _ = install_tree(target, dest, {}, time.time_ns())
+  main = p.join(target, 'Contents', 'Resources', 'main.scpt')
+  with open(main, 'w') as f:
+    f.write('main')
+  os.utime(main, ns=(PAST_NS, PAST_NS))
+  assert install_tree(target, dest, state, time.time_ns())[1] == -1
+
+
+def test_modified_installation_is_repaired(tmp_path):
+  target = make_target(tmp_path)
+  dest = str(tmp_path / 'Applications' / 'app.app')
+  state, _ = install_tree(target, dest, {}, time.time_ns())
+  with open(p.join(dest, 'Contents', 'Info.plist'), 'w') as f:
+    f.write('tampered')
+  (tmp_path / 'Applications' / 'app.app' / 'extra').write_text('')
+  state, copied = install_tree(target, dest, state, time.time_ns())
+  assert copied == 1
+  assert read(p.join(dest, 'Contents', 'Info.plist')) == 'plist'
+  assert not p.exists(p.join(dest, 'extra'))
+
+
+def test_single_file(tmp_path):
+  target = tmp_path / 'build' / 'lib.scpt'
+  target.parent.mkdir()
+  target.write_text('lib')
+  dest = str(tmp_path / 'Script Libraries' / 'lib.scpt')
+  state, copied = install_tree(str(target), dest, {}, time.time_ns())
+  assert copied == 1 and read(dest) == 'lib'
+  target.write_text('lib 2')
+  assert install_tree(str(target), dest, state, time.time_ns())[1] == 1
+  assert read(dest) == 'lib 2'
+
+
+def test_file_replaces_directory(tmp_path):
+  target = tmp_path / 'lib.scpt'
+  target.write_text('lib')
+  dest = tmp_path / 'dest' / 'lib.scpt'
+  (dest / 'Contents').mkdir(parents=True)
+  assert install_tree(str(target), str(dest), {}, time.time_ns())[1] == 1
+  assert read(str(dest)) == 'lib'
+
+
+def test_hashes_are_reused_only_when_trusted(tmp_path):
+  target = tmp_path / 'a.scpt'
+  target.write_text('a')
+  os.utime(target, ns=(PAST_NS, PAST_NS))
+  records = get_records(str(target), {}, time.time_ns())
+  stale = {'': records[''][:2] + ['stale']}
+  assert get_records(str(target), stale, time.time_ns()) == stale
+  assert get_records(str(target), stale, PAST_NS) == records
+
+
+def test_remove_tree(tmp_path):
+  make_target(tmp_path)
+  link = tmp_path / 'link'
+  link.symlink_to(tmp_path / 'build')
+  remove_tree(str(link))
+  assert not p.lexists(link) and p.isdir(tmp_path / 'build')
+  remove_tree(str(tmp_path / 'build'))
+  assert not p.exists(tmp_path / 'build')
+  remove_tree(str(tmp_path / 'missing'))
@@ -0,0 +1,145 @@
+from jxa_builder.core.js_lexer import get_top_level_names, iter_library_calls, strip_code
+
+
+def specifiers(code: str):
+  return [call.specifier for call in iter_library_calls(code)]
+
+
+def test_quotes_and_backticks():
+  code = '''a = Library("a");\nb = Library('b');\nc = Library(`c`);\n'''
+  assert specifiers(code) == ['a', 'b', 'c']
+
+
+def test_whitespace_inside_the_call():
+  assert specifiers('a = Library (\n  "a"\n);') == ['a']
+
+
+def test_non_literal_arguments_are_skipped():
+  code = 'a = Library(name);\nb = Library(`${x}`);\nc = Library("a" + b);\n'
+  assert specifiers(code) == []
+
+
+def test_comments_are_skipped():
+  code = ('// a = Library("a");\n'
+          '/* b = Library("b");\n*/\n'
+          'c = Library("c"); // d = Library("d")\n')
+  assert specifiers(code) == ['c']
+
+
+def test_strings_are_skipped():
+  code = ('s = "Library(\'a\')";\n'
+          "t = 'x\\' Library(\"b\")';\n"
+          'c = Library("c");\n')
+  assert specifiers(code) == ['c']
+
+
+def test_templates_are_skipped():
+  code = ('s = `Library("a") ${`Library("b")`}`;\n'
+          't = `${{o: {p: 1}}} Library("c")`;\n'
+          'd = Library("d");\n')
+  assert specifiers(code) == ['d']
+
+
+def test_calls_inside_template_substitutions_are_found():
+  assert specifiers('s = `${Library("a").f({x: 1})} Library("b")`;') == ['a']
+
+
+def test_regex_literals_are_skipped():
+  code = ('r = /Library("a")/g;\n'
+          'q = /["\'`]/.test(s) && /\\/*/;\n'
+          'b = Library("b");\n')
+  assert specifiers(code) == ['b']
+
+
+def test_division_is_not_a_regex():
+  ## Read as regexes, the slashes would hide the call between them
+  code = 'x = a / 2; b = Library("b"); y = c / 3;\n'
+  assert specifiers(code) == ['b']
+
+
+def test_regex_after_keyword():
+  code = 'function f() { return /Library("a")/; }\nb = Library("b");\n'
+  assert specifiers(code) == ['b']
+
+
+def test_line_column_and_offsets():
+  code = 'x = 1;\n\n  a = Library("lib/a");\nb = Library(\'b\');\n'
+  calls = list(iter_library_calls(code))
+  assert [(c.line, c.column) for c in calls] == [(3, 7), (4, 5)]
+  assert [code[c.start:c.end] for c in calls] == ['lib/a', 'b']
+
+
+def test_unterminated_literals_do_not_raise():
+  assert specifiers('a = Library("a");\ns = "open\n/* open') == ['a']
+  assert specifiers('s = `open ${Library("a")') == ['a']
+
+
+def test_top_level_declarations_and_assignments():
+  code = ('function f() {}\n'
+          'async function* gen() {}\n'
+          'class C {}\n'
+          'const a = 1;\n'
+          'z = Library("z");\n')
+  assert get_top_level_names(code) == {
+      'f': True,
+      'gen': True,
+      'C': True,
+      'a': True,
+      'z': False
+  }
+
+
+def test_assigned_then_declared_is_declared():
+  assert get_top_level_names('z = 1;\nvar z;\n') == {'z': True}
+
+
+def test_nested_scopes_are_ignored():
+  code = ('function f() { var inner = 1; x = 2; }\n'
+          'if (a) { y = 2; }\n'
+          'g(function () { w = 1; });\n'
+          'arr = [v = 1];\n')
+  assert get_top_level_names(code) == {'f': True, 'arr': False}
+
+
+def test_comparisons_arrows_and_properties_are_not_assignments():
+  code = 'q == 1;\nr => 1;\no.p = 1;\ns >= 1;\n'
+  assert get_top_level_names(code) == {}
+
+
+def test_literals_and_templates_are_skipped():
+  code = ('s = `${(() => { w = 1; })()} x = 1`;\n'
+          't = "u = 1";\n'
+          '// v = 1\n'
+          'r = /=/;\n')
+  assert get_top_level_names(code) == {'s': False, 't': False, 'r': False}
+
+
+def test_strip_keeps_line_breaks_where_statements_can_end():
+  assert strip_code('a = 1\nb = 2\n') == 'a=1\nb=2\n'
+  assert strip_code('return\nx') == 'return\nx\n'
+  assert strip_code('x = a\n++b\n') == 'x=a\n++b\n'
+  assert strip_code('f(a,\n  b);\n') == 'f(a,b);\n'
+
+
+def test_strip_removes_comments():
+  assert strip_code('/* c */ a  =  1 ; /* d */') == 'a=1;\n'
+  ## A line comment ends the line
+  assert strip_code('a = 1 // c\nb = 2') == 'a=1\nb=2\n'
+
+
+def test_strip_keeps_tokens_apart():
+  assert strip_code('x = a + +b;') == 'x=a+ +b;\n'
+  assert strip_code('x = a - -b;') == 'x=a- -b;\n'
+  assert strip_code('y = 1 .toString();') == 'y=1 .toString();\n'
+  assert strip_code('x = a / /b/.source;') == 'x=a/ /b/.source;\n'
+  assert strip_code('var  a = typeof  b;') == 'var a=typeof b;\n'
+
+
+def test_strip_keeps_literals():
+  assert strip_code('s = "a  /* b */  c";') == 's="a  /* b */  c";\n'
+  assert strip_code('r = /a b/g // c\n') == 'r=/a b/g\n'
+  assert strip_code('t = `a  ${ b  +  c }  d`;') == 't=`a  ${b+c}  d`;\n'
+
+
+def test_strip_empty_code():
+  assert strip_code('') == ''
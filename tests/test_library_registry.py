@@ -0,0 +1,85 @@
+from jxa_builder.core.library_registry import LibraryRegistry, hash_output
+
+
+def make_registry(tmp_path):
+  libs_dir = tmp_path / 'Script Libraries'
+  libs_dir.mkdir()
+  (libs_dir / 'a.scpt').write_text('a')
+  projects = []
+  for name in ('p1', 'p2'):
+    (tmp_path / name).mkdir()
+    projects.append(str(tmp_path / name))
+  return LibraryRegistry(str(libs_dir)), projects
+
+
+def test_projects_share_the_same_build(tmp_path):
+  registry, (p1, p2) = make_registry(tmp_path)
+  registry.add('a.scpt', 'h1', p1)
+  registry.add('a.scpt', 'h1', p2)
+  assert registry.is_installed('a.scpt', 'h1')
+  assert not registry.is_installed('a.scpt', 'h2')
+  assert not registry.release('a.scpt', p1)
+  assert registry.release('a.scpt', p2)
+  assert 'a.scpt' not in registry.libraries
+
+
+def test_another_build_used_by_other_projects_conflicts(tmp_path):
+  registry, (p1, p2) = make_registry(tmp_path)
+  registry.add('a.scpt', 'h1', p1)
+  assert registry.get_conflicts('a.scpt', 'h2', p2) == [p1]
+  assert registry.get_conflicts('a.scpt', 'h1', p2) == []
+  ## Rebuilding the project's own library is not a conflict
+  assert registry.get_conflicts('a.scpt', 'h2', p1) == []
+
+
+def test_replaced_build_keeps_its_references(tmp_path):
+  registry, (p1, p2) = make_registry(tmp_path)
+  registry.add('a.scpt', 'h1', p1)
+  registry.add('a.scpt', 'h2', p2)
+  assert registry.libraries['a.scpt'] == {'hash': 'h2', 'projects': [p1, p2]}
+  assert not registry.release('a.scpt', p2)
+  assert registry.release('a.scpt', p1)
+
+
+def test_removed_projects_do_not_count(tmp_path):
+  registry, (p1, p2) = make_registry(tmp_path)
+  registry.add('a.scpt', 'h1', p1)
+  (tmp_path / 'p1').rmdir()
+  assert registry.get_conflicts('a.scpt', 'h2', p2) == []
+  registry.add('a.scpt', 'h2', p2)
+  assert registry.libraries['a.scpt'] == {'hash': 'h2', 'projects': [p2]}
+  assert registry.release('a.scpt', p2)
+
+
+def test_missing_library_does_not_conflict(tmp_path):
+  registry, (p1, p2) = make_registry(tmp_path)
+  registry.add('a.scpt', 'h1', p1)
+  (tmp_path / 'Script Libraries' / 'a.scpt').unlink()
+  assert not registry.is_installed('a.scpt', 'h1')
+  assert registry.get_conflicts('a.scpt', 'h2', p2) == []
+
+
+def test_saved_registry_is_loaded(tmp_path):
+  registry, (p1, _) = make_registry(tmp_path)
+  registry.add('a.scpt', 'h1', p1)
+  assert registry.changed
+  registry.save()
+  loaded = LibraryRegistry(registry.libs_dir)
+  assert loaded.libraries == registry.libraries and not loaded.changed
+
+
+def test_unreadable_registry_is_discarded(tmp_path):
+  registry, _ = make_registry(tmp_path)
+  with open(registry.path, 'w') as f:
+    f.write('{')
+  assert LibraryRegistry(registry.libs_dir).libraries == {}
+
+
+def test_hash_output_of_a_directory(tmp_path):
+  app = tmp_path / 'a.app'
+  (app / 'Contents').mkdir(parents=True)
+  (app / 'Contents' / 'Info.plist').write_text('plist')
+  digest = hash_output(str(app))
+  assert hash_output(str(app)) == digest
+  (app / 'Contents' / 'Info.plist').write_text('plist 2')
+  assert hash_output(str(app)) != digest
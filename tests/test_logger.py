@@ -0,0 +1,65 @@
+import os
+import atexit
+import sys
+import logging
+import subprocess
+from os import path as p
+from typing import List
+from jxa_builder.utils.logger import LazyQueueHandler
+
+ROOT_DIR = p.dirname(p.dirname(p.abspath(__file__)))
+
+
+class ListHandler(logging.Handler):
+
+  def __init__(self):
+    super().__init__()
+    self.messages: List[str] = []
+
+  def emit(self, record: logging.LogRecord):
+    self.messages.append(record.getMessage())
+
+
+def test_queue_handler_starts_its_listener_with_the_first_record():
+  target = ListHandler()
+  handler = LazyQueueHandler(target)
+  test_logger = logging.getLogger('jxa_builder.tests.queue')
+  test_logger.propagate = False
+  test_logger.addHandler(handler)
+  try:
+    assert handler.listener._thread is None
+    test_logger.warning('%s %s', 'lazy', 'message')
+    assert handler.listener._thread is not None
+    test_logger.warning('second')
+  finally:
+    test_logger.removeHandler(handler)
+    ## Writes the records that are left
+    handler.listener.stop()
+    atexit.unregister(handler.listener.stop)
+  assert target.messages == ['lazy message', 'second']
+
+
+def test_log_file_is_rotated(tmp_path):
+  logs_dir = tmp_path / 'Library' / 'Logs'
+  logs_dir.mkdir(parents=True)
+  ## ~1KB per file, 20 records of ~200B, the file handler writes from a
+  ## background thread until exit
+  subprocess.run(
+      [
+          sys.executable, '-c', 'from jxa_builder.utils.logger import logger\n'
+          'for i in range(20): logger.debug("%d %s", i, "x" * 150)'
+      ],
+      cwd=ROOT_DIR,
+      env={
+          **os.environ, 'HOME': str(tmp_path),
+          'JXA_BUILDER_LOG_MAX_MB': '0.001',
+          'JXA_BUILDER_LOG_BACKUPS': '2'
+      },
+      check=True)
+  assert sorted(os.listdir(logs_dir)) == [
+      'jxa-builder.log', 'jxa-builder.log.1', 'jxa-builder.log.2'
+  ]
+  for name in os.listdir(logs_dir):
+    assert p.getsize(logs_dir / name) <= 1100
+  with open(logs_dir / 'jxa-builder.log') as f:
+    assert f'19 {"x" * 150}' in f.read()
@@ -0,0 +1,118 @@
+import json
+import time
+from os import path as p
+import pytest
+from jxa_builder.core import manage_outputs as mo
+from jxa_builder.core.install_tree import install_tree
+from jxa_builder.core.privileged_install import PrivilegedInstallError
+
+
+@pytest.fixture
+def project(make_files, monkeypatch):
+  """
+  An app with an embedded library, and a library installed to a directory
+  that needs privileges ("system")
+  """
+  root = make_files({
+      'build/output/app.app/Contents/Info.plist': 'plist',
+      'build/output/lib.scpt': 'lib',
+      'build/output/other.scpt': 'other',
+  })
+  output_dir = p.join(root, 'build', 'output')
+  app = p.join(output_dir, 'app.app')
+  units = [
+      {
+          'input_path': '',
+          'output_path': app,
+          'installation_path': p.join(root, 'Applications', 'app.app')
+      },
+      {
+          'input_path': '',
+          'output_path': p.join(output_dir, 'lib.scpt'),
+          'installation_path': p.join(app, 'Contents', 'Library', 'lib.scpt')
+      },
+      {
+          'input_path': '',
+          'output_path': p.join(output_dir, 'other.scpt'),
+          'installation_path': p.join(root, 'system', 'other.scpt')
+      },
+  ]
+  locations_file = p.join(root, 'build', 'locations.json')
+  with open(locations_file, 'w') as f:
+    json.dump(units, f)
+  monkeypatch.setattr(mo, 'needs_privileges',
+                      lambda path: p.join(root, 'system') in path)
+  return root, locations_file
+
+
+def test_privileged_install_waits_for_embedded_libraries(project, monkeypatch):
+  root, locations_file = project
+  calls = []
+
+  def run_privileged(action, units, extra=()):
+    calls.append((action, [p.basename(u.installation_path) for u in units]))
+    ## The helper archives the outputs, the app must include its library
+    assert p.isfile(
+        p.join(root, 'build', 'output', 'app.app', 'Contents', 'Library',
+               'lib.scpt'))
+
+  def slow_install_tree(target, dest, *args):
+    if dest.endswith('lib.scpt'):
+      time.sleep(0.2)
+    return install_tree(target, dest, *args)
+
+  monkeypatch.setattr(mo, 'run_privileged', run_privileged)
+  monkeypatch.setattr(mo, 'install_tree', slow_install_tree)
+  ## With a single worker the units would be handled in order anyway
+  monkeypatch.setattr(mo.os, 'cpu_count', lambda: 4)
+  mo.manage_outputs('install', locations_file)
+  assert calls == [('install', ['other.scpt'])]
+  assert p.isfile(
+      p.join(root, 'Applications', 'app.app', 'Contents', 'Library',
+             'lib.scpt'))
+
+
+def test_privileged_install_error_exits(project, monkeypatch, capsys):
+  _, locations_file = project
+
+  def run_privileged(action, units, extra=()):
+    raise PrivilegedInstallError(
+        'Cannot install with administrator privileges')
+
+  monkeypatch.setattr(mo, 'run_privileged', run_privileged)
+  with pytest.raises(SystemExit):
+    mo.manage_outputs('install', locations_file)
+  assert 'administrator privileges' in capsys.readouterr().out
+
+
+def make_library_project(make_files, name: str, content: str) -> str:
+  """A project with a library installed to the shared "libs" directory"""
+  root = make_files({f'{name}/build/output/lib.scpt': content})
+  locations_file = p.join(root, name, 'build', 'locations.json')
+  with open(locations_file, 'w') as f:
+    json.dump([{
+        'input_path': '',
+        'output_path': p.join(root, name, 'build', 'output', 'lib.scpt'),
+        'installation_path': p.join(root, 'libs', 'lib.scpt')
+    }], f)
+  return locations_file
+
+
+def test_another_build_of_a_shared_library_is_installed_with_a_warning(
+    make_files, monkeypatch, capsys):
+  p1 = make_library_project(make_files, 'p1', 'lib 1')
+  p2 = make_library_project(make_files, 'p2', 'lib 2')
+  libs_dir = p.join(p.dirname(p.dirname(p.dirname(p1))), 'libs')
+  lib = p.join(libs_dir, 'lib.scpt')
+  monkeypatch.setattr(mo, 'SHARED_LIBS_DIRS', (libs_dir, ))
+  monkeypatch.setattr(mo, 'needs_privileges', lambda path: False)
+  mo.manage_outputs('install', p1)
+  mo.manage_outputs('install', p2)
+  assert 'Replacing' in capsys.readouterr().out
+  with open(lib) as f:
+    assert f.read() == 'lib 2'
+  ## The project that installed the replaced build still uses the library
+  mo.manage_outputs('uninstall', p2)
+  assert p.isfile(lib)
+  mo.manage_outputs('uninstall', p1)
+  assert not p.exists(lib)
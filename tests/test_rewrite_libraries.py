@@ -0,0 +1,42 @@
+from jxa_builder.core.rewrite_libraries import rewrite_libraries
+
+
+def rewrite(tmp_path, code: str, names) -> str:
+  source = tmp_path / 'a.js'
+  dest = tmp_path / 'a.out.js'
+  source.write_bytes(code.encode())
+  rewrite_libraries(str(source), str(dest), names)
+  return dest.read_bytes().decode()
+
+
+def test_calls_are_renamed(tmp_path):
+  code = 'b = Library("b");\nc = Library(\'c\');\nd = Library(`b`);\n'
+  assert rewrite(tmp_path, code, {'b': 'b1_0_0'}) == (
+      'b = Library("b1_0_0");\nc = Library(\'c\');\nd = Library(`b1_0_0`);\n')
+
+
+def test_path_is_replaced_by_the_new_name(tmp_path):
+  assert rewrite(tmp_path, 'b = Library("lib/b");',
+                 {'b': 'b1_0_0'}) == 'b = Library("b1_0_0");'
+
+
+def test_comments_and_strings_are_untouched(tmp_path):
+  code = ('// b = Library("b");\n'
+          's = "Library(\'b\')";\n'
+          't = `Library("b")`;\n'
+          'b = Library("b");\n')
+  assert rewrite(tmp_path, code, {'b': 'x'}) == ('// b = Library("b");\n'
+                                                 's = "Library(\'b\')";\n'
+                                                 't = `Library("b")`;\n'
+                                                 'b = Library("x");\n')
+
+
+def test_line_endings_are_kept(tmp_path):
+  code = 'b = Library("b");\r\nc = 1;\r\n'
+  assert rewrite(tmp_path, code,
+                 {'b': 'x'}) == 'b = Library("x");\r\nc = 1;\r\n'
+
+
+def test_no_names_copies(tmp_path):
+  code = 'b = Library("b");\r\n'
+  assert rewrite(tmp_path, code, {}) == code
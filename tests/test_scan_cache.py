@@ -0,0 +1,102 @@
+import os
+from os import path as p
+import json
+import time
+from jxa_builder.core.scan_cache import ScanCache
+
+## Old enough not to be in the racy window of a cache written now
+PAST_NS = time.time_ns() - 3600 * 10**9
+
+
+def write_source(path: str, content: str, mtime_ns: int = PAST_NS):
+  with open(path, 'w') as f:
+    f.write(content)
+  os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def make_cache(tmp_path, source: str, libraries, fingerprint='stat') -> str:
+  cache_file = str(tmp_path / 'build' / 'scan_cache.json')
+  cache = ScanCache(cache_file, fingerprint)
+  cache.set_libraries(source, libraries)
+  cache.save()
+  return cache_file
+
+
+def test_unchanged_source_is_reused(tmp_path):
+  source = str(tmp_path / 'a.js')
+  write_source(source, 'b = Library("b");')
+  cache_file = make_cache(tmp_path, source, ['b'])
+  assert ScanCache.load(cache_file).get_libraries(source) == ['b']
+
+
+def test_changed_source_is_invalidated(tmp_path):
+  source = str(tmp_path / 'a.js')
+  write_source(source, 'b = Library("b");')
+  cache_file = make_cache(tmp_path, source, ['b'])
+  write_source(source, 'c = Library("c");', PAST_NS + 10**9)
+  assert ScanCache.load(cache_file).get_libraries(source) is None
+
+
+def test_touched_source_is_reused_with_content_fingerprint(tmp_path):
+  source = str(tmp_path / 'a.js')
+  write_source(source, 'b = Library("b");')
+  cache_file = make_cache(tmp_path, source, ['b'], 'content')
+  write_source(source, 'b = Library("b");', PAST_NS + 10**9)
+  assert ScanCache.load(cache_file, 'stat').get_libraries(source) is None
+  assert ScanCache.load(cache_file, 'content').get_libraries(source) == ['b']
+
+
+def test_source_modified_around_the_save_is_not_trusted(tmp_path):
+  source = str(tmp_path / 'a.js')
+  write_source(source, 'b = Library("b");', time.time_ns())
+  cache_file = make_cache(tmp_path, source, ['b'])
+  assert ScanCache.load(cache_file).get_libraries(source) is None
+
+
+def test_other_version_is_discarded(tmp_path):
+  source = str(tmp_path / 'a.js')
+  write_source(source, 'b = Library("b");')
+  cache_file = make_cache(tmp_path, source, ['b'])
+  with open(cache_file) as f:
+    data = json.load(f)
+  data['version'] = -1
+  with open(cache_file, 'w') as f:
+    json.dump(data, f)
+  assert ScanCache.load(cache_file).get_libraries(source) is None
+
+
+def test_resolved_is_invalidated_by_searched_dirs(tmp_path):
+  source = str(tmp_path / 'a.js')
+  write_source(source, 'b = Library("b");')
+  deps_dir = tmp_path / 'dependencies'
+  deps_dir.mkdir()
+  os.utime(deps_dir, ns=(PAST_NS, PAST_NS))
+  cache_file = str(tmp_path / 'build' / 'scan_cache.json')
+  cache = ScanCache(cache_file)
+  cache.set_libraries(source, ['b'])
+  cache.set_resolved(source, [(str(tmp_path / 'b.js'), False)],
+                     [str(deps_dir)])
+  cache.save()
+  assert ScanCache.load(cache_file).get_resolved(source) == [
+      (str(tmp_path / 'b.js'), False)
+  ]
+  ## A library added to a searched directory may take priority
+  (deps_dir / 'b.js').write_text('')
+  assert ScanCache.load(cache_file).get_resolved(source) is None
+
+
+def test_unused_entries_are_dropped(tmp_path):
+  a, b = str(tmp_path / 'a.js'), str(tmp_path / 'b.js')
+  write_source(a, '')
+  write_source(b, '')
+  cache_file = str(tmp_path / 'build' / 'scan_cache.json')
+  cache = ScanCache(cache_file)
+  cache.set_libraries(a, [])
+  cache.set_libraries(b, [])
+  cache.save()
+  cache = ScanCache.load(cache_file)
+  assert cache.get_libraries(a) == []
+  cache.save()
+  cache = ScanCache.load(cache_file)
+  assert cache.get_libraries(b) is None
+  assert p.isfile(cache_file)
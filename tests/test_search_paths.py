@@ -0,0 +1,21 @@
+from os import path as p
+from jxa_builder.core.search_paths import DirListings, get_ancestor_node_dirs
+
+
+def test_ancestor_node_dirs_are_searched_like_node_does():
+  assert get_ancestor_node_dirs('/w/node_modules/pkg/src') == [
+      '/w/node_modules/pkg/src/node_modules',
+      '/w/node_modules/pkg/node_modules',
+      '/w/node_modules',
+      '/node_modules',
+  ]
+
+
+def test_listings_are_cached_until_cleared(tmp_path):
+  listings = DirListings()
+  assert not listings.exists(str(tmp_path), 'a.js')
+  (tmp_path / 'a.js').write_text('')
+  assert not listings.exists(str(tmp_path), 'a.js')
+  listings.clear()
+  assert listings.exists(str(tmp_path), 'a.js')
+  assert not listings.exists(p.join(str(tmp_path), 'missing'), 'a.js')
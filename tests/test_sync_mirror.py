@@ -0,0 +1,105 @@
+import os
+from os import path as p
+import pytest
+from jxa_builder.core import sync_mirror as sync_mirror_module
+from jxa_builder.core.sync_mirror import sync_mirror
+
+
+def never_racy(mtime_ns: int) -> bool:
+  return False
+
+
+@pytest.fixture
+def project(make_files):
+  root = make_files({
+      'src/index.js': 'a = Library("a");\n',
+      'src/lib/a.js': 'x = 1;\n',
+  })
+  mirror_dir = p.join(root, 'build', 'preprocessed')
+  files = {
+      p.join(mirror_dir, 'index.js'): (p.join(root, 'src', 'index.js'), {
+          'a': 'a1_0_0'
+      }),
+      p.join(mirror_dir, 'lib', 'a.js'): (p.join(root, 'src', 'lib',
+                                                 'a.js'), {}),
+  }
+  return root, mirror_dir, files
+
+
+def read(path: str) -> str:
+  with open(path) as f:
+    return f.read()
+
+
+def test_files_are_linked_or_rewritten(project):
+  root, mirror_dir, files = project
+  state = sync_mirror(files, mirror_dir, {}, never_racy)
+  index, lib = files
+  assert state[index]['mode'] == 'written'
+  assert read(index) == 'a = Library("a1_0_0");\n'
+  assert state[lib]['mode'] == 'linked'
+  assert os.stat(lib).st_ino == os.stat(files[lib][0]).st_ino
+
+
+def test_unchanged_files_are_skipped(project, monkeypatch):
+  root, mirror_dir, files = project
+  state = sync_mirror(files, mirror_dir, {}, never_racy)
+
+  def fail(*args):
+    raise AssertionError('nothing should be written')
+
+  monkeypatch.setattr(sync_mirror_module, 'rewrite_libraries', fail)
+  monkeypatch.setattr(sync_mirror_module.os, 'link', fail)
+  assert sync_mirror(files, mirror_dir, state, never_racy) == state
+
+
+def test_changed_files_are_updated(project):
+  root, mirror_dir, files = project
+  state = sync_mirror(files, mirror_dir, {}, never_racy)
+  index, _ = files
+  ## New library names, e.g. the library's version changed
+  files[index] = (files[index][0], {'a': 'a1_1_0'})
+  state = sync_mirror(files, mirror_dir, state, never_racy)
+  assert read(index) == 'a = Library("a1_1_0");\n'
+
+
+def test_racy_files_are_rewritten(project, monkeypatch):
+  root, mirror_dir, files = project
+  state = sync_mirror(files, mirror_dir, {}, never_racy)
+  rewritten = []
+  rewrite_libraries = sync_mirror_module.rewrite_libraries
+
+  def counting_rewrite(source, dest, names):
+    rewritten.append(source)
+    rewrite_libraries(source, dest, names)
+
+  monkeypatch.setattr(sync_mirror_module, 'rewrite_libraries',
+                      counting_rewrite)
+  ## The source may have changed without changing its stat
+  sync_mirror(files, mirror_dir, state, lambda mtime_ns: True)
+  assert rewritten == [p.join(root, 'src', 'index.js')]
+
+
+def test_removed_files_are_pruned(project):
+  root, mirror_dir, files = project
+  state = sync_mirror(files, mirror_dir, {}, never_racy)
+  _, lib = files
+  del files[lib]
+  state = sync_mirror(files, mirror_dir, state, never_racy)
+  assert lib not in state
+  assert not p.exists(lib) and not p.exists(p.dirname(lib))
+  assert p.isfile(p.join(root, 'src', 'lib', 'a.js'))
+
+
+def test_files_are_copied_when_linking_fails(project, monkeypatch):
+  root, mirror_dir, files = project
+
+  def link(source, dest):
+    raise OSError('Invalid cross-device link')
+
+  monkeypatch.setattr(sync_mirror_module.os, 'link', link)
+  state = sync_mirror(files, mirror_dir, {}, never_racy)
+  _, lib = files
+  assert state[lib]['mode'] == 'copied'
+  assert read(lib) == 'x = 1;\n'
+  assert os.stat(lib).st_ino != os.stat(files[lib][0]).st_ino
@@ -0,0 +1,108 @@
+import os
+from os import path as p
+import threading
+from collections import Counter
+import pytest
+from jxa_builder.core.build_project import BuildOptions
+from jxa_builder.core.compiler_backends import FakeBackend
+from jxa_builder.core.shared_outputs import SharedOutputs
+from jxa_builder.core.workspace import build_workspace, find_projects
+
+OPTIONS = BuildOptions(compiler_backend='fake', artifact_cache=False, jobs=2)
+
+
+@pytest.fixture
+def workspace(make_files):
+  """Two apps depending on the same library packages (linked, as after an install)"""
+  files = {
+      'libs/shared/package.json':
+      '{"name": "shared", "version": "1.2.0", "main": "index.js"}',
+      'libs/shared/index.js': 'u = Library("util");\n',
+      'libs/util/package.json':
+      '{"name": "util", "version": "0.1.0", "main": "index.js"}',
+      'libs/util/index.js': 'function x() { return 1; }\n',
+  }
+  for app in ('app1', 'app2'):
+    files[f'apps/{app}/jxa.json'] = (
+        f'{{"main": "src/index.js", "version": "1.0.0", "app_name": "{app}"}}')
+    files[f'apps/{app}/src/index.js'] = 's = Library("shared");\n'
+  root = make_files(files)
+  for app in ('app1', 'app2'):
+    deps_dir = p.join(root, 'apps', app, 'dependencies')
+    os.makedirs(deps_dir)
+    for lib in ('shared', 'util'):
+      os.symlink(p.join(root, 'libs', lib), p.join(deps_dir, lib))
+  return root
+
+
+@pytest.fixture
+def compiled_inputs(monkeypatch) -> Counter:
+  """Count what the fake backend compiles, by the source file name"""
+  counts = Counter()
+  lock = threading.Lock()
+  compile = FakeBackend.compile
+
+  def counting_compile(self, unit):
+    with lock:
+      counts[p.basename(unit.input_path)] += 1
+    return compile(self, unit)
+
+  monkeypatch.setattr(FakeBackend, 'compile', counting_compile)
+  return counts
+
+
+def test_find_projects_skips_dependencies(workspace):
+  assert find_projects(workspace) == [
+      p.join(workspace, 'apps', 'app1'),
+      p.join(workspace, 'apps', 'app2')
+  ]
+
+
+def test_shared_libraries_are_compiled_once(workspace, compiled_inputs):
+  results = build_workspace(workspace, options=OPTIONS)
+  assert [r.error for r in results] == [None, None]
+  ## Two main scripts, one shared and one util library
+  assert sum(compiled_inputs.values()) == 4
+  assert [r.compiled for r in results] == [3, 3]
+  assert sum('(2 shared with other projects)' in r.output
+             for r in results) == 1
+  for app in ('app1', 'app2'):
+    output_dir = p.join(workspace, 'apps', app, 'build', 'output')
+    assert {'shared1_2_0.scpt',
+            'util0_1_0.scpt'} <= set(os.listdir(output_dir))
+
+
+def test_failed_project_is_reported_after_the_others(workspace, make_files,
+                                                     capsys):
+  make_files({'apps/app2/src/index.js': 's = Library("missing");\n'})
+  with pytest.raises(SystemExit):
+    build_workspace(workspace, options=OPTIONS)
+  out = capsys.readouterr().out
+  assert 'apps/app2:\n' in out and 'missing' in out
+  assert p.isdir(p.join(workspace, 'apps', 'app1', 'build', 'output'))
+
+
+def test_shared_output_is_claimed_once(tmp_path):
+  outputs = SharedOutputs()
+  key = SharedOutputs.get_key(str(tmp_path / 'a.js'), {'deps': []})
+  assert outputs.claim(key)
+  assert not outputs.claim(key)
+  source = tmp_path / 'a.scpt'
+  source.write_text('a')
+  copied = []
+  waiter = threading.Thread(target=lambda: copied.append(
+      outputs.copy(key, str(tmp_path / 'b.scpt'))))
+  waiter.start()
+  outputs.publish(key, str(source))
+  waiter.join(timeout=10)
+  assert copied == [True]
+  assert (tmp_path / 'b.scpt').read_text() == 'a'
+
+
+def test_unpublished_output_is_not_copied(tmp_path):
+  outputs = SharedOutputs()
+  outputs.claim('key')
+  outputs.publish('key', None)
+  ## Only the first publish counts
+  outputs.publish('key', str(tmp_path))
+  assert not outputs.copy('key', str(tmp_path / 'b.scpt'))